@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import argparse
 import logging
 import os
 import signal
@@ -25,6 +26,17 @@ def handle_sigint(*args):
     QApplication.quit()
 
 
+def sync_catalogs_headless(force_refresh):
+    """Syncs every console catalog without starting the GUI (e.g. from cron)."""
+    from src.scraping import CATALOG_SYNC_ERROR, sync_all_catalogs
+
+    results = sync_all_catalogs(force_refresh=force_refresh)
+    failed = [name for name, status in results.items() if status == CATALOG_SYNC_ERROR]
+    for name in failed:
+        logging.error(f"Catalogo non sincronizzato: {name}")
+    return 1 if failed else 0
+
+
 def main():
     signal.signal(signal.SIGINT, handle_sigint)
 
@@ -44,4 +56,19 @@ if __name__ == "__main__":
     logging.basicConfig(
         level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
     )
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sync-catalogs",
+        action="store_true",
+        help="aggiorna la cache dei cataloghi di tutte le console ed esce",
+    )
+    parser.add_argument(
+        "--respect-ttl",
+        action="store_true",
+        help="con --sync-catalogs, salta i cataloghi ancora validi",
+    )
+    args, qt_args = parser.parse_known_args()
+    if args.sync_catalogs:
+        sys.exit(sync_catalogs_headless(force_refresh=not args.respect_ttl))
+    sys.argv = sys.argv[:1] + qt_args
     main()
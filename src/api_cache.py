@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from src.config import CACHE_FOLDER
+
+API_CACHE_DB_PATH = os.path.join(CACHE_FOLDER, "api_cache.sqlite3")
+SCHEMA_VERSION = 1
+
+# A found game rarely changes; a miss is retried sooner, since the title may
+# be added to IGDB/RAWG (or the title mapping improved) in the meantime.
+API_CACHE_HIT_TTL = 90 * 86400
+API_CACHE_MISS_TTL = 7 * 86400
+# Least recently used entries beyond this many are dropped.
+API_CACHE_MAX_ENTRIES = 50000
+# Writes between two checks of the size bound.
+_PRUNE_INTERVAL = 200
+
+
+def normalize_query(query):
+    """Cache key form of a search title: lowercase, single spaces."""
+    return " ".join((query or "").lower().split())
+
+
+class ApiCache:
+    """
+    SQLite cache of the IGDB/RAWG search results, keyed by (provider,
+    normalized query, platform). Found results are kept for
+    API_CACHE_HIT_TTL and misses (the API answered with no result) for
+    API_CACHE_MISS_TTL; failed requests are never stored. Entries are
+    bounded to API_CACHE_MAX_ENTRIES, dropping the least recently used.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, path=API_CACHE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._conn.executescript(f"""
+                    DROP TABLE IF EXISTS api_results;
+                    CREATE TABLE api_results (
+                        provider TEXT NOT NULL,
+                        query TEXT NOT NULL,
+                        platform TEXT NOT NULL,
+                        data TEXT,
+                        stored_at REAL NOT NULL,
+                        used_at REAL NOT NULL,
+                        PRIMARY KEY (provider, query, platform)
+                    );
+                    CREATE INDEX api_results_used ON api_results (used_at);
+                    PRAGMA user_version = {SCHEMA_VERSION};
+                    """)
+
+    def get(self, provider, query, platform):
+        """
+        Returns (True, details or None) for a fresh cached result (None is a
+        cached miss), or (False, None) if the search must be sent.
+        """
+        key = (provider, normalize_query(query), platform or "")
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    """
+                    SELECT data, stored_at FROM api_results
+                    WHERE provider = ? AND query = ? AND platform = ?
+                    """,
+                    key,
+                ).fetchone()
+                if row is None:
+                    return False, None
+                data, stored_at = row
+                ttl = API_CACHE_HIT_TTL if data is not None else API_CACHE_MISS_TTL
+                if now - stored_at >= ttl:
+                    return False, None
+                self._conn.execute(
+                    """
+                    UPDATE api_results SET used_at = ?
+                    WHERE provider = ? AND query = ? AND platform = ?
+                    """,
+                    (now,) + key,
+                )
+            return True, json.loads(data) if data is not None else None
+        except (sqlite3.Error, ValueError) as e:
+            logging.error(f"Errore lettura cache API: {e}")
+            return False, None
+
+    def put(self, provider, query, platform, details):
+        """Stores the result of a search; details None records a miss."""
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO api_results
+                        (provider, query, platform, data, stored_at, used_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        provider,
+                        normalize_query(query),
+                        platform or "",
+                        json.dumps(details) if details is not None else None,
+                        now,
+                        now,
+                    ),
+                )
+                self._writes += 1
+                if self._writes % _PRUNE_INTERVAL == 0:
+                    self._prune()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logging.error(f"Errore scrittura cache API: {e}")
+
+    def _prune(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM api_results").fetchone()[0]
+        excess = count - API_CACHE_MAX_ENTRIES
+        if excess > 0:
+            self._conn.execute(
+                """
+                DELETE FROM api_results WHERE rowid IN (
+                    SELECT rowid FROM api_results ORDER BY used_at LIMIT ?
+                )
+                """,
+                (excess,),
+            )
+            logging.debug(f"Cache API: rimosse {excess} voci meno usate.")
+
+    def clear(self):
+        """Drops every cached result, so the next lookups ask the APIs again."""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM api_results")
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Errore svuotamento cache API: {e}")
+            return False
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_api_cache():
+    """Returns the process-wide API cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ApiCache()
+        return _cache
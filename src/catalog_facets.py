@@ -0,0 +1,279 @@
+import re
+from bisect import bisect_right
+from collections import Counter
+
+# Region and language tags as used in No-Intro/Redump names, e.g.
+# "Title (Europe, Australia) (En,Fr,De) (Rev 1) (Disc 2)". Each one is a bit
+# of the regions/languages masks stored with the catalog, so the order of
+# these lists must only ever be appended to.
+REGIONS = (
+    "World",
+    "USA",
+    "Europe",
+    "Japan",
+    "Asia",
+    "Australia",
+    "Brazil",
+    "Canada",
+    "China",
+    "France",
+    "Germany",
+    "Hong Kong",
+    "Italy",
+    "Korea",
+    "Netherlands",
+    "Spain",
+    "Sweden",
+    "Taiwan",
+    "UK",
+    "Russia",
+    "Scandinavia",
+    "Greece",
+    "Portugal",
+    "Denmark",
+    "Finland",
+    "Norway",
+    "Poland",
+    "Mexico",
+    "Latin America",
+    "India",
+    "Belgium",
+    "Austria",
+    "Switzerland",
+    "Argentina",
+    "Unknown",
+)
+LANGUAGES = (
+    "En",
+    "Ja",
+    "Fr",
+    "De",
+    "Es",
+    "It",
+    "Nl",
+    "Pt",
+    "Sv",
+    "No",
+    "Da",
+    "Fi",
+    "Zh",
+    "Ko",
+    "Ru",
+    "Pl",
+    "El",
+    "Ca",
+    "Cs",
+    "Hu",
+    "Tr",
+    "Ar",
+    "He",
+)
+
+FLAG_BETA = 1 << 0
+FLAG_PROTO = 1 << 1
+FLAG_DEMO = 1 << 2
+FLAG_UNLICENSED = 1 << 3
+FLAG_PIRATE = 1 << 4
+FLAG_AFTERMARKET = 1 << 5
+FLAG_BIOS = 1 << 6
+FLAG_REVISION = 1 << 7
+FLAG_MULTI_DISC = 1 << 8
+
+FLAG_LABELS = {
+    FLAG_BETA: "Beta",
+    FLAG_PROTO: "Prototipi",
+    FLAG_DEMO: "Demo e sample",
+    FLAG_UNLICENSED: "Non licenziati",
+    FLAG_PIRATE: "Pirata",
+    FLAG_AFTERMARKET: "Aftermarket",
+    FLAG_BIOS: "BIOS",
+    FLAG_REVISION: "Revisioni",
+    FLAG_MULTI_DISC: "Multi-disco",
+}
+
+_FLAG_TAGS = {
+    "beta": FLAG_BETA,
+    "proto": FLAG_PROTO,
+    "prototype": FLAG_PROTO,
+    "demo": FLAG_DEMO,
+    "sample": FLAG_DEMO,
+    "kiosk": FLAG_DEMO,
+    "preview": FLAG_DEMO,
+    "unl": FLAG_UNLICENSED,
+    "pirate": FLAG_PIRATE,
+    "aftermarket": FLAG_AFTERMARKET,
+}
+
+# Upper bounds (exclusive) of the size buckets; the last bucket is open.
+SIZE_BUCKET_LIMITS = (
+    8 * 1024**2,
+    64 * 1024**2,
+    700 * 1024**2,
+    4700 * 1000**2,
+)
+SIZE_BUCKET_LABELS = ("< 8 MB", "< 64 MB", "< 700 MB", "< 4,7 GB", ">= 4,7 GB")
+
+_REGION_BITS = {name.lower(): 1 << i for i, name in enumerate(REGIONS)}
+_LANGUAGE_BITS = {code.lower(): 1 << i for i, code in enumerate(LANGUAGES)}
+_GROUP_RE = re.compile(r"\(([^()]*)\)")
+_REVISION_RE = re.compile(r"^rev\s*([0-9a-z.]+)$")
+_DISC_RE = re.compile(r"^disc\s*(\d+)")
+_FLAG_RE = re.compile(r"^([a-z]+)(?:\s*\d+)?$")
+
+FACET_REGIONS = "regions"
+FACET_LANGUAGES = "languages"
+FACET_FLAGS = "flags"
+FACET_SIZES = "sizes"
+
+
+def parse_facets(name):
+    """
+    Parses the tags of a game name once, returning
+    (regions mask, languages mask, flags, revision, disc number).
+    revision is 0 for the original release and disc 0 for single-disc games.
+    """
+    regions = languages = flags = revision = disc = 0
+    if name.startswith("[BIOS]"):
+        flags |= FLAG_BIOS
+    for group in _GROUP_RE.findall(name):
+        parts = [part.strip().lower() for part in group.split(",")]
+        region_bits = [_REGION_BITS.get(part) for part in parts]
+        if all(region_bits):
+            for bit in region_bits:
+                regions |= bit
+            continue
+        language_bits = [_LANGUAGE_BITS.get(part.split("-")[0]) for part in parts]
+        if all(language_bits):
+            for bit in language_bits:
+                languages |= bit
+            continue
+        if len(parts) != 1:
+            continue
+        tag = parts[0]
+        match = _REVISION_RE.match(tag)
+        if match:
+            flags |= FLAG_REVISION
+            number = match.group(1)
+            revision = int(number) if number.isdigit() else 1
+            continue
+        match = _DISC_RE.match(tag)
+        if match:
+            flags |= FLAG_MULTI_DISC
+            disc = int(match.group(1))
+            continue
+        match = _FLAG_RE.match(tag)
+        if match:
+            flags |= _FLAG_TAGS.get(match.group(1), 0)
+    return regions, languages, flags, revision, disc
+
+
+def size_bucket_bit(size_bytes):
+    return 1 << bisect_right(SIZE_BUCKET_LIMITS, size_bytes or 0)
+
+
+def mask_names(mask, names):
+    return [name for i, name in enumerate(names) if mask >> i & 1]
+
+
+class FacetFilter:
+    """
+    A combined facet filter. Within a group the selected values are ORed
+    (regions, languages, size buckets: 0 means no constraint); groups are
+    ANDed, and games having any of exclude_flags are hidden.
+    """
+
+    def __init__(self, regions=0, languages=0, exclude_flags=0, size_buckets=0):
+        self.regions = regions
+        self.languages = languages
+        self.exclude_flags = exclude_flags
+        self.size_buckets = size_buckets
+
+    def __bool__(self):
+        return bool(
+            self.regions or self.languages or self.exclude_flags or self.size_buckets
+        )
+
+    def describe(self):
+        parts = []
+        if self.regions:
+            parts.append(" o ".join(mask_names(self.regions, REGIONS)))
+        if self.languages:
+            parts.append("lingue " + ", ".join(mask_names(self.languages, LANGUAGES)))
+        if self.exclude_flags:
+            excluded = [
+                label
+                for flag, label in FLAG_LABELS.items()
+                if self.exclude_flags & flag
+            ]
+            parts.append("senza " + ", ".join(excluded))
+        if self.size_buckets:
+            parts.append(
+                "dimensione "
+                + ", ".join(mask_names(self.size_buckets, SIZE_BUCKET_LABELS))
+            )
+        return "; ".join(parts) if parts else "nessun filtro"
+
+
+class FacetColumns:
+    """
+    The facet values of a catalog as parallel lists (one int per game), so
+    filters and counts are plain bitwise operations over row indices.
+    """
+
+    def __init__(self, games):
+        self.regions = [game.get("regions", 0) for game in games]
+        self.languages = [game.get("languages", 0) for game in games]
+        self.flags = [game.get("flags", 0) for game in games]
+        self.sizes = [size_bucket_bit(game.get("size_bytes", 0)) for game in games]
+
+    def _filter(self, rows, facet_filter, skip=None):
+        regions, languages, flags, sizes = (
+            self.regions,
+            self.languages,
+            self.flags,
+            self.sizes,
+        )
+        if facet_filter.regions and skip != FACET_REGIONS:
+            mask = facet_filter.regions
+            rows = [i for i in rows if regions[i] & mask]
+        if facet_filter.languages and skip != FACET_LANGUAGES:
+            mask = facet_filter.languages
+            rows = [i for i in rows if languages[i] & mask]
+        if facet_filter.exclude_flags and skip != FACET_FLAGS:
+            mask = facet_filter.exclude_flags
+            rows = [i for i in rows if not flags[i] & mask]
+        if facet_filter.size_buckets and skip != FACET_SIZES:
+            mask = facet_filter.size_buckets
+            rows = [i for i in rows if sizes[i] & mask]
+        return rows
+
+    def filter(self, rows, facet_filter):
+        """Returns the rows passing facet_filter, keeping their order."""
+        if not facet_filter:
+            return rows
+        return self._filter(rows, facet_filter)
+
+    def counts(self, rows, facet_filter):
+        """
+        Facet counts for the rows of the current search. Each group is
+        counted over the rows passing the other groups' filters, so selecting
+        a region still shows how many games the other regions would add.
+        Returns {group: {bit: count}}.
+        """
+        result = {}
+        for group, values in (
+            (FACET_REGIONS, self.regions),
+            (FACET_LANGUAGES, self.languages),
+            (FACET_FLAGS, self.flags),
+            (FACET_SIZES, self.sizes),
+        ):
+            group_rows = self._filter(rows, facet_filter, skip=group)
+            # Masks repeat a lot, so count each distinct mask once.
+            bit_counts = {}
+            for mask, count in Counter(values[i] for i in group_rows).items():
+                while mask:
+                    bit = mask & -mask
+                    bit_counts[bit] = bit_counts.get(bit, 0) + count
+                    mask ^= bit
+            result[group] = bit_counts
+        return result
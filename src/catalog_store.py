@@ -0,0 +1,444 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from src.catalog_facets import parse_facets
+from src.config import CACHE_FOLDER
+
+CATALOG_DB_PATH = os.path.join(CACHE_FOLDER, "catalog.sqlite3")
+SCHEMA_VERSION = 1
+
+# Games added by a refresh within this window are shown as new in the table.
+NEW_GAME_WINDOW = 7 * 86400
+
+# Facets parsed from the name when a game is stored (see catalog_facets).
+FACET_COLUMNS = ("regions", "languages", "flags", "revision", "disc")
+
+# Columns a game dict can be loaded with; "console" and "link" are rebuilt
+# from the interned tables.
+GAME_COLUMNS = (
+    "name",
+    "link",
+    "size_bytes",
+    "size_str",
+    "added_at",
+    "console",
+) + FACET_COLUMNS
+
+# Columns the games table loads: what it shows, searches and filters on, plus
+# the row id, with which complete_game fetches the link of a game to download.
+TABLE_COLUMNS = (
+    "id",
+    "name",
+    "size_bytes",
+    "size_str",
+    "added_at",
+    "console",
+) + FACET_COLUMNS
+
+_COLUMN_SQL = {
+    "id": "g.id",
+    "name": "g.name",
+    "link": "p.prefix || g.link_suffix",
+    "size_bytes": "g.size_bytes",
+    "size_str": "g.size_str",
+    "added_at": "g.added_at",
+}
+_COLUMN_SQL.update((column, f"g.{column}") for column in FACET_COLUMNS)
+
+
+def split_link(link):
+    """Splits a link into (directory prefix, file part); every game of a console shares the prefix."""
+    cut = link.rfind("/") + 1
+    return link[:cut], link[cut:]
+
+
+def is_new_game(game, now=None):
+    """True if the game was added by a catalog refresh within NEW_GAME_WINDOW."""
+    added_at = game.get("added_at") or 0
+    return added_at > 0 and (now or time.time()) - added_at < NEW_GAME_WINDOW
+
+
+class CatalogDiff:
+    """
+    Changes between the cached and the freshly scraped catalog of a console,
+    keyed by file name: added and removed are lists of game dicts, changed is
+    a list of (old, new) pairs whose size (or title) differs. initial is True
+    when there was no cached catalog to compare with.
+    """
+
+    def __init__(self, console_name, added=None, removed=None, changed=None):
+        self.console_name = console_name
+        self.added = added or []
+        self.removed = removed or []
+        self.changed = changed or []
+        self.initial = False
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self):
+        return (
+            f"{len(self.added)} nuovi, {len(self.removed)} rimossi, "
+            f"{len(self.changed)} modificati"
+        )
+
+
+class CatalogStore:
+    """
+    SQLite store of the console catalogs, replacing the per-console JSON files.
+    Console names and link prefixes are interned in their own tables, so a
+    game row only holds its name, the file part of its link, its size and
+    when it first appeared, plus its facets (region/language masks, flags,
+    revision, disc) parsed from the name once, when it is stored. Refreshes
+    are diffed against the stored rows by file name and only the changes are
+    written. Games can be loaded with just the columns a caller needs, and
+    completed later by row id. The schema version is kept in PRAGMA
+    user_version. Safe to use from several threads.
+    """
+
+    def __init__(self, path=CATALOG_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._create_schema(version)
+
+    def _create_schema(self, old_version):
+        if old_version:
+            # A cache: rebuilding it from the server is cheaper than migrating.
+            logging.info(
+                f"Schema catalogo {old_version} -> {SCHEMA_VERSION}, ricreo la cache."
+            )
+            self._conn.executescript("""
+                DROP TABLE IF EXISTS games;
+                DROP TABLE IF EXISTS link_prefixes;
+                DROP TABLE IF EXISTS consoles;
+                """)
+        self._conn.executescript(f"""
+            CREATE TABLE consoles (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE link_prefixes (
+                id INTEGER PRIMARY KEY,
+                prefix TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE games (
+                id INTEGER PRIMARY KEY,
+                console_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                prefix_id INTEGER NOT NULL,
+                link_suffix TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                size_str TEXT NOT NULL,
+                added_at REAL NOT NULL DEFAULT 0,
+                regions INTEGER NOT NULL DEFAULT 0,
+                languages INTEGER NOT NULL DEFAULT 0,
+                flags INTEGER NOT NULL DEFAULT 0,
+                revision INTEGER NOT NULL DEFAULT 0,
+                disc INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (console_id, link_suffix)
+            );
+            PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+
+    def _console_id(self, console_name, create=False):
+        row = self._conn.execute(
+            "SELECT id FROM consoles WHERE name = ?", (console_name,)
+        ).fetchone()
+        if row or not create:
+            return row[0] if row else None
+        return self._conn.execute(
+            "INSERT INTO consoles (name) VALUES (?)", (console_name,)
+        ).lastrowid
+
+    def _prefix_id(self, prefix, cache):
+        prefix_id = cache.get(prefix)
+        if prefix_id is None:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO link_prefixes (prefix) VALUES (?)", (prefix,)
+            )
+            prefix_id = self._conn.execute(
+                "SELECT id FROM link_prefixes WHERE prefix = ?", (prefix,)
+            ).fetchone()[0]
+            cache[prefix] = prefix_id
+        return prefix_id
+
+    def has_catalog(self, console_name):
+        with self._lock:
+            return self._console_id(console_name) is not None
+
+    def get_meta(self, console_name):
+        """Returns {"etag", "last_modified", "fetched_at"} of a console, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, fetched_at FROM consoles WHERE name = ?",
+                (console_name,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "fetched_at": row[2]}
+
+    def _select(self, console_name, selected):
+        with self._lock:
+            console_id = self._console_id(console_name)
+            if console_id is None:
+                return None
+            return self._conn.execute(
+                f"""
+                SELECT {", ".join(_COLUMN_SQL[column] for column in selected) or "1"}
+                FROM games g JOIN link_prefixes p ON p.id = g.prefix_id
+                WHERE g.console_id = ? ORDER BY g.id
+                """,
+                (console_id,),
+            ).fetchall()
+
+    def load_games(self, console_name, columns=GAME_COLUMNS):
+        """
+        Returns the games of a console as dicts holding only the requested
+        columns, in listing order. Returns None if the console is not stored.
+        """
+        selected = [column for column in columns if column in _COLUMN_SQL]
+        rows = self._select(console_name, selected)
+        if rows is None:
+            return None
+        if "console" in columns:
+            return [dict(zip(selected, row), console=console_name) for row in rows]
+        return [dict(zip(selected, row)) for row in rows]
+
+    def complete_game(self, game, columns=GAME_COLUMNS):
+        """
+        Adds to a game dict loaded with fewer columns (see TABLE_COLUMNS) the
+        ones it lacks, looked up by its "id". Returns False if the game is no
+        longer stored.
+        """
+        missing = [
+            column for column in columns if column in _COLUMN_SQL and column not in game
+        ]
+        if not missing:
+            return True
+        if "id" not in game:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                f"""
+                SELECT {", ".join(_COLUMN_SQL[column] for column in missing)}
+                FROM games g JOIN link_prefixes p ON p.id = g.prefix_id
+                WHERE g.id = ?
+                """,
+                (game["id"],),
+            ).fetchone()
+        if row is None:
+            return False
+        game.update(zip(missing, row))
+        return True
+
+    def save(self, console_name, entry):
+        """
+        Stores a freshly scraped catalog (games plus validators), writing only
+        the rows that differ from the stored ones, in one transaction.
+        Sets added_at and the facet columns on the game dicts of entry. Returns the CatalogDiff,
+        or None if the store could not be written.
+        """
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                console_id = self._console_id(console_name)
+                initial = console_id is None
+                if initial:
+                    console_id = self._console_id(console_name, create=True)
+                self._conn.execute(
+                    """
+                    UPDATE consoles SET etag = ?, last_modified = ?, fetched_at = ?
+                    WHERE id = ?
+                    """,
+                    (
+                        entry.get("etag"),
+                        entry.get("last_modified"),
+                        entry.get("fetched_at", 0),
+                        console_id,
+                    ),
+                )
+                stored = {
+                    row[0]: row[1:]
+                    for row in self._conn.execute(
+                        """
+                        SELECT g.link_suffix, g.id, g.name, p.prefix, g.size_bytes,
+                               g.size_str, g.added_at, g.regions, g.languages,
+                               g.flags, g.revision, g.disc
+                        FROM games g JOIN link_prefixes p ON p.id = g.prefix_id
+                        WHERE g.console_id = ?
+                        """,
+                        (console_id,),
+                    )
+                }
+                diff = self._write_diff(
+                    console_name, console_id, stored, entry.get("games", []), now
+                )
+            diff.initial = initial
+            return diff
+        except sqlite3.Error as e:
+            logging.error(f"Errore salvataggio catalogo '{console_name}': {e}")
+            return None
+
+    def _write_diff(self, console_name, console_id, stored, games, now):
+        diff = CatalogDiff(console_name)
+        # The first catalog of a console is not "new", only later additions are.
+        added_at = now if stored else 0
+        prefixes = {}
+        inserts = []
+        updates = []
+        seen = set()
+        for game in games:
+            link = game.get("link", "")
+            prefix, suffix = split_link(link)
+            size_bytes = int(game.get("size_bytes") or 0)
+            size_str = game.get("size_str", "")
+            name = game.get("name", "")
+            if suffix in seen:
+                continue
+            seen.add(suffix)
+            old = stored.get(suffix)
+            if old is None:
+                facets = parse_facets(name)
+                game["added_at"] = added_at
+                game.update(zip(FACET_COLUMNS, facets))
+                diff.added.append(game)
+                inserts.append(
+                    (
+                        console_id,
+                        name,
+                        self._prefix_id(prefix, prefixes),
+                        suffix,
+                        size_bytes,
+                        size_str,
+                        added_at,
+                    )
+                    + facets
+                )
+                continue
+            row_id, old_name, old_prefix, old_size, old_size_str, old_added_at = old[:6]
+            facets = old[6:] if name == old_name else parse_facets(name)
+            game["added_at"] = old_added_at
+            game.update(zip(FACET_COLUMNS, facets))
+            if (old_name, old_prefix, old_size, old_size_str) != (
+                name,
+                prefix,
+                size_bytes,
+                size_str,
+            ):
+                diff.changed.append(
+                    (
+                        {
+                            "name": old_name,
+                            "link": old_prefix + suffix,
+                            "size_bytes": old_size,
+                            "size_str": old_size_str,
+                            "console": console_name,
+                        },
+                        game,
+                    )
+                )
+                updates.append(
+                    (
+                        name,
+                        self._prefix_id(prefix, prefixes),
+                        size_bytes,
+                        size_str,
+                    )
+                    + facets
+                    + (row_id,)
+                )
+
+        removed_ids = []
+        for suffix, (row_id, name, prefix, size, size_str, *_) in stored.items():
+            if suffix not in seen:
+                removed_ids.append((row_id,))
+                diff.removed.append(
+                    {
+                        "name": name,
+                        "link": prefix + suffix,
+                        "size_bytes": size,
+                        "size_str": size_str,
+                        "console": console_name,
+                    }
+                )
+
+        self._conn.executemany("DELETE FROM games WHERE id = ?", removed_ids)
+        self._conn.executemany(
+            """
+            UPDATE games SET name = ?, prefix_id = ?, size_bytes = ?, size_str = ?,
+                             regions = ?, languages = ?, flags = ?, revision = ?,
+                             disc = ?
+            WHERE id = ?
+            """,
+            updates,
+        )
+        self._conn.executemany(
+            """
+            INSERT INTO games (console_id, name, prefix_id, link_suffix,
+                               size_bytes, size_str, added_at, regions,
+                               languages, flags, revision, disc)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            inserts,
+        )
+        return diff
+
+    def touch(self, console_name, fetched_at):
+        """Updates only the fetch time of a console (the server answered 304)."""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "UPDATE consoles SET fetched_at = ? WHERE name = ?",
+                    (fetched_at, console_name),
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Errore aggiornamento catalogo '{console_name}': {e}")
+
+    def import_json_cache(self, console_name, path):
+        """
+        Migrates a legacy JSON cache file (a bare list, or the dict with
+        validators) into the store and removes it. Returns True on success.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Cache JSON illeggibile '{path}', ignorata: {e}")
+            return False
+        if isinstance(data, list):
+            data = {"games": data}
+        if self.save(console_name, data) is None:
+            return False
+        try:
+            os.remove(path)
+        except OSError as e:
+            logging.warning(f"Impossibile rimuovere la vecchia cache '{path}': {e}")
+        logging.info(f"Cache JSON di '{console_name}' migrata nel catalogo SQLite.")
+        return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_catalog_store():
+    """Returns the process-wide catalog store, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CatalogStore()
+        return _store
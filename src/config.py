@@ -272,6 +272,218 @@ def set_max_concurrent_downloads(value):
         )
 
 
+DOWNLOAD_SEGMENTS = int(settings.value("dl_segments", 1))
+SEGMENTED_MIN_SIZE = 64 * 1024 * 1024
+
+
+def set_download_segments(value):
+    """Sets the number of parallel connections per download and saves it to settings."""
+    global DOWNLOAD_SEGMENTS
+    try:
+        val_int = int(value)
+        if 1 <= val_int <= 16:
+            DOWNLOAD_SEGMENTS = val_int
+            settings.setValue("dl_segments", DOWNLOAD_SEGMENTS)
+            logging.info(f"Connessioni per download impostate a: {DOWNLOAD_SEGMENTS}")
+        else:
+            logging.warning(
+                f"Invalid value for download segments: {value}. Must be between 1 and 16."
+            )
+    except ValueError:
+        logging.error(f"Invalid non-integer value for download segments: {value}")
+
+
+DOWNLOAD_ENGINES = ("threads", "asyncio")
+DOWNLOAD_ENGINE = settings.value("download_engine", "threads")
+ASYNC_MAX_CONCURRENT_DOWNLOADS = int(settings.value("async_max_dl", 64))
+
+
+def set_download_engine(value):
+    """Selects the download engine ('threads' or 'asyncio') and saves it to settings."""
+    global DOWNLOAD_ENGINE
+    if value in DOWNLOAD_ENGINES:
+        DOWNLOAD_ENGINE = value
+        settings.setValue("download_engine", DOWNLOAD_ENGINE)
+        logging.info(f"Motore di download impostato su: {DOWNLOAD_ENGINE}")
+    else:
+        logging.warning(
+            f"Invalid download engine: {value}. Must be one of {DOWNLOAD_ENGINES}."
+        )
+
+
+def set_async_max_concurrent_downloads(value):
+    """Sets the concurrency of the asyncio engine and saves it to settings."""
+    global ASYNC_MAX_CONCURRENT_DOWNLOADS
+    try:
+        val_int = int(value)
+        if 1 <= val_int <= 500:
+            ASYNC_MAX_CONCURRENT_DOWNLOADS = val_int
+            settings.setValue("async_max_dl", ASYNC_MAX_CONCURRENT_DOWNLOADS)
+            logging.info(
+                f"Max download concorrenti (asyncio) impostato a: {ASYNC_MAX_CONCURRENT_DOWNLOADS}"
+            )
+        else:
+            logging.warning(
+                f"Invalid value for async concurrent downloads: {value}. Must be between 1 and 500."
+            )
+    except ValueError:
+        logging.error(
+            f"Invalid non-integer value for async concurrent downloads: {value}"
+        )
+
+
+HTTP_RETRIES = int(settings.value("http_retries", 3))
+HTTP_TIMEOUT = int(settings.value("http_timeout", 30))
+
+
+def set_http_retries(value):
+    """Sets how many times a failed HTTP request is retried and saves it to settings."""
+    global HTTP_RETRIES
+    try:
+        val_int = int(value)
+        if 0 <= val_int <= 10:
+            HTTP_RETRIES = val_int
+            settings.setValue("http_retries", HTTP_RETRIES)
+            logging.info(f"Tentativi HTTP impostati a: {HTTP_RETRIES}")
+        else:
+            logging.warning(
+                f"Invalid value for HTTP retries: {value}. Must be between 0 and 10."
+            )
+    except ValueError:
+        logging.error(f"Invalid non-integer value for HTTP retries: {value}")
+
+
+def set_http_timeout(value):
+    """Sets the default HTTP read timeout (seconds) and saves it to settings."""
+    global HTTP_TIMEOUT
+    try:
+        val_int = int(value)
+        if 5 <= val_int <= 300:
+            HTTP_TIMEOUT = val_int
+            settings.setValue("http_timeout", HTTP_TIMEOUT)
+            logging.info(f"Timeout HTTP impostato a: {HTTP_TIMEOUT}s")
+        else:
+            logging.warning(
+                f"Invalid value for HTTP timeout: {value}. Must be between 5 and 300."
+            )
+    except ValueError:
+        logging.error(f"Invalid non-integer value for HTTP timeout: {value}")
+
+
+# Bandwidth limits in KiB/s (0 = unlimited). The schedule replaces the global
+# limit between BANDWIDTH_SCHEDULE_START and BANDWIDTH_SCHEDULE_END ("HH:MM").
+BANDWIDTH_LIMIT_KBPS = int(settings.value("bw_limit", 0))
+BANDWIDTH_PER_JOB_KBPS = int(settings.value("bw_per_job", 0))
+BANDWIDTH_SCHEDULE_ENABLED = settings.value("bw_schedule_enabled", False, type=bool)
+BANDWIDTH_SCHEDULE_START = settings.value("bw_schedule_start", "08:00")
+BANDWIDTH_SCHEDULE_END = settings.value("bw_schedule_end", "20:00")
+BANDWIDTH_SCHEDULE_LIMIT_KBPS = int(settings.value("bw_schedule_limit", 0))
+
+
+def _parse_kbps(value, label):
+    val_int = int(value)
+    if not 0 <= val_int <= 10_000_000:
+        raise ValueError(f"Invalid value for {label}: {value}. Must be >= 0.")
+    return val_int
+
+
+def set_bandwidth_limit(value):
+    """Sets the global bandwidth cap (KiB/s, 0 = unlimited) and saves it to settings."""
+    global BANDWIDTH_LIMIT_KBPS
+    try:
+        BANDWIDTH_LIMIT_KBPS = _parse_kbps(value, "bandwidth limit")
+        settings.setValue("bw_limit", BANDWIDTH_LIMIT_KBPS)
+        logging.info(
+            f"Limite di banda globale impostato a: {BANDWIDTH_LIMIT_KBPS} KiB/s"
+        )
+    except ValueError as e:
+        logging.error(str(e))
+
+
+def set_bandwidth_per_job(value):
+    """Sets the per-download bandwidth cap (KiB/s, 0 = unlimited) and saves it to settings."""
+    global BANDWIDTH_PER_JOB_KBPS
+    try:
+        BANDWIDTH_PER_JOB_KBPS = _parse_kbps(value, "per-job bandwidth limit")
+        settings.setValue("bw_per_job", BANDWIDTH_PER_JOB_KBPS)
+        logging.info(
+            f"Limite di banda per download impostato a: {BANDWIDTH_PER_JOB_KBPS} KiB/s"
+        )
+    except ValueError as e:
+        logging.error(str(e))
+
+
+def set_bandwidth_schedule(enabled, start, end, limit_kbps):
+    """
+    Sets the time-of-day bandwidth schedule and saves it to settings.
+    start/end are "HH:MM" strings; the window may cross midnight.
+    """
+    global BANDWIDTH_SCHEDULE_ENABLED, BANDWIDTH_SCHEDULE_START
+    global BANDWIDTH_SCHEDULE_END, BANDWIDTH_SCHEDULE_LIMIT_KBPS
+    try:
+        limit = _parse_kbps(limit_kbps, "scheduled bandwidth limit")
+        for value in (start, end):
+            hours, minutes = (int(part) for part in value.split(":"))
+            if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+                raise ValueError(f"Invalid schedule time: {value}")
+    except (ValueError, AttributeError) as e:
+        logging.error(f"Invalid bandwidth schedule: {e}")
+        return
+    BANDWIDTH_SCHEDULE_ENABLED = bool(enabled)
+    BANDWIDTH_SCHEDULE_START = start
+    BANDWIDTH_SCHEDULE_END = end
+    BANDWIDTH_SCHEDULE_LIMIT_KBPS = limit
+    settings.setValue("bw_schedule_enabled", BANDWIDTH_SCHEDULE_ENABLED)
+    settings.setValue("bw_schedule_start", start)
+    settings.setValue("bw_schedule_end", end)
+    settings.setValue("bw_schedule_limit", limit)
+    logging.info(
+        f"Programmazione banda: {'attiva' if enabled else 'disattiva'}, "
+        f"{start}-{end} a {limit} KiB/s"
+    )
+
+
+# How long a console catalog is served from cache before it is revalidated.
+# Per-console overrides are stored as "catalog_ttl/<console>" (0 = use default).
+CATALOG_TTL_HOURS = int(settings.value("catalog_ttl_hours", 24))
+
+
+def get_catalog_ttl(console_name=None):
+    """Returns the catalog cache TTL in seconds for a console."""
+    hours = CATALOG_TTL_HOURS
+    if console_name:
+        override = int(settings.value(f"catalog_ttl/{console_name}", 0))
+        if override > 0:
+            hours = override
+    return hours * 3600
+
+
+def set_catalog_ttl(value, console_name=None):
+    """
+    Sets the catalog cache TTL in hours and saves it to settings.
+    With console_name, sets that console's override (0 removes it).
+    """
+    global CATALOG_TTL_HOURS
+    try:
+        val_int = int(value)
+    except ValueError:
+        logging.error(f"Invalid non-integer value for catalog TTL: {value}")
+        return
+    if not 0 <= val_int <= 24 * 365:
+        logging.warning(f"Invalid value for catalog TTL: {value} hours.")
+        return
+    if console_name:
+        if val_int > 0:
+            settings.setValue(f"catalog_ttl/{console_name}", val_int)
+        else:
+            settings.remove(f"catalog_ttl/{console_name}")
+        logging.info(f"TTL catalogo per '{console_name}' impostato a: {val_int} ore")
+    elif val_int > 0:
+        CATALOG_TTL_HOURS = val_int
+        settings.setValue("catalog_ttl_hours", CATALOG_TTL_HOURS)
+        logging.info(f"TTL catalogo impostato a: {CATALOG_TTL_HOURS} ore")
+
+
 def add_console(name, link):
     """
     Adds or updates a console entry in the CONSOLES dictionary.
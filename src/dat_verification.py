@@ -0,0 +1,302 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import xml.etree.ElementTree as ET
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import USER_DATA_DIR
+
+DAT_INDEX_PATH = os.path.join(USER_DATA_DIR, "dat_index.json")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+VERDICT_OK = "ok"
+VERDICT_MISMATCH = "mismatch"
+VERDICT_UNKNOWN = "unknown"
+
+
+class IntegrityError(Exception):
+    """Raised when a downloaded file does not match its DAT entry."""
+
+
+class StreamingHasher:
+    """Computes CRC32 and SHA1 incrementally, one chunk at a time."""
+
+    def __init__(self):
+        self._crc = 0
+        self._sha1 = hashlib.sha1()
+        self.size = 0
+
+    def update(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._sha1.update(data)
+        self.size += len(data)
+
+    def update_from_file(self, path, length, start=0):
+        """
+        Feeds length bytes of path from offset start (e.g. the part of a
+        resumed partial file already on disk).
+        """
+        with open(path, "rb") as f:
+            f.seek(start)
+            while length > 0:
+                data = f.read(min(HASH_CHUNK_SIZE, length))
+                if not data:
+                    break
+                self.update(data)
+                length -= len(data)
+
+    @property
+    def crc32(self):
+        return f"{self._crc & 0xFFFFFFFF:08x}"
+
+    @property
+    def sha1(self):
+        return self._sha1.hexdigest()
+
+
+def hash_file(path):
+    """Returns (path, size, crc32, sha1) of a file."""
+    hasher = StreamingHasher()
+    try:
+        hasher.update_from_file(path, os.path.getsize(path))
+    except OSError as e:
+        logging.error(f"Impossibile calcolare l'hash di '{path}': {e}")
+        return path, None, None, None
+    return path, hasher.size, hasher.crc32, hasher.sha1
+
+
+def _open_dat(path):
+    """Opens a DAT file, or the first .dat/.xml inside a zip (No-Intro ships them zipped)."""
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        for name in archive.namelist():
+            if name.lower().endswith((".dat", ".xml")):
+                return archive.open(name)
+        archive.close()
+        raise ValueError(f"Nessun file DAT trovato in '{path}'")
+    return open(path, "rb")
+
+
+def parse_dat(path):
+    """
+    Parses a Logiqx XML DAT (the format used by No-Intro and Redump) and yields
+    a dict per <rom> entry: name, game, size, crc, sha1.
+    The file is read incrementally, so large Redump DATs are not loaded whole.
+    """
+    with _open_dat(path) as f:
+        for _, element in ET.iterparse(f, events=("end",)):
+            if element.tag != "game" and element.tag != "machine":
+                continue
+            game_name = element.get("name", "")
+            for rom in element.iter("rom"):
+                name = rom.get("name")
+                if not name:
+                    continue
+                yield {
+                    "name": name,
+                    "game": game_name,
+                    "size": int(rom.get("size", 0) or 0),
+                    "crc": (rom.get("crc") or "").lower(),
+                    "sha1": (rom.get("sha1") or "").lower(),
+                }
+            element.clear()
+
+
+class DatIndex:
+    """
+    Index of imported DAT entries, keyed by file name (case-insensitive) with
+    a secondary SHA1 index to recognise renamed files. Persisted as JSON in
+    the user data directory.
+    """
+
+    def __init__(self, path=DAT_INDEX_PATH):
+        self.path = path
+        self.entries = {}
+        self.by_sha1 = {}
+        self.dats = []
+        self._lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = data.get("entries", {})
+            self.dats = data.get("dats", [])
+        except Exception as e:
+            logging.error(f"Impossibile caricare l'indice DAT '{self.path}': {e}")
+            self.entries = {}
+            self.dats = []
+        self.by_sha1 = {
+            entry[2]: name for name, entry in self.entries.items() if entry[2]
+        }
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"dats": self.dats, "entries": self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"Impossibile salvare l'indice DAT '{self.path}': {e}")
+
+    def import_dat(self, dat_path):
+        """Adds every ROM of a DAT file to the index. Returns the number of entries read."""
+        count = 0
+        with self._lock:
+            for rom in parse_dat(dat_path):
+                key = os.path.basename(rom["name"]).lower()
+                self.entries[key] = [rom["size"], rom["crc"], rom["sha1"]]
+                if rom["sha1"]:
+                    self.by_sha1[rom["sha1"]] = key
+                count += 1
+            dat_name = os.path.basename(dat_path)
+            if dat_name not in self.dats:
+                self.dats.append(dat_name)
+            self.save()
+        logging.info(f"Importato DAT '{dat_path}': {count} voci.")
+        return count
+
+    def verify(self, name, size, crc32=None, sha1=None):
+        """
+        Checks a file against the index. Returns VERDICT_OK, VERDICT_MISMATCH,
+        or VERDICT_UNKNOWN if the file name is not in any imported DAT (and its
+        SHA1 does not identify it either).
+        """
+        entry = self.entries.get(os.path.basename(name).lower())
+        if entry is None:
+            if sha1 and sha1 in self.by_sha1:
+                return VERDICT_OK
+            return VERDICT_UNKNOWN
+        expected_size, expected_crc, expected_sha1 = entry
+        if expected_size and size != expected_size:
+            return VERDICT_MISMATCH
+        if crc32 and expected_crc and crc32 != expected_crc:
+            return VERDICT_MISMATCH
+        if sha1 and expected_sha1 and sha1 != expected_sha1:
+            return VERDICT_MISMATCH
+        return VERDICT_OK
+
+
+def verify_zip_members(zip_path, index):
+    """
+    Verifies every member of a zip against the index using the CRC32 and size
+    stored in the archive's central directory, without decompressing it. The
+    member data itself is CRC-checked by zipfile when the archive is extracted.
+    Returns a list of (member name, verdict).
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        return [
+            (
+                info.filename,
+                index.verify(info.filename, info.file_size, f"{info.CRC:08x}"),
+            )
+            for info in archive.infolist()
+            if not info.is_dir()
+        ]
+
+
+def verify_download(path, name, hasher=None):
+    """
+    Verifies a completed download against the imported DATs. Zips are checked
+    member by member; other files use the hashes computed while downloading,
+    or are hashed now if none are available.
+    Raises IntegrityError on a mismatch. Returns the list of (name, verdict).
+    """
+    index = get_dat_index()
+    if not len(index):
+        return []
+    if name.lower().endswith(".zip"):
+        try:
+            results = verify_zip_members(path, index)
+        except zipfile.BadZipFile as e:
+            raise IntegrityError(f"Archivio corrotto '{name}': {e}")
+    else:
+        if hasher is None:
+            _, size, crc32, sha1 = hash_file(path)
+        else:
+            size, crc32, sha1 = hasher.size, hasher.crc32, hasher.sha1
+        results = [(name, index.verify(name, size, crc32, sha1))]
+
+    bad = [member for member, verdict in results if verdict == VERDICT_MISMATCH]
+    if bad:
+        raise IntegrityError(f"Hash non corrispondente al DAT: {', '.join(bad)}")
+    return results
+
+
+def verify_file(path):
+    """
+    Verifies one library file against the DAT index and returns (path, verdict).
+    Zips are fully read with testzip() so member data is CRC-checked too.
+    Runs on verify_library's thread pool, sharing the process-wide index.
+    """
+    index = get_dat_index()
+    name = os.path.basename(path)
+    try:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                if archive.testzip() is not None:
+                    return path, VERDICT_MISMATCH
+            verdicts = [verdict for _, verdict in verify_zip_members(path, index)]
+            if VERDICT_MISMATCH in verdicts:
+                return path, VERDICT_MISMATCH
+            if verdicts and all(verdict == VERDICT_OK for verdict in verdicts):
+                return path, VERDICT_OK
+            return path, VERDICT_UNKNOWN
+        if index.verify(name, os.path.getsize(path)) == VERDICT_UNKNOWN:
+            return path, VERDICT_UNKNOWN
+        _, size, crc32, sha1 = hash_file(path)
+        if size is None:
+            return path, VERDICT_UNKNOWN
+        return path, index.verify(name, size, crc32, sha1)
+    except (OSError, zipfile.BadZipFile) as e:
+        logging.warning(f"Verifica fallita per '{path}': {e}")
+        return path, VERDICT_MISMATCH
+
+
+def verify_library(folder, max_workers=None, progress_callback=None):
+    """
+    Verifies every file under folder with a thread pool (one hashing thread
+    per core: zlib and hashlib release the GIL on large buffers, and threads
+    need no extra process, which would re-run a frozen app's entry point).
+    Returns a dict {verdict: [paths]}.
+    """
+    paths = []
+    for root, _, files in os.walk(folder):
+        for file in files:
+            if file.startswith(".") or file.endswith((".part", ".json", ".tmp")):
+                continue
+            paths.append(os.path.join(root, file))
+
+    results = {VERDICT_OK: [], VERDICT_MISMATCH: [], VERDICT_UNKNOWN: []}
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        for done, (path, verdict) in enumerate(
+            executor.map(verify_file, paths), start=1
+        ):
+            results[verdict].append(path)
+            if progress_callback:
+                progress_callback(done, len(paths))
+    return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_dat_index():
+    """Returns the process-wide DAT index, loading it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DatIndex()
+        return _index
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from src.config import USER_DATA_DIR
+
+JOURNAL_PATH = os.path.join(USER_DATA_DIR, "download_queue.sqlite3")
+
+STATE_PENDING = "pending"
+STATE_ACTIVE = "active"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+
+class DownloadJournal:
+    """
+    Crash-safe journal of the download queue, stored in SQLite (WAL mode).
+    Every queued game is a row with its state (pending/active/done/failed),
+    bytes written and retry count, so the queue survives quits and crashes.
+    Safe to use from the GUI thread and from download threads.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    name TEXT PRIMARY KEY,
+                    game TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    bytes_written INTEGER NOT NULL DEFAULT 0,
+                    retry_count INTEGER NOT NULL DEFAULT 0,
+                    local_file TEXT,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )
+                """)
+
+    def _execute(self, query, params=()):
+        try:
+            with self._lock, self._conn:
+                return self._conn.execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Errore journal coda download ({self.path}): {e}")
+            return []
+
+    def add(self, game):
+        """Adds (or re-queues) a game as pending at the end of the queue."""
+        self._execute(
+            """
+            INSERT OR REPLACE INTO jobs (name, game, state, position, updated_at)
+            VALUES (?, ?, ?, (SELECT COALESCE(MAX(position), 0) + 1 FROM jobs), ?)
+            """,
+            (game["name"], json.dumps(game), STATE_PENDING, time.time()),
+        )
+
+    def remove(self, name):
+        self._execute("DELETE FROM jobs WHERE name = ?", (name,))
+
+    def set_state(self, name, state, local_file=None, error=None):
+        self._execute(
+            """
+            UPDATE jobs SET state = ?, local_file = COALESCE(?, local_file),
+                error = ?, updated_at = ?
+            WHERE name = ?
+            """,
+            (state, local_file, error, time.time(), name),
+        )
+
+    def update_bytes(self, name, bytes_written):
+        self._execute(
+            "UPDATE jobs SET bytes_written = ?, updated_at = ? WHERE name = ?",
+            (bytes_written, time.time(), name),
+        )
+
+    def increment_retry(self, name):
+        self._execute(
+            "UPDATE jobs SET retry_count = retry_count + 1, updated_at = ? WHERE name = ?",
+            (time.time(), name),
+        )
+
+    def get_jobs(self, states):
+        """Returns the journaled jobs in the given states, in queue order."""
+        placeholders = ",".join("?" for _ in states)
+        rows = self._execute(
+            f"""
+            SELECT name, game, state, bytes_written, retry_count, local_file, error
+            FROM jobs WHERE state IN ({placeholders}) ORDER BY position
+            """,
+            tuple(states),
+        )
+        jobs = []
+        for name, game, state, bytes_written, retry_count, local_file, error in rows:
+            try:
+                game_data = json.loads(game)
+            except json.JSONDecodeError:
+                logging.warning(f"Voce journal corrotta per '{name}', ignorata.")
+                continue
+            jobs.append(
+                {
+                    "name": name,
+                    "game": game_data,
+                    "state": state,
+                    "bytes_written": bytes_written,
+                    "retry_count": retry_count,
+                    "local_file": local_file,
+                    "error": error,
+                }
+            )
+        return jobs
+
+    def restore_pending(self):
+        """
+        Returns the games that were queued or downloading when the app stopped.
+        Interrupted (active) jobs are put back to pending: their .part files
+        let the next run resume from the last offset.
+        """
+        self._execute(
+            "UPDATE jobs SET state = ? WHERE state = ?", (STATE_PENDING, STATE_ACTIVE)
+        )
+        return [job["game"] for job in self.get_jobs([STATE_PENDING])]
+
+    def clear_unfinished(self):
+        """Drops pending and active jobs (the user cancelled the queue)."""
+        self._execute(
+            "DELETE FROM jobs WHERE state IN (?, ?)", (STATE_PENDING, STATE_ACTIVE)
+        )
+
+    def prune_finished(self, max_age_days=30):
+        """Forgets completed jobs older than max_age_days."""
+        cutoff = time.time() - max_age_days * 86400
+        self._execute(
+            "DELETE FROM jobs WHERE state = ? AND updated_at < ?", (STATE_DONE, cutoff)
+        )
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_download_journal():
+    """Returns the process-wide journal, opening it on first use."""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = DownloadJournal()
+            _journal.prune_finished()
+        return _journal
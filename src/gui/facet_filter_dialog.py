@@ -0,0 +1,161 @@
+from PySide6.QtCore import Signal
+from PySide6.QtWidgets import (
+    QCheckBox,
+    QDialog,
+    QGridLayout,
+    QGroupBox,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QScrollArea,
+    QVBoxLayout,
+    QWidget,
+)
+
+from src.catalog_facets import (
+    FACET_FLAGS,
+    FACET_LANGUAGES,
+    FACET_REGIONS,
+    FACET_SIZES,
+    FLAG_LABELS,
+    LANGUAGES,
+    REGIONS,
+    SIZE_BUCKET_LABELS,
+    FacetFilter,
+)
+
+_GRID_COLUMNS = 3
+
+
+class FacetFilterDialog(QDialog):
+    """
+    Non-modal dialog combining the facet filters of the games table: regions,
+    languages and sizes are ORed within their group, checked flags are
+    excluded. Every change is applied at once through filter_changed, and
+    update_counts() shows how many games of the current search each value
+    matches. Regions and languages with no games are hidden.
+    """
+
+    filter_changed = Signal(object)
+
+    def __init__(self, facet_filter=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Filtri Giochi")
+        self.setMinimumWidth(520)
+        facet_filter = facet_filter or FacetFilter()
+        self._counts = {}
+
+        main_layout = QVBoxLayout(self)
+        scroll = QScrollArea(self)
+        scroll.setWidgetResizable(True)
+        content = QWidget()
+        layout = QVBoxLayout(content)
+
+        self.region_checks = self._add_group(
+            layout, "Regioni (almeno una)", REGIONS, facet_filter.regions
+        )
+        self.language_checks = self._add_group(
+            layout, "Lingue (almeno una)", LANGUAGES, facet_filter.languages
+        )
+        self.flag_checks = self._add_group(
+            layout,
+            "Escludi",
+            list(FLAG_LABELS.values()),
+            facet_filter.exclude_flags,
+            bits=list(FLAG_LABELS),
+        )
+        self.size_checks = self._add_group(
+            layout, "Dimensione", SIZE_BUCKET_LABELS, facet_filter.size_buckets
+        )
+        layout.addStretch()
+        scroll.setWidget(content)
+        main_layout.addWidget(scroll)
+
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        main_layout.addWidget(self.summary_label)
+
+        buttons = QHBoxLayout()
+        btn_reset = QPushButton("Azzera filtri")
+        btn_reset.clicked.connect(self.reset_filters)
+        buttons.addWidget(btn_reset)
+        buttons.addStretch()
+        btn_close = QPushButton("Chiudi")
+        btn_close.clicked.connect(self.close)
+        buttons.addWidget(btn_close)
+        main_layout.addLayout(buttons)
+
+        self._update_labels()
+
+    def _add_group(self, layout, title, labels, selected_mask, bits=None):
+        """Adds a group of checkboxes; returns [(bit, label, checkbox)]."""
+        group = QGroupBox(title)
+        grid = QGridLayout(group)
+        checks = []
+        for i, label in enumerate(labels):
+            bit = bits[i] if bits else 1 << i
+            check = QCheckBox(label)
+            check.setChecked(bool(selected_mask & bit))
+            check.toggled.connect(self._on_toggled)
+            grid.addWidget(check, i // _GRID_COLUMNS, i % _GRID_COLUMNS)
+            checks.append((bit, label, check))
+        layout.addWidget(group)
+        return checks
+
+    @staticmethod
+    def _mask(checks):
+        mask = 0
+        for bit, _, check in checks:
+            if check.isChecked():
+                mask |= bit
+        return mask
+
+    def facet_filter(self):
+        """Returns the FacetFilter for the current selection."""
+        return FacetFilter(
+            regions=self._mask(self.region_checks),
+            languages=self._mask(self.language_checks),
+            exclude_flags=self._mask(self.flag_checks),
+            size_buckets=self._mask(self.size_checks),
+        )
+
+    def _on_toggled(self, checked):
+        facet_filter = self.facet_filter()
+        self.summary_label.setText(f"Filtri attivi: {facet_filter.describe()}")
+        self.filter_changed.emit(facet_filter)
+
+    def reset_filters(self):
+        for checks in (
+            self.region_checks,
+            self.language_checks,
+            self.flag_checks,
+            self.size_checks,
+        ):
+            for _, _, check in checks:
+                check.blockSignals(True)
+                check.setChecked(False)
+                check.blockSignals(False)
+        self._on_toggled(False)
+
+    def update_counts(self, counts):
+        """Shows the facet counts ({group: {bit: count}}) of the latest search."""
+        self._counts = counts
+        self._update_labels()
+
+    def _update_labels(self):
+        self.summary_label.setText(f"Filtri attivi: {self.facet_filter().describe()}")
+        for group, checks, hide_empty in (
+            (FACET_REGIONS, self.region_checks, True),
+            (FACET_LANGUAGES, self.language_checks, True),
+            (FACET_FLAGS, self.flag_checks, False),
+            (FACET_SIZES, self.size_checks, False),
+        ):
+            group_counts = self._counts.get(group)
+            for bit, label, check in checks:
+                if group_counts is None:
+                    check.setText(label)
+                    continue
+                count = group_counts.get(bit, 0)
+                check.setText(f"{label} ({count})")
+                if hide_empty:
+                    check.setVisible(bool(count) or check.isChecked())
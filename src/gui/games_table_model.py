@@ -0,0 +1,181 @@
+import time
+
+from PySide6.QtCore import (
+    QAbstractTableModel,
+    QCoreApplication,
+    QModelIndex,
+    Qt,
+    QThread,
+    Signal,
+)
+from PySide6.QtGui import QFont
+
+from src.catalog_facets import FacetFilter
+from src.catalog_store import is_new_game
+from src.workers.search_worker import SORT_NAME, SORT_SIZE, SearchWorker
+
+COLUMN_NAME = 0
+COLUMN_SIZE = 1
+
+# Pause in typing after which the search bar applies its filter.
+SEARCH_DEBOUNCE_MS = 150
+
+_SORT_KEYS = {COLUMN_NAME: SORT_NAME, COLUMN_SIZE: SORT_SIZE}
+
+
+class GamesTableModel(QAbstractTableModel):
+    """
+    Table model for the games of the selected console. It keeps a reference
+    to the catalog list and a list of indices of the rows that pass the
+    current filter, in the current sort order, and the view asks data() for
+    the visible rows only.
+
+    Filtering and sorting run on a SearchWorker in a background thread, which
+    also builds the catalog's SearchIndex ("term*" is a word prefix query; in
+    fuzzy mode rows come ranked by similarity until a column is sorted).
+    Each request gets a new generation number and results of older ones are
+    dropped; the first chunk of results resets the view and the rest are
+    appended. The size column sorts on the raw size_bytes. facet_counts
+    relays the facet counts of each search, for the filters dialog.
+    """
+
+    HEADERS = ("Nome Gioco", "Peso")
+
+    search_finished = Signal(int)
+    facet_counts = Signal(object)
+    _catalog_changed = Signal(object)
+    _search_requested = Signal(int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._games = []
+        self._rows = []
+        self._search_terms = []
+        self._facet_filter = FacetFilter()
+        self._fuzzy = False
+        self._sort_column = None
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._generation = 0
+        self._now = time.time()
+        self._bold_font = QFont()
+        self._bold_font.setBold(True)
+
+        self._search_thread = QThread(self)
+        self._search_worker = SearchWorker()
+        self._search_worker.moveToThread(self._search_thread)
+        self._catalog_changed.connect(self._search_worker.set_catalog)
+        self._search_requested.connect(self._search_worker.search)
+        self._search_worker.results.connect(self._on_search_results)
+        self._search_worker.facet_counts.connect(self._on_facet_counts)
+        self._search_thread.finished.connect(self._search_worker.deleteLater)
+        self._search_thread.start()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def shutdown(self):
+        """Stops the search thread (called when the application quits)."""
+        if self._search_thread.isRunning():
+            self._search_worker.latest_generation = -1
+            self._search_thread.quit()
+            self._search_thread.wait()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (
+            role == Qt.ItemDataRole.DisplayRole
+            and orientation == Qt.Orientation.Horizontal
+        ):
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        game = self._games[self._rows[index.row()]]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == COLUMN_NAME:
+                return game.get("name", "N/A")
+            return game.get("size_str", "0 B")
+        if role == Qt.ItemDataRole.TextAlignmentRole and column == COLUMN_SIZE:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        if role == Qt.ItemDataRole.UserRole:
+            return game
+        if column == COLUMN_NAME and is_new_game(game, self._now):
+            if role == Qt.ItemDataRole.FontRole:
+                return self._bold_font
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return "Aggiunto di recente al catalogo"
+        return None
+
+    def game_at(self, row):
+        """Returns the game dict shown at a view row, or None."""
+        if 0 <= row < len(self._rows):
+            return self._games[self._rows[row]]
+        return None
+
+    def set_games(self, games):
+        """Replaces the catalog; the current filter and sort order are kept."""
+        self.beginResetModel()
+        self._games = games
+        self._rows = []
+        self._now = time.time()
+        self.endResetModel()
+        self._catalog_changed.emit(games)
+        self._request_search()
+
+    def set_filter(self, search_terms, facet_filter=None, fuzzy=False):
+        """
+        Shows only games whose name contains every search term and that pass
+        the FacetFilter, if given. With fuzzy, shows the best approximate
+        matches instead.
+        """
+        self._search_terms = list(search_terms)
+        self._facet_filter = facet_filter or FacetFilter()
+        self._fuzzy = fuzzy
+        self._request_search()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # -1 clears the sort indicator: back to catalog (or ranking) order.
+        self._sort_column = column if column >= 0 else None
+        self._sort_order = order
+        self._request_search()
+
+    def _request_search(self):
+        self._generation += 1
+        self._search_worker.latest_generation = self._generation
+        self._search_requested.emit(
+            self._generation,
+            (
+                self._search_terms,
+                self._facet_filter,
+                self._fuzzy,
+                _SORT_KEYS.get(self._sort_column),
+                self._sort_order == Qt.SortOrder.DescendingOrder,
+            ),
+        )
+
+    def _on_facet_counts(self, generation, counts):
+        if generation == self._generation:
+            self.facet_counts.emit(counts)
+
+    def _on_search_results(self, generation, rows, first, last):
+        if generation != self._generation:
+            return
+        if first:
+            self.beginResetModel()
+            self._rows = list(rows)
+            self.endResetModel()
+        elif rows:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+        if last:
+            self.search_finished.emit(len(self._rows))
@@ -3,7 +3,7 @@ import os
 import subprocess
 from datetime import datetime, timezone
 
-from PySide6.QtCore import QSize, Qt
+from PySide6.QtCore import QSize, Qt, QThread
 from PySide6.QtGui import QIcon, QPixmap
 from PySide6.QtWidgets import (
     QApplication,
@@ -12,6 +12,7 @@ from PySide6.QtWidgets import (
     QHeaderView,
     QLabel,
     QMessageBox,
+    QProgressBar,
     QPushButton,
     QTreeWidget,
     QTreeWidgetItem,
@@ -29,16 +30,18 @@ from src.config import (
     USER_DOWNLOADS_FOLDER,
     settings,
 )
+from src.dat_verification import VERDICT_MISMATCH, VERDICT_OK, get_dat_index
 from src.gui.game_info_dialog import GameInfoDialog
 from src.metadata_manager import (
     create_placeholder_metadata,
     delete_metadata_and_cover,
-    download_cover,
     load_metadata,
     save_metadata,
 )
-from src.scraping import fetch_game_details
 from src.utils import clean_rom_title, create_default_core_config, find_retroarch
+from src.workers.download_worker import PART_SUFFIX, RESUME_STATE_SUFFIX
+from src.workers.metadata_enrichment import MetadataEnrichmentManager
+from src.workers.verify_worker import VerifyWorker
 
 
 class LibraryPage(QWidget):
@@ -46,6 +49,16 @@ class LibraryPage(QWidget):
         super().__init__(parent)
         self.library_files = []
         self.library_data = {}
+        self.library_items = {}
+        self.pending_metadata = set()
+        self.verify_thread = None
+        self.metadata_manager = MetadataEnrichmentManager(parent=self)
+        self.metadata_manager.item_enriched.connect(self.on_metadata_enriched)
+        self.metadata_manager.progress.connect(self.on_metadata_progress)
+        self.metadata_manager.finished.connect(self.on_metadata_finished)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.metadata_manager.cancel)
         self.init_ui()
         self.load_library()
 
@@ -77,8 +90,31 @@ class LibraryPage(QWidget):
         )
         self.refresh_library_btn.clicked.connect(self.refresh_library)
         top_layout.addWidget(self.refresh_library_btn)
+
+        self.verify_library_btn = QPushButton(
+            QIcon.fromTheme("dialog-ok"), " Verifica DAT"
+        )
+        self.verify_library_btn.setToolTip(
+            "Verifica i file della libreria con i DAT No-Intro/Redump importati."
+        )
+        self.verify_library_btn.clicked.connect(self.verify_library)
+        top_layout.addWidget(self.verify_library_btn)
         layout.addLayout(top_layout)
 
+        metadata_layout = QHBoxLayout()
+        self.metadata_progress = QProgressBar()
+        self.metadata_progress.setFormat("Ricerca metadati: %v/%m")
+        self.metadata_progress.setVisible(False)
+        metadata_layout.addWidget(self.metadata_progress)
+        self.cancel_metadata_btn = QPushButton("Annulla")
+        self.cancel_metadata_btn.setToolTip(
+            "Interrompe la ricerca dei metadati mancanti; riprenderà al prossimo aggiornamento."
+        )
+        self.cancel_metadata_btn.clicked.connect(self.metadata_manager.cancel)
+        self.cancel_metadata_btn.setVisible(False)
+        metadata_layout.addWidget(self.cancel_metadata_btn)
+        layout.addLayout(metadata_layout)
+
         self.library_tree_widget = QTreeWidget()
         self.library_tree_widget.setObjectName("LibraryTree")
         self.library_tree_widget.setHeaderLabels(
@@ -111,6 +147,9 @@ class LibraryPage(QWidget):
         self.library_tree_widget.clear()
         self.library_files.clear()
         self.library_data.clear()
+        self.library_items.clear()
+        self.pending_metadata.clear()
+        missing_metadata = []
         files_by_console_temp = {}
 
         try:
@@ -136,7 +175,9 @@ class LibraryPage(QWidget):
                     files_by_console_temp[console_name] = []
 
                 for file in files:
-                    if file.startswith("."):
+                    if file.startswith(".") or file.endswith(
+                        (PART_SUFFIX, RESUME_STATE_SUFFIX)
+                    ):
                         continue
 
                     full_path = os.path.join(root, file)
@@ -149,54 +190,11 @@ class LibraryPage(QWidget):
 
                     if not game_data:
                         logging.info(
-                            f"Metadati mancanti per '{file}'. Tentativo di scraping/creazione..."
-                        )
-
-                        scraped_api_data = fetch_game_details(
-                            os.path.basename(full_path), console_name
+                            f"Metadati mancanti per '{file}', ricerca in background."
                         )
                         game_data = create_placeholder_metadata(full_path, console_name)
-
-                        if scraped_api_data:
-                            logging.debug(
-                                f"Dati API trovati per {file}: {scraped_api_data.get('api_title')}"
-                            )
-                            if (
-                                scraped_api_data.get("api_title")
-                                and scraped_api_data.get("api_title")
-                                != game_data["title"]
-                            ):
-                                game_data["title"] = scraped_api_data["api_title"]
-                            game_data["description"] = scraped_api_data.get(
-                                "description", game_data["description"]
-                            )
-                            game_data["release_date"] = scraped_api_data.get(
-                                "release_date", game_data["release_date"]
-                            )
-                            game_data["genres"] = scraped_api_data.get(
-                                "genres", game_data["genres"]
-                            )
-                            game_data["languages"] = scraped_api_data.get(
-                                "languages", game_data["languages"]
-                            )
-                            game_data["scrape_success"] = True
-
-                            cover_url = scraped_api_data.get("cover_url")
-                            if cover_url:
-                                local_cover_path = download_cover(cover_url, full_path)
-                                if local_cover_path:
-                                    game_data["cover_path"] = local_cover_path
-                                else:
-                                    logging.warning(
-                                        f"Download copertina fallito per {file} da {cover_url}"
-                                    )
-                        else:
-                            logging.info(
-                                f"Nessun dato API trovato per {file}, creato placeholder."
-                            )
-
-                        if not save_metadata(full_path, game_data):
-                            logging.error(f"Salvataggio metadati fallito per {file}")
+                        self.pending_metadata.add(full_path)
+                        missing_metadata.append((full_path, console_name))
                     else:
                         if game_data.get("rom_path") != full_path:
                             logging.info(
@@ -241,56 +239,162 @@ class LibraryPage(QWidget):
                 )
 
                 for game_data in sorted_games:
-                    child_item = QTreeWidgetItem(top_item)
-
-                    cover_path = game_data.get("cover_path")
-                    icon = QIcon()
-                    if cover_path and os.path.exists(cover_path):
-                        loaded_pixmap = QPixmap(cover_path)
-                        if not loaded_pixmap.isNull():
-                            icon = QIcon(loaded_pixmap)
-                        else:
-                            logging.warning(
-                                f"Impossibile caricare pixmap copertina: {cover_path}"
-                            )
-
-                    child_item.setIcon(0, icon)
-                    child_item.setSizeHint(0, QSize(68, 68))
+                    self._add_game_item(top_item, game_data)
 
-                    title_text = game_data.get("title", "Titolo Sconosciuto")
-                    child_item.setText(1, title_text)
-                    child_item.setData(1, Qt.ItemDataRole.UserRole, game_data)
-                    tooltip_text = (
-                        f"Console: {game_data.get('console', 'N/D')}\n"
-                        f"File: {game_data.get('original_filename', 'N/D')}\n"
-                        f"Percorso: {game_data.get('rom_path')}"
-                    )
-                    child_item.setToolTip(1, tooltip_text)
+        self.metadata_manager.enrich(missing_metadata)
+        logging.info("Caricamento libreria e popolamento UI completato.")
 
-                    child_item.setText(2, game_data.get("release_date", "N/D"))
+    def _add_game_item(self, top_item, game_data):
+        child_item = QTreeWidgetItem(top_item)
+        rom_path = game_data.get("rom_path")
+        self.library_items[rom_path] = child_item
 
-                    action_widget = QWidget()
-                    action_layout = QHBoxLayout(action_widget)
-                    action_layout.setContentsMargins(2, 2, 2, 2)
-                    action_layout.setSpacing(5)
+        cover_path = game_data.get("cover_path")
+        icon = QIcon()
+        if cover_path and os.path.exists(cover_path):
+            loaded_pixmap = QPixmap(cover_path)
+            if not loaded_pixmap.isNull():
+                icon = QIcon(loaded_pixmap)
+            else:
+                logging.warning(f"Impossibile caricare pixmap copertina: {cover_path}")
 
-                    launch_button = QPushButton(
-                        QIcon.fromTheme("media-playback-start"), "Avvia"
-                    )
-                    launch_button.setProperty("rom_path", game_data.get("rom_path"))
-                    launch_button.setProperty("console_name", game_data.get("console"))
-                    launch_button.clicked.connect(self.handle_launch_button)
-                    action_layout.addWidget(launch_button)
-                    action_layout.addStretch()
+        child_item.setIcon(0, icon)
+        child_item.setSizeHint(0, QSize(68, 68))
 
-                    self.library_tree_widget.setItemWidget(child_item, 3, action_widget)
+        title_text = game_data.get("title", "Titolo Sconosciuto")
+        child_item.setText(1, title_text)
+        child_item.setData(1, Qt.ItemDataRole.UserRole, game_data)
+        tooltip_text = (
+            f"Console: {game_data.get('console', 'N/D')}\n"
+            f"File: {game_data.get('original_filename', 'N/D')}\n"
+            f"Percorso: {game_data.get('rom_path')}"
+        )
+        child_item.setToolTip(1, tooltip_text)
+
+        child_item.setText(
+            2,
+            (
+                "Ricerca metadati..."
+                if rom_path in self.pending_metadata
+                else game_data.get("release_date", "N/D")
+            ),
+        )
 
-        logging.info("Caricamento libreria e popolamento UI completato.")
+        action_widget = QWidget()
+        action_layout = QHBoxLayout(action_widget)
+        action_layout.setContentsMargins(2, 2, 2, 2)
+        action_layout.setSpacing(5)
+
+        launch_button = QPushButton(QIcon.fromTheme("media-playback-start"), "Avvia")
+        launch_button.setProperty("rom_path", game_data.get("rom_path"))
+        launch_button.setProperty("console_name", game_data.get("console"))
+        launch_button.clicked.connect(self.handle_launch_button)
+        action_layout.addWidget(launch_button)
+        action_layout.addStretch()
+
+        self.library_tree_widget.setItemWidget(child_item, 3, action_widget)
+
+    def on_metadata_enriched(self, rom_path, game_data):
+        """Shows the metadata found in the background for a library file."""
+        self.pending_metadata.discard(rom_path)
+        item = self.library_items.get(rom_path)
+        if item is None:
+            return
+        self.update_library_item(item, game_data)
+        for i, g_data in enumerate(self.library_data.get(game_data.get("console"), [])):
+            if g_data.get("rom_path") == rom_path:
+                self.library_data[game_data["console"]][i] = game_data
+                break
+
+    def on_metadata_progress(self, done, total):
+        self.metadata_progress.setMaximum(total)
+        self.metadata_progress.setValue(done)
+        self.metadata_progress.setVisible(True)
+        self.cancel_metadata_btn.setVisible(True)
+
+    def on_metadata_finished(self, done, total):
+        self.metadata_progress.setVisible(False)
+        self.cancel_metadata_btn.setVisible(False)
+        # Files left without metadata are looked up again on the next refresh.
+        for rom_path in self.pending_metadata:
+            item = self.library_items.get(rom_path)
+            if item is not None:
+                item.setText(2, "N/D")
 
     def refresh_library(self):
         logging.info("Richiesta di aggiornamento libreria...")
         self.load_library()
 
+    def verify_library(self):
+        """Verifies the library folder against the imported DATs in a background thread."""
+        if self.verify_thread is not None:
+            return
+        if not len(get_dat_index()):
+            QMessageBox.information(
+                self,
+                "Nessun DAT",
+                "Importa almeno un file DAT dalle Opzioni Generali prima di verificare la libreria.",
+            )
+            return
+        current_folder = settings.value("download_folder", DEFAULT_DOWNLOADS_FOLDER)
+        logging.info(f"Verifica DAT della libreria iniziata: {current_folder}")
+        self.verify_library_btn.setEnabled(False)
+
+        self.verify_thread = QThread(self)
+        self.verify_worker = VerifyWorker(current_folder)
+        self.verify_worker.moveToThread(self.verify_thread)
+
+        self.verify_thread.started.connect(self.verify_worker.run)
+        self.verify_worker.progress.connect(self.on_verify_progress)
+        self.verify_worker.finished.connect(self.on_verify_finished)
+        self.verify_worker.finished.connect(self.verify_thread.quit)
+        self.verify_worker.finished.connect(self.verify_worker.deleteLater)
+        self.verify_thread.finished.connect(self.on_verify_thread_finished)
+        self.verify_thread.finished.connect(self.verify_thread.deleteLater)
+
+        self.verify_thread.start()
+
+    def on_verify_thread_finished(self):
+        # Only dropped once the thread has stopped, never while it still runs.
+        self.verify_thread = None
+
+    def on_verify_progress(self, done, total):
+        self.verify_library_btn.setText(f" Verifica {done}/{total}")
+
+    def on_verify_finished(self, results):
+        self.verify_library_btn.setEnabled(True)
+        self.verify_library_btn.setText(" Verifica DAT")
+        if "error" in results:
+            logging.error(f"Verifica DAT fallita: {results['error']}")
+            QMessageBox.critical(
+                self, "Errore", f"Verifica DAT fallita:\n{results['error']}"
+            )
+            return
+
+        ok = results.get(VERDICT_OK, [])
+        bad = results.get(VERDICT_MISMATCH, [])
+        unknown = [
+            path
+            for verdict, paths in results.items()
+            if verdict not in (VERDICT_OK, VERDICT_MISMATCH)
+            for path in paths
+        ]
+        logging.info(
+            f"Verifica DAT completata: {len(ok)} ok, {len(bad)} non validi, {len(unknown)} sconosciuti."
+        )
+        message = (
+            f"File verificati: {len(ok)}\n"
+            f"File non corrispondenti: {len(bad)}\n"
+            f"File non presenti nei DAT: {len(unknown)}"
+        )
+        if bad:
+            message += "\n\nNon corrispondenti:\n" + "\n".join(
+                os.path.basename(path) for path in bad[:20]
+            )
+            if len(bad) > 20:
+                message += f"\n... e altri {len(bad) - 20}"
+        QMessageBox.information(self, "Verifica DAT", message)
+
     def handle_launch_button(self):
         sender_button = self.sender()
         if not sender_button:
@@ -1,14 +1,14 @@
 import logging
 import os
 
-from PySide6.QtCore import Qt, QThread
+from PySide6.QtCore import Qt, QThread, QTimer
 from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (
     QApplication,
+    QCheckBox,
     QComboBox,
     QHBoxLayout,
     QHeaderView,
-    QInputDialog,
     QLabel,
     QLineEdit,
     QListWidget,
@@ -22,17 +22,18 @@ from PySide6.QtWidgets import (
     QSizePolicy,
     QSplitter,
     QStackedWidget,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QVBoxLayout,
     QWidget,
 )
 
+from src import config
+from src.catalog_facets import FacetFilter
+from src.catalog_store import get_catalog_store
 from src.config import (
     CONSOLES,
     DEFAULT_THEME_FILENAME,
     EMULATOR_CONFIG_FOLDER,
-    MAX_CONCURRENT_DOWNLOADS,
     STYLES_REL_PATH,
     USER_DOWNLOADS_FOLDER,
     resource_path,
@@ -41,14 +42,21 @@ from src.config import (
     settings,
 )
 from src.default_keybindings import DEFAULT_KEYBINDINGS
+from src.download_journal import STATE_FAILED, get_download_journal
 from src.gui.controls_page import ControlsPage
 from src.gui.download_queue_item import DownloadQueueItemWidget
+from src.gui.facet_filter_dialog import FacetFilterDialog
+from src.gui.games_table_model import SEARCH_DEBOUNCE_MS, GamesTableModel
 from src.gui.library_page import LibraryPage
 from src.gui.roms_page import RomsPage
 from src.gui.settings_dialog import SettingsDialog
-from src.gui.weight_item import WeightItem
-from src.utils import ALLOWED_NATIONS, extract_nations
+from src.scraping import CATALOG_SYNC_UPDATED
+from src.workers.async_download_manager import (
+    AsyncDownloadManager,
+    is_async_engine_available,
+)
 from src.workers.download_manager import DownloadManager
+from src.workers.catalog_sync_worker import CatalogSyncWorker
 from src.workers.scrape_worker import ScrapeWorker
 
 
@@ -70,6 +78,12 @@ class MainWindow(QWidget):
         self.last_speed = {}
         self.download_manager_worker = None
         self.download_manager_thread = None
+        self.journal = get_download_journal()
+        self.failed_downloads = {}
+        self.scrape_jobs = []
+        self.catalog_sync_thread = None
+        self.facet_filter = FacetFilter()
+        self.facet_filter_dialog = None
 
         main_layout = QHBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
@@ -119,6 +133,31 @@ class MainWindow(QWidget):
             initial_console = self.console_combo.currentText()
         self.load_games(initial_console)
 
+        self.roms_page.retry_failed_requested.connect(self.retry_failed_downloads)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop_catalog_sync)
+        self.restore_download_queue()
+
+    def restore_download_queue(self):
+        """Ripristina la coda salvata nel journal dalla sessione precedente e la riprende."""
+        for job in self.journal.get_jobs([STATE_FAILED]):
+            self.failed_downloads[job["name"]] = job["game"]
+            self.roms_page.add_failed_download(job["name"], job["error"] or "")
+
+        restored = self.journal.restore_pending()
+        if not restored:
+            return
+        self.download_queue = restored
+        self.update_waiting_queue_list()
+        if hasattr(self, "roms_page"):
+            for game in restored:
+                self.roms_page.add_to_queue(game["name"])
+        self.log(
+            f"Ripristinata la coda della sessione precedente ({len(restored)} giochi), ripresa dei download..."
+        )
+        QTimer.singleShot(0, self.start_downloads)
+
     def _load_and_apply_initial_theme(self):
         """Carica il tema specificato nelle impostazioni (o il default) e lo applica."""
         # L'oggetto 'settings' è globale da config.py
@@ -204,6 +243,12 @@ class MainWindow(QWidget):
         settings_action.triggered.connect(self.show_settings_dialog)
         settings_menu.addAction(settings_action)
 
+        catalog_menu = QMenu("Cataloghi", self)
+        menu_bar.addMenu(catalog_menu)
+        self.sync_catalogs_action = QAction("Sincronizza tutti i cataloghi", self)
+        self.sync_catalogs_action.triggered.connect(self.sync_all_catalogs)
+        catalog_menu.addAction(self.sync_catalogs_action)
+
         return menu_bar
 
     def change_page(self, index):
@@ -277,31 +322,63 @@ class MainWindow(QWidget):
 
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Cerca gioco...")
-        self.search_bar.textChanged.connect(self.update_table)
+        self.search_bar.setToolTip(
+            "Più parole: devono comparire tutte nel nome.\n"
+            "Parola seguita da * (es. zel*): parole che iniziano così."
+        )
+        # Filter once typing pauses, or right away on Enter.
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.update_table)
+        self.search_bar.textChanged.connect(self.search_timer.start)
+        self.search_bar.returnPressed.connect(self.update_table)
         self.search_bar.setSizePolicy(
             QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed
         )
         layout.addWidget(self.search_bar)
 
-        self.btn_filter_nation = QPushButton("Filtra Nazione")
-        self.btn_filter_nation.clicked.connect(self.filter_by_nation)
-        layout.addWidget(self.btn_filter_nation)
+        self.fuzzy_search_check = QCheckBox("Ricerca approssimata")
+        self.fuzzy_search_check.setToolTip(
+            "Tollera errori di battitura e parole in ordine diverso,\n"
+            "mostrando per primi i risultati più simili."
+        )
+        self.fuzzy_search_check.toggled.connect(self.on_fuzzy_search_toggled)
+        layout.addWidget(self.fuzzy_search_check)
+
+        self.btn_facet_filters = QPushButton("Filtri")
+        self.btn_facet_filters.setToolTip(
+            "Filtra per regione, lingua e dimensione, escludendo beta, prototipi..."
+        )
+        self.btn_facet_filters.clicked.connect(self.show_facet_filters)
+        layout.addWidget(self.btn_facet_filters)
+
+        self.btn_refresh_catalog = QPushButton("Aggiorna Catalogo")
+        self.btn_refresh_catalog.setToolTip(
+            "Ricontrolla subito la lista dei giochi sul server, ignorando la cache."
+        )
+        self.btn_refresh_catalog.clicked.connect(self.refresh_catalog)
+        layout.addWidget(self.btn_refresh_catalog)
         layout.addStretch()
         return layout
 
     def _create_games_table(self):
-        """Creates and returns the games table widget."""
-        table = QTableWidget()
-        table.setColumnCount(2)
-        table.setHorizontalHeaderLabels(["Nome Gioco", "Peso"])
+        """Creates and returns the games table view and its model."""
+        self.games_model = GamesTableModel(self)
+        self.games_model.search_finished.connect(self.on_search_finished)
+        table = QTableView()
+        table.setModel(self.games_model)
         table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        # ResizeToContents would measure every row; the view must only touch visible ones.
         table.horizontalHeader().setSectionResizeMode(
-            1, QHeaderView.ResizeMode.ResizeToContents
+            1, QHeaderView.ResizeMode.Interactive
         )
-        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        table.cellDoubleClicked.connect(self.on_table_double_click)
+        table.horizontalHeader().resizeSection(1, 110)
+        table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        table.doubleClicked.connect(self.on_table_double_click)
         table.setAlternatingRowColors(True)
         table.verticalHeader().setVisible(False)
         table.setSortingEnabled(True)
@@ -365,37 +442,138 @@ class MainWindow(QWidget):
         self.log(f"Console cambiata: {console_name}")
         self.load_games(console_name)
 
-    def load_games(self, console_name):
+    def load_games(self, console_name, force_refresh=False):
         """Loads the list of games for the selected console."""
         self.log(f"Caricamento giochi per '{console_name}'...")
         if not hasattr(self, "table"):
             print("WARN: Table widget not ready for loading games.")
             return
-        self.table.setRowCount(0)
-        self.table.setSortingEnabled(False)
+        self.games_list = []
+        self.games_model.set_games([])
+
+        scrape_thread = QThread(self)
+        scrape_worker = ScrapeWorker(console_name, force_refresh)
+        scrape_worker.moveToThread(scrape_thread)
+        # A background revalidation may outlive a console switch: keep every
+        # running job referenced until it is done.
+        job = (scrape_thread, scrape_worker)
+        self.scrape_jobs.append(job)
+
+        scrape_thread.started.connect(scrape_worker.run)
+        scrape_worker.progress.connect(self.log)
+        scrape_worker.cached_loaded.connect(self.on_games_loaded)
+        scrape_worker.finished.connect(self.on_games_refreshed)
+        scrape_worker.catalog_diff.connect(self.on_catalog_diff)
+        scrape_worker.done.connect(scrape_thread.quit)
+        scrape_worker.done.connect(scrape_worker.deleteLater)
+        scrape_thread.finished.connect(scrape_thread.deleteLater)
+        scrape_thread.finished.connect(lambda: self.scrape_jobs.remove(job))
+
+        scrape_thread.start()
+
+    def refresh_catalog(self):
+        """Forces a revalidation of the current console catalog."""
+        self.load_games(self.console_combo.currentText(), force_refresh=True)
+
+    def sync_all_catalogs(self):
+        """Fetches the catalogs of all consoles into the cache in the background."""
+        if self.catalog_sync_thread is not None:
+            return
+        self.log("Sincronizzazione di tutti i cataloghi avviata...")
+        self.sync_catalogs_action.setEnabled(False)
+
+        self.catalog_sync_thread = QThread(self)
+        self.catalog_sync_worker = CatalogSyncWorker()
+        self.catalog_sync_worker.moveToThread(self.catalog_sync_thread)
+
+        self.catalog_sync_thread.started.connect(self.catalog_sync_worker.run)
+        self.catalog_sync_worker.progress.connect(self.log)
+        self.catalog_sync_worker.console_synced.connect(self.on_catalog_synced)
+        self.catalog_sync_worker.catalog_diff.connect(self.on_catalog_diff)
+        self.catalog_sync_worker.finished.connect(self.on_catalog_sync_finished)
+        self.catalog_sync_worker.finished.connect(self.catalog_sync_thread.quit)
+        self.catalog_sync_worker.finished.connect(self.catalog_sync_worker.deleteLater)
+        self.catalog_sync_thread.finished.connect(self.catalog_sync_thread.deleteLater)
+
+        self.catalog_sync_thread.start()
+
+    def on_catalog_synced(self, console_name, status):
+        """Reloads the table when the selected console's catalog changed."""
+        if (
+            status == CATALOG_SYNC_UPDATED
+            and console_name == self.console_combo.currentText()
+        ):
+            self.load_games(console_name)
 
-        self.scrape_thread = QThread()
-        self.scrape_worker = ScrapeWorker(console_name)
-        self.scrape_worker.moveToThread(self.scrape_thread)
+    def on_catalog_diff(self, console_name, diff):
+        """Applies a catalog refresh to the waiting queue: drops removed games, updates changed ones."""
+        removed = {game["name"] for game in diff.removed}
+        changed = {old["name"]: new for old, new in diff.changed}
+        queue = []
+        for game in self.download_queue:
+            if game.get("console") != console_name:
+                queue.append(game)
+            elif game["name"] in removed:
+                self.journal.remove(game["name"])
+                if hasattr(self, "roms_page"):
+                    self.roms_page.remove_from_queue(game["name"])
+                self.log(
+                    f"Rimosso dalla coda: '{game['name']}' non è più nel catalogo."
+                )
+            elif game["name"] in changed:
+                new_game = changed[game["name"]]
+                for key in ("link", "size_bytes", "size_str"):
+                    game[key] = new_game[key]
+                self.log(f"Aggiornato in coda: '{game['name']}' è cambiato sul server.")
+                queue.append(game)
+            else:
+                queue.append(game)
+        if len(queue) != len(self.download_queue) or changed:
+            self.download_queue = queue
+            self.update_waiting_queue_list()
 
-        self.scrape_thread.started.connect(self.scrape_worker.run)
-        self.scrape_worker.progress.connect(self.log)
-        self.scrape_worker.finished.connect(self.on_games_loaded)
-        self.scrape_worker.finished.connect(self.scrape_thread.quit)
-        self.scrape_worker.finished.connect(self.scrape_worker.deleteLater)
-        self.scrape_thread.finished.connect(self.scrape_thread.deleteLater)
+    def stop_catalog_sync(self):
+        """
+        Stops a running catalog sync at shutdown: consoles not started yet are
+        skipped, and the ones in flight are waited for, so their catalogs are
+        written whole.
+        """
+        if self.catalog_sync_thread is None:
+            return
+        self.catalog_sync_worker.stop()
+        # finished -> quit is queued to this (blocked) thread: quit directly.
+        self.catalog_sync_thread.quit()
+        self.catalog_sync_thread.wait()
 
-        self.scrape_thread.start()
+    def on_catalog_sync_finished(self, results):
+        self.catalog_sync_thread = None
+        self.sync_catalogs_action.setEnabled(True)
 
     def on_games_loaded(self, games):
-        """Handles the completion of the game scraping process."""
+        """Shows the games of the selected console and reloads the library."""
+        if self.show_games(games) and hasattr(self, "library_page"):
+            self.library_page.load_library()
+
+    def on_games_refreshed(self, games):
+        """
+        Shows a catalog scraped in the background. The library was already
+        reloaded with the cached list, if there was one.
+        """
+        had_games = bool(self.games_list)
+        if self.show_games(games) and not had_games:
+            if hasattr(self, "library_page"):
+                self.library_page.load_library()
+
+    def show_games(self, games):
+        """Puts a console's games in the table; False if it is no longer selected."""
+        if games and games[0].get("console") != self.console_combo.currentText():
+            logging.debug("Catalogo di una console non più selezionata, ignorato.")
+            return False
         self.log(f"Caricati {len(games)} giochi.")
-        for game in games:
-            game["nations"] = extract_nations(game.get("name", ""))
         self.games_list = games
+        self.games_model.set_games(games)
         self.update_table()
-        if hasattr(self, "library_page"):
-            self.library_page.load_library()
+        return True
 
     def update_table(self):
         """Updates the games table based on the current list and filters."""
@@ -409,51 +587,50 @@ class MainWindow(QWidget):
         )
         search_terms = search_text.split()
 
-        self.table.setSortingEnabled(False)
-        self.table.setRowCount(0)
-
-        selected_nation = getattr(self, "selected_nation", "").lower()
-
-        for game in self.games_list:
-            name_lower = game.get("name", "").lower()
-            if search_terms and any(term not in name_lower for term in search_terms):
-                continue
-            if selected_nation:
-                nations_lower = [n.lower() for n in game.get("nations", [])]
-                if selected_nation not in nations_lower:
-                    continue
-
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            item_name = QTableWidgetItem(game.get("name", "N/A"))
-            item_size = WeightItem(game.get("size_str", "0 B"))
-            self.table.setItem(row, 0, item_name)
-            self.table.setItem(row, 1, item_size)
-
-        self.table.setSortingEnabled(True)
-        self.log(f"Tabella aggiornata, {self.table.rowCount()} giochi visualizzati.")
-
-    def filter_by_nation(self):
-        """Opens a dialog to filter games by nation."""
-        nations = sorted(list(ALLOWED_NATIONS))
-        nation, ok = QInputDialog.getItem(
-            self,
-            "Filtra per Nazione",
-            "Seleziona nazione (vuoto per rimuovere filtro):",
-            [""] + nations,
-            0,
-            False,
+        fuzzy = (
+            self.fuzzy_search_check.isChecked()
+            if hasattr(self, "fuzzy_search_check")
+            else False
         )
-        if ok:
-            self.selected_nation = nation
-            self.log(
-                f"Filtro nazione impostato su: '{nation}'"
-                if nation
-                else "Filtro nazione rimosso."
+        if hasattr(self, "search_timer"):
+            self.search_timer.stop()
+        self.games_model.set_filter(search_terms, self.facet_filter, fuzzy)
+
+    def on_search_finished(self, row_count):
+        """Logs the number of games shown once a search has been applied."""
+        self.log(f"Tabella aggiornata, {row_count} giochi visualizzati.")
+
+    def on_fuzzy_search_toggled(self, checked):
+        """Switches between exact and fuzzy search."""
+        if checked and hasattr(self, "table"):
+            # Results are ranked by similarity: drop the column sort.
+            self.table.horizontalHeader().setSortIndicator(
+                -1, Qt.SortOrder.AscendingOrder
             )
+        self.update_table()
+
+    def show_facet_filters(self):
+        """Shows the facet filters dialog, which applies every change live."""
+        if self.facet_filter_dialog is None:
+            self.facet_filter_dialog = FacetFilterDialog(self.facet_filter, self)
+            self.facet_filter_dialog.filter_changed.connect(
+                self.on_facet_filter_changed
+            )
+            self.games_model.facet_counts.connect(
+                self.facet_filter_dialog.update_counts
+            )
+            # Fill in the counts of the search shown now.
             self.update_table()
+        self.facet_filter_dialog.show()
+        self.facet_filter_dialog.raise_()
+        self.facet_filter_dialog.activateWindow()
+
+    def on_facet_filter_changed(self, facet_filter):
+        self.facet_filter = facet_filter
+        self.log(f"Filtri giochi: {facet_filter.describe()}.")
+        self.update_table()
 
-    def on_table_double_click(self, row, column):
+    def on_table_double_click(self, index):
         """Adds a game to the download queue on double-click."""
         start_enabled = (
             self.btn_start_downloads.isEnabled()
@@ -470,10 +647,18 @@ class MainWindow(QWidget):
 
         if not hasattr(self, "table"):
             return
-        game_name_item = self.table.item(row, 0)
-        if not game_name_item:
+        game = self.games_model.game_at(index.row())
+        if not game:
+            return
+        game_name = game.get("name", "")
+        # The cached catalog is shown without links: fetch this game's now.
+        if not get_catalog_store().complete_game(game):
+            QMessageBox.warning(
+                self,
+                "Attenzione",
+                f"'{game_name}' non è più nel catalogo, ricaricare la lista.",
+            )
             return
-        game_name = game_name_item.text()
 
         if hasattr(self, "library_page") and hasattr(
             self.library_page, "library_files"
@@ -501,16 +686,12 @@ class MainWindow(QWidget):
             )
             return
 
-        game = next((g for g in self.games_list if g.get("name") == game_name), None)
-
-        if game:
-            self.download_queue.append(game)
-            self.update_waiting_queue_list()
-            if hasattr(self, "roms_page"):
-                self.roms_page.add_to_queue(game["name"])
-            self.log(f"Aggiunto in coda: {game['name']}")
-        else:
-            self.log(f"ERRORE: Impossibile trovare i dati per '{game_name}'")
+        self.download_queue.append(game)
+        self.journal.add(game)
+        self.update_waiting_queue_list()
+        if hasattr(self, "roms_page"):
+            self.roms_page.add_to_queue(game["name"])
+        self.log(f"Aggiunto in coda: {game['name']}")
 
     def update_waiting_queue_list(self):
         """Updates the visual waiting queue list."""
@@ -533,6 +714,7 @@ class MainWindow(QWidget):
             self.download_queue = [
                 g for g in self.download_queue if g.get("name") != game_name
             ]
+            self.journal.remove(game_name)
             if hasattr(self, "roms_page"):
                 self.roms_page.remove_from_queue(game_name)
             self.log(f"Rimosso dalla coda d'attesa: {game_name}")
@@ -622,11 +804,24 @@ class MainWindow(QWidget):
         self.cancel_downloads(silent=True)
 
         self.download_manager_thread = QThread(self)
-        max_concurrent = MAX_CONCURRENT_DOWNLOADS
 
-        self.download_manager_worker = DownloadManager(
-            current_queue_copy, self.update_waiting_queue_list, max_concurrent
-        )
+        if config.DOWNLOAD_ENGINE == "asyncio" and is_async_engine_available():
+            self.log(
+                f"Motore asyncio: fino a {config.ASYNC_MAX_CONCURRENT_DOWNLOADS} download concorrenti."
+            )
+            self.download_manager_worker = AsyncDownloadManager(
+                current_queue_copy,
+                self.update_waiting_queue_list,
+                config.ASYNC_MAX_CONCURRENT_DOWNLOADS,
+                journal=self.journal,
+            )
+        else:
+            self.download_manager_worker = DownloadManager(
+                current_queue_copy,
+                self.update_waiting_queue_list,
+                config.MAX_CONCURRENT_DOWNLOADS,
+                journal=self.journal,
+            )
         self.download_manager_worker.moveToThread(self.download_manager_thread)
 
         self.download_manager_worker.file_progress.connect(
@@ -634,6 +829,7 @@ class MainWindow(QWidget):
         )
         self.download_manager_worker.log.connect(self.log)
         self.download_manager_worker.file_finished.connect(self.remove_finished_file)
+        self.download_manager_worker.file_failed.connect(self.on_download_failed)
         self.download_manager_worker.finished.connect(self.on_all_downloads_finished)
 
         self.download_manager_thread.started.connect(
@@ -651,6 +847,31 @@ class MainWindow(QWidget):
         self.download_queue.clear()
         self.download_manager_thread.start()
 
+    def on_download_failed(self, game, error):
+        """Moves a game that exhausted its retries to the failed list."""
+        game_name = game.get("name", "Nome Sconosciuto")
+        self.failed_downloads[game_name] = game
+        self.roms_page.add_failed_download(game_name, error)
+        self.log(f"Download fallito definitivamente: {game_name} ({error})")
+
+    def retry_failed_downloads(self):
+        """Puts every failed download back in the queue."""
+        if not self.failed_downloads:
+            return
+        failed = list(self.failed_downloads.values())
+        self.failed_downloads.clear()
+        self.roms_page.clear_failed_downloads()
+        for game in failed:
+            if any(g.get("name") == game["name"] for g in self.download_queue):
+                continue
+            self.download_queue.append(game)
+            self.journal.add(game)
+            self.roms_page.add_to_queue(game["name"])
+        self.update_waiting_queue_list()
+        self.log(f"{len(failed)} download falliti rimessi in coda.")
+        if self.download_manager_worker is None:
+            self.start_downloads()
+
     def cancel_downloads(self, silent=False):
         """Cancels all active downloads and cleans up the worker."""
         worker_existed = False
@@ -794,7 +1015,8 @@ class MainWindow(QWidget):
             if "max_dl" in values:
                 set_max_concurrent_downloads(values["max_dl"])
             self.log(
-                f"Impostazioni generali aggiornate: Cartella='{USER_DOWNLOADS_FOLDER}', Max DL={MAX_CONCURRENT_DOWNLOADS}"
+                f"Impostazioni generali aggiornate: Cartella='{USER_DOWNLOADS_FOLDER}', "
+                f"Max DL={config.MAX_CONCURRENT_DOWNLOADS}"
             )
             if hasattr(self, "library_page"):
                 self.library_page.load_library()
@@ -806,6 +1028,8 @@ class MainWindow(QWidget):
             if not silent:
                 self.log("Annullamento download in corso...")
             self.download_manager_worker.cancel_all()
+        if not silent:
+            self.journal.clear_unfinished()
 
         if self.download_manager_thread and self.download_manager_thread.isRunning():
             self.download_manager_thread.quit()
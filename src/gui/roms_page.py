@@ -1,12 +1,14 @@
 import logging
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtWidgets import (
     QGroupBox,
     QHBoxLayout,
     QLabel,
     QListWidget,
+    QListWidgetItem,
     QProgressBar,
+    QPushButton,
     QScrollArea,
     QVBoxLayout,
     QWidget,
@@ -23,6 +25,8 @@ class RomsPage(QWidget):
     the original (working) logic for adding/removing active widgets.
     """
 
+    retry_failed_requested = Signal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.active_widgets = {}
@@ -92,6 +96,19 @@ class RomsPage(QWidget):
         completed_layout.addWidget(self.completed_list)
         lists_layout.addWidget(completed_group)
 
+        failed_group = QGroupBox("Download Falliti")
+        failed_group.setObjectName("DownloadGroup")
+        failed_layout = QVBoxLayout(failed_group)
+        self.failed_list = QListWidget()
+        self.failed_list.setObjectName("FailedList")
+        self.failed_list.setMaximumHeight(150)
+        failed_layout.addWidget(self.failed_list)
+        self.btn_retry_failed = QPushButton("Riprova falliti")
+        self.btn_retry_failed.setEnabled(False)
+        self.btn_retry_failed.clicked.connect(self.retry_failed_requested.emit)
+        failed_layout.addWidget(self.btn_retry_failed)
+        lists_layout.addWidget(failed_group)
+
         main_layout.addLayout(lists_layout)
 
     def add_active_download(self, game_name):
@@ -176,6 +193,27 @@ class RomsPage(QWidget):
         self.completed_list.addItem(game_name_with_info)
         self.completed_list.scrollToBottom()
 
+    def add_failed_download(self, game_name, error):
+        """Adds (or updates) an entry in the failed downloads list."""
+        self.remove_failed_download(game_name)
+        item = QListWidgetItem(game_name)
+        item.setToolTip(error)
+        self.failed_list.addItem(item)
+        self.failed_list.scrollToBottom()
+        self.btn_retry_failed.setEnabled(True)
+
+    def remove_failed_download(self, game_name):
+        """Removes a game from the failed downloads list."""
+        items = self.failed_list.findItems(game_name, Qt.MatchFlag.MatchExactly)
+        for item in items:
+            self.failed_list.takeItem(self.failed_list.row(item))
+        self.btn_retry_failed.setEnabled(self.failed_list.count() > 0)
+
+    def clear_failed_downloads(self):
+        """Empties the failed downloads list."""
+        self.failed_list.clear()
+        self.btn_retry_failed.setEnabled(False)
+
     def update_global_progress(
         self, downloaded, total, global_speed_mb, global_peak_mb
     ):
@@ -1,9 +1,10 @@
 import logging
 import os
 
-from PySide6.QtCore import QSettings, Qt  # Aggiunto QSettings
+from PySide6.QtCore import QSettings, Qt, QTime  # Aggiunto QSettings
 from PySide6.QtWidgets import (  # Aggiunto QComboBox, QApplication
     QApplication,
+    QCheckBox,
     QComboBox,
     QDialog,
     QFileDialog,
@@ -15,22 +16,47 @@ from PySide6.QtWidgets import (  # Aggiunto QComboBox, QApplication
     QMessageBox,
     QPushButton,
     QSpinBox,
+    QTimeEdit,
     QVBoxLayout,
 )
 
 from src.config import resource_path  # Aggiunto resource_path
 from src.config import (
+    ASYNC_MAX_CONCURRENT_DOWNLOADS,
+    BANDWIDTH_LIMIT_KBPS,
+    BANDWIDTH_PER_JOB_KBPS,
+    BANDWIDTH_SCHEDULE_ENABLED,
+    BANDWIDTH_SCHEDULE_END,
+    BANDWIDTH_SCHEDULE_LIMIT_KBPS,
+    BANDWIDTH_SCHEDULE_START,
+    CATALOG_TTL_HOURS,
     CONSOLES,
     DEFAULT_THEME_FILENAME,
+    DOWNLOAD_ENGINE,
+    DOWNLOAD_SEGMENTS,
+    HTTP_RETRIES,
+    HTTP_TIMEOUT,
     MAX_CONCURRENT_DOWNLOADS,
     SETTINGS_APP,
     SETTINGS_ORG,
     STYLES_REL_PATH,
     USER_DOWNLOADS_FOLDER,
     add_console,
+    set_async_max_concurrent_downloads,
+    set_bandwidth_limit,
+    set_bandwidth_per_job,
+    set_bandwidth_schedule,
+    set_catalog_ttl,
+    set_download_engine,
+    set_download_segments,
+    set_http_retries,
+    set_http_timeout,
     set_max_concurrent_downloads,
     set_user_download_folder,
 )
+from src.api_cache import get_api_cache
+from src.dat_verification import get_dat_index
+from src.workers.async_download_manager import is_async_engine_available
 
 
 class SettingsDialog(QDialog):
@@ -76,6 +102,129 @@ class SettingsDialog(QDialog):
         md_layout.addStretch()
         layout.addLayout(md_layout)
 
+        # --- Sezione Connessioni per Download (download segmentato) ---
+        seg_layout = QHBoxLayout()
+        seg_layout.addWidget(QLabel("Connessioni per download:"))
+        self.segments_spin = QSpinBox()
+        self.segments_spin.setMinimum(1)
+        self.segments_spin.setMaximum(16)
+        self.segments_spin.setFixedWidth(60)
+        self.segments_spin.setToolTip(
+            "Numero di connessioni parallele per i file grandi (1 = disattivato)."
+        )
+        seg_layout.addWidget(self.segments_spin)
+        seg_layout.addStretch()
+        layout.addLayout(seg_layout)
+
+        # --- Sezione Motore Download ---
+        engine_layout = QHBoxLayout()
+        engine_layout.addWidget(QLabel("Motore download:"))
+        self.engine_combo = QComboBox()
+        self.engine_combo.addItem("Thread (predefinito)", "threads")
+        self.engine_combo.addItem("Asyncio (aiohttp)", "asyncio")
+        if not is_async_engine_available():
+            self.engine_combo.model().item(1).setEnabled(False)
+            self.engine_combo.setToolTip(
+                "Il motore asyncio richiede la libreria 'aiohttp'."
+            )
+        engine_layout.addWidget(self.engine_combo)
+        engine_layout.addWidget(QLabel("Max concorrenti (asyncio):"))
+        self.async_max_dl_spin = QSpinBox()
+        self.async_max_dl_spin.setMinimum(1)
+        self.async_max_dl_spin.setMaximum(500)
+        self.async_max_dl_spin.setFixedWidth(70)
+        engine_layout.addWidget(self.async_max_dl_spin)
+        engine_layout.addStretch()
+        layout.addLayout(engine_layout)
+
+        # --- Sezione Rete ---
+        net_layout = QHBoxLayout()
+        net_layout.addWidget(QLabel("Tentativi HTTP:"))
+        self.http_retries_spin = QSpinBox()
+        self.http_retries_spin.setMinimum(0)
+        self.http_retries_spin.setMaximum(10)
+        self.http_retries_spin.setFixedWidth(60)
+        net_layout.addWidget(self.http_retries_spin)
+        net_layout.addWidget(QLabel("Timeout (s):"))
+        self.http_timeout_spin = QSpinBox()
+        self.http_timeout_spin.setMinimum(5)
+        self.http_timeout_spin.setMaximum(300)
+        self.http_timeout_spin.setFixedWidth(60)
+        net_layout.addWidget(self.http_timeout_spin)
+        net_layout.addStretch()
+        layout.addLayout(net_layout)
+
+        # --- Sezione Limite di Banda ---
+        bw_group = QGroupBox("Limite di Banda (KiB/s, 0 = illimitato)")
+        bw_layout = QFormLayout(bw_group)
+        self.bw_limit_spin = self._create_kbps_spin()
+        bw_layout.addRow("Limite globale:", self.bw_limit_spin)
+        self.bw_per_job_spin = self._create_kbps_spin()
+        bw_layout.addRow("Limite per download:", self.bw_per_job_spin)
+
+        schedule_layout = QHBoxLayout()
+        self.bw_schedule_check = QCheckBox("Dalle")
+        schedule_layout.addWidget(self.bw_schedule_check)
+        self.bw_schedule_start_edit = QTimeEdit()
+        self.bw_schedule_start_edit.setDisplayFormat("HH:mm")
+        schedule_layout.addWidget(self.bw_schedule_start_edit)
+        schedule_layout.addWidget(QLabel("alle"))
+        self.bw_schedule_end_edit = QTimeEdit()
+        self.bw_schedule_end_edit.setDisplayFormat("HH:mm")
+        schedule_layout.addWidget(self.bw_schedule_end_edit)
+        schedule_layout.addWidget(QLabel("limite globale:"))
+        self.bw_schedule_spin = self._create_kbps_spin()
+        schedule_layout.addWidget(self.bw_schedule_spin)
+        schedule_layout.addStretch()
+        bw_layout.addRow("Programmazione:", schedule_layout)
+        layout.addWidget(bw_group)
+
+        # --- Sezione Cache Catalogo ---
+        ttl_group = QGroupBox("Cache Catalogo (ore prima di ricontrollare il server)")
+        ttl_layout = QFormLayout(ttl_group)
+        self.catalog_ttl_spin = QSpinBox()
+        self.catalog_ttl_spin.setRange(1, 24 * 365)
+        self.catalog_ttl_spin.setFixedWidth(80)
+        ttl_layout.addRow("Durata predefinita:", self.catalog_ttl_spin)
+
+        console_ttl_layout = QHBoxLayout()
+        self.catalog_ttl_console_combo = QComboBox()
+        self.catalog_ttl_console_combo.addItems(sorted(CONSOLES.keys()))
+        console_ttl_layout.addWidget(self.catalog_ttl_console_combo)
+        self.catalog_ttl_console_spin = QSpinBox()
+        self.catalog_ttl_console_spin.setRange(0, 24 * 365)
+        self.catalog_ttl_console_spin.setSpecialValueText("Predefinita")
+        self.catalog_ttl_console_spin.setFixedWidth(100)
+        console_ttl_layout.addWidget(self.catalog_ttl_console_spin)
+        console_ttl_layout.addStretch()
+        ttl_layout.addRow("Per console:", console_ttl_layout)
+        self.catalog_ttl_console_combo.currentTextChanged.connect(
+            self._show_console_ttl
+        )
+        self.catalog_ttl_console_spin.valueChanged.connect(self._store_console_ttl)
+        layout.addWidget(ttl_group)
+
+        # --- Sezione Cache Ricerche Metadati ---
+        api_cache_layout = QHBoxLayout()
+        api_cache_layout.addWidget(QLabel("Cache ricerche IGDB/RAWG:"))
+        api_cache_layout.addStretch()
+        self.btn_clear_api_cache = QPushButton("Svuota cache ricerche")
+        self.btn_clear_api_cache.clicked.connect(self.clear_api_cache)
+        api_cache_layout.addWidget(self.btn_clear_api_cache)
+        layout.addLayout(api_cache_layout)
+
+        # --- Sezione Verifica DAT ---
+        dat_layout = QHBoxLayout()
+        dat_layout.addWidget(QLabel("DAT No-Intro/Redump:"))
+        self.dat_status_label = QLabel()
+        dat_layout.addWidget(self.dat_status_label)
+        dat_layout.addStretch()
+        self.btn_import_dat = QPushButton("Importa DAT...")
+        self.btn_import_dat.clicked.connect(self.import_dat)
+        dat_layout.addWidget(self.btn_import_dat)
+        layout.addLayout(dat_layout)
+        self._update_dat_status()
+
         # --- Sezione Tema GUI ---
         theme_layout = QHBoxLayout()
         theme_layout.addWidget(QLabel("Tema Interfaccia:"))
@@ -119,6 +268,24 @@ class SettingsDialog(QDialog):
         btn_layout.addWidget(self.btn_cancel)
         layout.addLayout(btn_layout)
 
+    def _create_kbps_spin(self):
+        spin = QSpinBox()
+        spin.setRange(0, 10_000_000)
+        spin.setSingleStep(256)
+        spin.setSpecialValueText("Illimitato")
+        spin.setFixedWidth(110)
+        return spin
+
+    def _show_console_ttl(self, console_name):
+        self.catalog_ttl_console_spin.setValue(
+            self.catalog_ttl_overrides.get(console_name, 0)
+        )
+
+    def _store_console_ttl(self, value):
+        console_name = self.catalog_ttl_console_combo.currentText()
+        if console_name:
+            self.catalog_ttl_overrides[console_name] = value
+
     def _populate_theme_combo(self):
         """Scans for themes and populates the theme selection combo box."""
         self.theme_map = {}
@@ -194,6 +361,64 @@ class SettingsDialog(QDialog):
         current_max_dl = int(self.settings.value("max_dl", MAX_CONCURRENT_DOWNLOADS))
         self.max_dl_spin.setValue(current_max_dl)
 
+        # Carica Connessioni per Download
+        current_segments = int(self.settings.value("dl_segments", DOWNLOAD_SEGMENTS))
+        self.segments_spin.setValue(current_segments)
+
+        # Carica Motore Download
+        current_engine = self.settings.value("download_engine", DOWNLOAD_ENGINE)
+        engine_index = self.engine_combo.findData(current_engine)
+        self.engine_combo.setCurrentIndex(max(engine_index, 0))
+        self.async_max_dl_spin.setValue(
+            int(self.settings.value("async_max_dl", ASYNC_MAX_CONCURRENT_DOWNLOADS))
+        )
+
+        # Carica Impostazioni di Rete
+        self.http_retries_spin.setValue(
+            int(self.settings.value("http_retries", HTTP_RETRIES))
+        )
+        self.http_timeout_spin.setValue(
+            int(self.settings.value("http_timeout", HTTP_TIMEOUT))
+        )
+
+        # Carica Limiti di Banda
+        self.bw_limit_spin.setValue(
+            int(self.settings.value("bw_limit", BANDWIDTH_LIMIT_KBPS))
+        )
+        self.bw_per_job_spin.setValue(
+            int(self.settings.value("bw_per_job", BANDWIDTH_PER_JOB_KBPS))
+        )
+        self.bw_schedule_check.setChecked(
+            self.settings.value(
+                "bw_schedule_enabled", BANDWIDTH_SCHEDULE_ENABLED, type=bool
+            )
+        )
+        self.bw_schedule_start_edit.setTime(
+            QTime.fromString(
+                self.settings.value("bw_schedule_start", BANDWIDTH_SCHEDULE_START),
+                "HH:mm",
+            )
+        )
+        self.bw_schedule_end_edit.setTime(
+            QTime.fromString(
+                self.settings.value("bw_schedule_end", BANDWIDTH_SCHEDULE_END), "HH:mm"
+            )
+        )
+        self.bw_schedule_spin.setValue(
+            int(self.settings.value("bw_schedule_limit", BANDWIDTH_SCHEDULE_LIMIT_KBPS))
+        )
+
+        # Carica Durata Cache Catalogo
+        self.catalog_ttl_spin.setValue(
+            int(self.settings.value("catalog_ttl_hours", CATALOG_TTL_HOURS))
+        )
+        self.catalog_ttl_overrides = {
+            console_name: int(self.settings.value(f"catalog_ttl/{console_name}", 0))
+            for console_name in CONSOLES
+        }
+        self._saved_catalog_ttl_overrides = dict(self.catalog_ttl_overrides)
+        self._show_console_ttl(self.catalog_ttl_console_combo.currentText())
+
         # Carica Tema Selezionato
         current_theme_filename = self.settings.value(
             "gui/theme", DEFAULT_THEME_FILENAME
@@ -228,6 +453,60 @@ class SettingsDialog(QDialog):
         if folder:
             self.download_folder_edit.setText(folder)
 
+    def _update_dat_status(self):
+        index = get_dat_index()
+        self.dat_status_label.setText(
+            f"{len(index.dats)} DAT, {len(index)} voci"
+            if len(index)
+            else "Nessun DAT importato"
+        )
+
+    def import_dat(self):
+        """Imports one or more Logiqx DAT files (plain or zipped) into the verification index."""
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Seleziona file DAT", "", "File DAT (*.dat *.xml *.zip)"
+        )
+        if not paths:
+            return
+        index = get_dat_index()
+        imported = 0
+        for path in paths:
+            try:
+                imported += index.import_dat(path)
+            except Exception as e:
+                logging.error(f"Errore durante l'importazione del DAT '{path}': {e}")
+                QMessageBox.critical(
+                    self, "Errore", f"Impossibile importare il DAT:\n{path}\n{e}"
+                )
+        self._update_dat_status()
+        if imported:
+            QMessageBox.information(
+                self,
+                "DAT Importati",
+                f"Importate {imported} voci da {len(paths)} file.",
+            )
+
+    def clear_api_cache(self):
+        """Empties the cache of IGDB/RAWG search results, misses included."""
+        reply = QMessageBox.question(
+            self,
+            "Svuota Cache",
+            "Eliminare i risultati salvati delle ricerche IGDB/RAWG?\n"
+            "I giochi senza metadati verranno cercati di nuovo.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No,
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        if get_api_cache().clear():
+            QMessageBox.information(
+                self, "Cache Svuotata", "Cache delle ricerche svuotata."
+            )
+        else:
+            QMessageBox.critical(
+                self, "Errore", "Impossibile svuotare la cache delle ricerche."
+            )
+
     def add_new_console(self):
         """Adds a new console entry to the configuration."""
         name = self.new_console_name.text().strip()
@@ -292,6 +571,66 @@ class SettingsDialog(QDialog):
             )  # Questa funzione salva già in settings
             logging.info(f"Max download concorrenti impostato su: {new_max_dl}")
 
+        # Applica Connessioni per Download
+        new_segments = self.segments_spin.value()
+        current_segments = int(self.settings.value("dl_segments", DOWNLOAD_SEGMENTS))
+        if new_segments != current_segments:
+            set_download_segments(new_segments)
+
+        # Applica Motore Download
+        new_engine = self.engine_combo.currentData()
+        if new_engine != self.settings.value("download_engine", DOWNLOAD_ENGINE):
+            set_download_engine(new_engine)
+        new_async_max = self.async_max_dl_spin.value()
+        if new_async_max != int(
+            self.settings.value("async_max_dl", ASYNC_MAX_CONCURRENT_DOWNLOADS)
+        ):
+            set_async_max_concurrent_downloads(new_async_max)
+
+        # Applica Impostazioni di Rete
+        new_retries = self.http_retries_spin.value()
+        if new_retries != int(self.settings.value("http_retries", HTTP_RETRIES)):
+            set_http_retries(new_retries)
+        new_timeout = self.http_timeout_spin.value()
+        if new_timeout != int(self.settings.value("http_timeout", HTTP_TIMEOUT)):
+            set_http_timeout(new_timeout)
+
+        # Applica Limiti di Banda (letti dai download in corso a ogni blocco)
+        if self.bw_limit_spin.value() != int(
+            self.settings.value("bw_limit", BANDWIDTH_LIMIT_KBPS)
+        ):
+            set_bandwidth_limit(self.bw_limit_spin.value())
+        if self.bw_per_job_spin.value() != int(
+            self.settings.value("bw_per_job", BANDWIDTH_PER_JOB_KBPS)
+        ):
+            set_bandwidth_per_job(self.bw_per_job_spin.value())
+        new_schedule = (
+            self.bw_schedule_check.isChecked(),
+            self.bw_schedule_start_edit.time().toString("HH:mm"),
+            self.bw_schedule_end_edit.time().toString("HH:mm"),
+            self.bw_schedule_spin.value(),
+        )
+        current_schedule = (
+            self.settings.value(
+                "bw_schedule_enabled", BANDWIDTH_SCHEDULE_ENABLED, type=bool
+            ),
+            self.settings.value("bw_schedule_start", BANDWIDTH_SCHEDULE_START),
+            self.settings.value("bw_schedule_end", BANDWIDTH_SCHEDULE_END),
+            int(
+                self.settings.value("bw_schedule_limit", BANDWIDTH_SCHEDULE_LIMIT_KBPS)
+            ),
+        )
+        if new_schedule != current_schedule:
+            set_bandwidth_schedule(*new_schedule)
+
+        # Applica Durata Cache Catalogo
+        new_ttl = self.catalog_ttl_spin.value()
+        if new_ttl != int(self.settings.value("catalog_ttl_hours", CATALOG_TTL_HOURS)):
+            set_catalog_ttl(new_ttl)
+        for console_name, hours in self.catalog_ttl_overrides.items():
+            if hours != self._saved_catalog_ttl_overrides.get(console_name, 0):
+                set_catalog_ttl(hours, console_name)
+
         # Applica Tema
         selected_display_name = self.theme_combo.currentText()
         selected_filename = self.theme_map.get(selected_display_name)
@@ -349,5 +688,7 @@ class SettingsDialog(QDialog):
         return {
             "download_folder": self.download_folder_edit.text(),
             "max_dl": self.max_dl_spin.value(),
+            "dl_segments": self.segments_spin.value(),
+            "download_engine": self.engine_combo.currentData(),
             "theme_filename": selected_theme_filename,
         }
@@ -0,0 +1,98 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src import config
+
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_POOL_HOSTS = 16
+
+_session = None
+_session_key = None
+_session_lock = threading.Lock()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to requests that set none."""
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def _current_key():
+    return (
+        config.MAX_CONCURRENT_DOWNLOADS,
+        config.DOWNLOAD_SEGMENTS,
+        config.HTTP_RETRIES,
+        config.HTTP_TIMEOUT,
+    )
+
+
+def _build_session(key):
+    max_downloads, segments, retries, timeout = key
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        raise_on_status=False,
+    )
+    pool_size = max(max_downloads * segments, 4)
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+        timeout=(HTTP_CONNECT_TIMEOUT, timeout),
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    logging.debug(
+        f"Sessione HTTP creata: pool {pool_size} connessioni/host, "
+        f"{retries} tentativi, timeout {timeout}s."
+    )
+    return session
+
+
+def get_session():
+    """
+    Returns the process-wide pooled session used by scraping, downloads and
+    metadata lookups. The session is rebuilt when the download concurrency or
+    the retry/timeout settings change, so pools always match the current limits.
+    The previous session is closed: its idle connections are dropped at once,
+    the ones still serving a request when they are released.
+    """
+    global _session, _session_key
+    key = _current_key()
+    with _session_lock:
+        if _session is None or _session_key != key:
+            previous = _session
+            _session = _build_session(key)
+            _session_key = key
+            if previous is not None:
+                previous.close()
+        return _session
+
+
+def get(url, **kwargs):
+    return get_session().get(url, **kwargs)
+
+
+def head(url, **kwargs):
+    return get_session().head(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return get_session().post(url, **kwargs)
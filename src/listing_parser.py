@@ -0,0 +1,89 @@
+from html.parser import HTMLParser
+
+LISTING_CHUNK_SIZE = 1024 * 64
+
+
+class ListingParser(HTMLParser):
+    """
+    Incremental parser for myrient directory listings.
+    Instead of building a DOM it tracks just enough state (current <tr>, the
+    first td.link / td.size of the row, the first <a href> of the link cell)
+    to emit one row at a time. Completed rows are collected in self.rows as
+    (href, title or None, size text or None) and drained by the caller after
+    every feed().
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._in_row = False
+        self._reset_row()
+
+    def _reset_row(self):
+        self._cell = None
+        self._seen_link_td = False
+        self._seen_size_td = False
+        self._anchor = None
+        self._size_parts = None
+
+    def _finish_row(self):
+        if self._in_row and self._anchor is not None:
+            href, title = self._anchor
+            size_text = (
+                "".join(self._size_parts) if self._size_parts is not None else None
+            )
+            self.rows.append((href, title, size_text))
+        self._in_row = False
+        self._reset_row()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._finish_row()
+            self._in_row = True
+        elif tag == "td" and self._in_row:
+            classes = next((v or "" for k, v in attrs if k == "class"), "").split()
+            if "link" in classes and not self._seen_link_td:
+                self._seen_link_td = True
+                self._cell = "link"
+            elif "size" in classes and not self._seen_size_td:
+                self._seen_size_td = True
+                self._cell = "size"
+                self._size_parts = []
+            else:
+                self._cell = None
+        elif tag == "a" and self._cell == "link" and self._anchor is None:
+            attributes = dict(attrs)
+            if "href" in attributes:
+                # Valueless attributes come as None; BeautifulSoup reads them as "".
+                title = (attributes["title"] or "") if "title" in attributes else None
+                self._anchor = (attributes["href"] or "", title)
+
+    def handle_endtag(self, tag):
+        if tag == "td":
+            self._cell = None
+        elif tag == "tr":
+            self._finish_row()
+
+    def handle_data(self, data):
+        if self._cell == "size":
+            self._size_parts.append(data)
+
+    def close(self):
+        super().close()
+        self._finish_row()
+
+
+def iter_listing_rows(chunks):
+    """
+    Feeds decoded text chunks to a ListingParser and yields each row
+    (href, title, size_text) as soon as its </tr> has been seen.
+    """
+    parser = ListingParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.rows:
+            yield from parser.rows
+            parser.rows.clear()
+    parser.close()
+    yield from parser.rows
+    parser.rows.clear()
@@ -7,6 +7,7 @@ from datetime import datetime, timezone
 
 import requests
 
+from src import http_client
 from src.config import COVERS_FOLDER, METADATA_FOLDER
 from src.utils import clean_rom_title
 
@@ -87,7 +88,7 @@ def download_cover(image_url, rom_path):
     save_path = os.path.join(COVERS_FOLDER, cover_filename)
 
     try:
-        response = requests.get(image_url, stream=True, timeout=10)
+        response = http_client.get(image_url, stream=True)
         response.raise_for_status()
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
         with open(save_path, "wb") as f:
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from src import config
+from src.workers.retry_policy import parse_retry_after
+
+# Longest single sleep of a throttled sync download, so cancel stays responsive.
+MAX_SLEEP_SLICE = 0.25
+
+API_IGDB = "igdb"
+API_RAWG = "rawg"
+# Client-side quotas of the metadata APIs: (requests per second, requests in
+# flight). IGDB documents 4 req/s and 8 open requests; RAWG documents no
+# per-second limit, so it gets a conservative one.
+API_RATE_LIMITS = {
+    API_IGDB: (4, 8),
+    API_RAWG: (5, 4),
+}
+# Retries of a request answered 429, and the wait when there is no
+# Retry-After header (doubled on each retry).
+API_MAX_RETRIES = 3
+API_RETRY_BACKOFF = 1.0
+API_MAX_RETRY_AFTER = 60.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve(n) takes n tokens right away (going into
+    debt if needed) and returns how long the caller must wait before using
+    them, so a throttled caller sleeps once per chunk instead of polling.
+    A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate=0, burst=None):
+        self._lock = threading.Lock()
+        self.rate = 0
+        self.burst = 0
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        with self._lock:
+            if rate == self.rate and (burst is None or burst == self.burst):
+                return
+            self.rate = rate
+            # One second worth of tokens by default: smooth but not chunky.
+            self.burst = burst if burst is not None else rate
+            self.tokens = min(self.tokens, self.burst)
+            self.last = time.monotonic()
+
+    def reserve(self, n):
+        """Consumes n tokens and returns the delay in seconds before they are available."""
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= n
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+def _minutes(hhmm):
+    hours, minutes = (int(part) for part in hhmm.split(":"))
+    return hours * 60 + minutes
+
+
+def get_global_limit_kbps(now=None):
+    """Returns the global cap in KiB/s for the given time, applying the schedule."""
+    if config.BANDWIDTH_SCHEDULE_ENABLED:
+        now = now or datetime.now()
+        current = now.hour * 60 + now.minute
+        try:
+            start = _minutes(config.BANDWIDTH_SCHEDULE_START)
+            end = _minutes(config.BANDWIDTH_SCHEDULE_END)
+        except (ValueError, AttributeError):
+            return config.BANDWIDTH_LIMIT_KBPS
+        in_window = (
+            start <= current < end
+            if start <= end
+            else current >= start or current < end
+        )
+        if in_window:
+            return config.BANDWIDTH_SCHEDULE_LIMIT_KBPS
+    return config.BANDWIDTH_LIMIT_KBPS
+
+
+_global_bucket = TokenBucket()
+
+
+class BandwidthLimiter:
+    """
+    Throttle for one download: every chunk is charged to the process-wide
+    bucket shared by all downloads and to this job's own bucket. Limits are
+    re-read from config on each chunk, so changes in SettingsDialog apply to
+    running downloads.
+    """
+
+    def __init__(self):
+        self.job_bucket = TokenBucket()
+
+    def reserve(self, n):
+        _global_bucket.set_rate(get_global_limit_kbps() * 1024)
+        self.job_bucket.set_rate(config.BANDWIDTH_PER_JOB_KBPS * 1024)
+        return max(_global_bucket.reserve(n), self.job_bucket.reserve(n))
+
+    def throttle(self, n, should_stop=None):
+        """Blocks until n bytes may be consumed; returns early if should_stop() becomes true."""
+        delay = self.reserve(n)
+        deadline = time.monotonic() + delay
+        while delay > 0:
+            if should_stop and should_stop():
+                return
+            time.sleep(min(delay, MAX_SLEEP_SLICE))
+            delay = deadline - time.monotonic()
+
+    async def throttle_async(self, n):
+        delay = self.reserve(n)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ApiRateLimiter:
+    """
+    Paces the requests to one API provider across all threads: a TokenBucket
+    for the request rate, a semaphore for the requests in flight, and a
+    shared pause set when the server answers 429, so every caller backs off
+    for Retry-After instead of only the one that was throttled.
+    """
+
+    def __init__(self, name, rate, max_concurrent):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst=1)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    @contextmanager
+    def slot(self):
+        """Blocks until a request may be sent, and holds a slot while it runs."""
+        with self._slots:
+            while True:
+                delay = self.bucket.reserve(1)
+                if delay > 0:
+                    time.sleep(delay)
+                # A 429 may have come in meanwhile: wait it out and queue
+                # up again, so the waiting callers do not resume all at once.
+                with self._lock:
+                    pause = self._paused_until - time.monotonic()
+                if pause <= 0:
+                    break
+                time.sleep(pause)
+            yield
+
+    def pause(self, seconds):
+        seconds = min(seconds, API_MAX_RETRY_AFTER)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logging.warning(
+            f"[{self.name}] Limite richieste superato, pausa di {seconds:.1f}s."
+        )
+
+    def request(self, send):
+        """
+        Sends a request through the limiter: send() performs it and returns the
+        response. A 429 answer pauses the provider (Retry-After, or exponential
+        backoff) and is retried up to API_MAX_RETRIES times; the last response
+        is returned either way.
+        """
+        for attempt in range(API_MAX_RETRIES + 1):
+            with self.slot():
+                response = send()
+            if response.status_code != 429 or attempt == API_MAX_RETRIES:
+                return response
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = API_RETRY_BACKOFF * 2**attempt
+            self.pause(delay)
+        return response
+
+
+_api_limiters = {}
+_api_limiters_lock = threading.Lock()
+
+
+def get_api_limiter(provider):
+    """Returns the process-wide ApiRateLimiter of a provider (API_IGDB, API_RAWG)."""
+    with _api_limiters_lock:
+        limiter = _api_limiters.get(provider)
+        if limiter is None:
+            rate, max_concurrent = API_RATE_LIMITS[provider]
+            limiter = _api_limiters[provider] = ApiRateLimiter(
+                provider.upper(), rate, max_concurrent
+            )
+        return limiter
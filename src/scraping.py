@@ -1,17 +1,42 @@
 import json
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from urllib.parse import unquote, urljoin
 
 import requests
-from bs4 import BeautifulSoup
 from thefuzz import fuzz
 
-from src.config import BASE_URL, CACHE_FOLDER, CONSOLES
+from src import http_client
+from src.api_cache import get_api_cache
+from src.catalog_store import GAME_COLUMNS, get_catalog_store
+from src.config import BASE_URL, CACHE_FOLDER, CONSOLES, get_catalog_ttl
+from src.listing_parser import LISTING_CHUNK_SIZE, iter_listing_rows
 from src.mapping import apply_title_term_map, simplify_title
-from src.utils import clean_rom_title
+from src.rate_limiter import API_IGDB, API_RAWG, get_api_limiter
+from src.utils import clean_rom_title, file_lock
+
+CATALOG_SYNC_WORKERS = 4
+
+# IGDB /multiquery accepts at most this many named queries per request.
+IGDB_MULTIQUERY_LIMIT = 10
+IGDB_GAME_FIELDS = "name, summary, first_release_date, genres.name, cover.url"
+MIN_SIMILARITY_THRESHOLD = 80
+
+# The Twitch app token is shared by every process through this file.
+TWITCH_TOKEN_CACHE_PATH = os.path.join(CACHE_FOLDER, "twitch_token.json")
+TWITCH_TOKEN_LOCK_PATH = TWITCH_TOKEN_CACHE_PATH + ".lock"
+# A token is refreshed this many seconds before it expires.
+TWITCH_TOKEN_MARGIN = 60
+
+CATALOG_SYNC_UPDATED = "updated"
+CATALOG_SYNC_UNCHANGED = "unchanged"
+CATALOG_SYNC_FRESH = "fresh"
+CATALOG_SYNC_SKIPPED = "skipped"
+CATALOG_SYNC_ERROR = "error"
 
 
 def get_console_url(console_name):
@@ -40,63 +65,204 @@ def parse_size_string(size_str):
         return 0
 
 
-def get_games_for_console(console_name):
+def iter_games_for_console(console_name, response=None):
+    """
+    Streams the console listing and yields a game dict per row as soon as it
+    is parsed, without building a DOM of the whole page. An already opened
+    streamed response can be passed in (e.g. after a conditional request).
+    """
     url = get_console_url(console_name)
-    logging.info(f"Inizio scraping per console '{console_name}' all'URL: {url}")
-    response = requests.get(url, timeout=30)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
-    games = []
-    rows = soup.find_all("tr")
-    for idx, row in enumerate(rows):
-        link_td = row.find("td", class_="link")
-        if not link_td:
-            continue
-        a_tag = link_td.find("a", href=True)
-        if not a_tag:
-            continue
-        href = a_tag["href"]
-        full_link = urljoin(url, href)
-        file_name = unquote(a_tag.get("title", os.path.basename(full_link)))
-        name, _ = os.path.splitext(file_name)
-        size_td = row.find("td", class_="size")
-        size_text = size_td.text.strip() if size_td else "0 MB"
-        size_bytes = parse_size_string(size_text)
-        game = {
-            "name": name,
-            "link": full_link,
-            "size_bytes": size_bytes,
-            "size_str": size_text,
-            "console": console_name,
-        }
-        games.append(game)
-        if idx % 100 == 0 and idx > 0:
-            logging.debug(f"Processati {idx} giochi...")
+    if response is None:
+        logging.info(f"Inizio scraping per console '{console_name}' all'URL: {url}")
+        response = http_client.get(url, stream=True)
+    with response:
+        response.raise_for_status()
+        if response.encoding is None:
+            response.encoding = "utf-8"
+        chunks = response.iter_content(
+            chunk_size=LISTING_CHUNK_SIZE, decode_unicode=True
+        )
+        for idx, (href, title, size_text) in enumerate(iter_listing_rows(chunks)):
+            full_link = urljoin(url, href)
+            file_name = unquote(
+                title if title is not None else os.path.basename(full_link)
+            )
+            name, _ = os.path.splitext(file_name)
+            size_text = size_text.strip() if size_text is not None else "0 MB"
+            size_bytes = parse_size_string(size_text)
+            yield {
+                "name": name,
+                "link": full_link,
+                "size_bytes": size_bytes,
+                "size_str": size_text,
+                "console": console_name,
+            }
+            if idx % 100 == 0 and idx > 0:
+                logging.debug(f"Processati {idx} giochi...")
+
+
+def get_games_for_console(console_name):
+    games = list(iter_games_for_console(console_name))
     logging.info(f"Scraping completato: trovati {len(games)} giochi")
     return games
 
 
-def get_games_for_console_cached(console_name):
-    filename = os.path.join(CACHE_FOLDER, f"cache_{console_name}.json")
-    if os.path.exists(filename):
-        try:
-            with open(filename, "r", encoding="utf-8") as f:
-                games = json.load(f)
-            logging.info(f"Cache caricata per console '{console_name}'")
-            for game in games:
-                if "console" not in game:
-                    game["console"] = console_name
-            return games
-        except Exception as e:
-            logging.error(f"Errore nel caricamento della cache: {e}")
-    games = get_games_for_console(console_name)
+def get_catalog_cache_path(console_name):
+    """Path of the legacy JSON cache, only read to migrate it into the store."""
+    return os.path.join(CACHE_FOLDER, f"cache_{console_name}.json")
+
+
+def load_catalog_meta(console_name):
+    """
+    Returns the validators and fetch time of a cached catalog without loading
+    its games, migrating a legacy JSON cache first. None if nothing is cached.
+    """
+    store = get_catalog_store()
+    if not store.has_catalog(console_name):
+        legacy_path = get_catalog_cache_path(console_name)
+        if not os.path.exists(legacy_path) or not store.import_json_cache(
+            console_name, legacy_path
+        ):
+            return None
+    return store.get_meta(console_name)
+
+
+def load_catalog_cache(console_name, columns=GAME_COLUMNS):
+    """
+    Loads the cached catalog of a console from the catalog store, migrating
+    a legacy JSON cache on first use.
+    Returns {"games", "etag", "last_modified", "fetched_at"} or None. Migrated
+    caches written before revalidation existed have fetched_at 0, so they are
+    revalidated on first use. columns limits the keys of each game dict.
+    """
+    entry = load_catalog_meta(console_name)
+    if entry is None:
+        return None
+    entry["games"] = get_catalog_store().load_games(console_name, columns)
+    logging.info(f"Cache caricata per console '{console_name}'")
+    return entry
+
+
+def save_catalog_cache(console_name, entry):
+    """Writes a scraped catalog to the store and returns its CatalogDiff (None on error)."""
+    diff = get_catalog_store().save(console_name, entry)
+    if diff is not None:
+        logging.info(f"Cache salvata per console '{console_name}': {diff.summary()}")
+    return diff
+
+
+def is_catalog_stale(console_name, entry):
+    return time.time() - entry.get("fetched_at", 0) >= get_catalog_ttl(console_name)
+
+
+def revalidate_catalog(console_name, entry=None):
+    """
+    Refreshes a console catalog with a conditional request (If-None-Match /
+    If-Modified-Since). On 304 the cached list is kept without re-parsing and
+    only its fetch time is updated; otherwise the new listing is diffed
+    against the cache and only the changes are stored.
+    Returns (entry, diff), where diff is the CatalogDiff (empty if the listing
+    did not change) or None on 304.
+    """
+    url = get_console_url(console_name)
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    logging.info(f"Inizio scraping per console '{console_name}' all'URL: {url}")
+    response = http_client.get(url, stream=True, headers=headers)
+    if entry and response.status_code == 304:
+        response.close()
+        logging.info(f"Catalogo di '{console_name}' non modificato (304).")
+        entry["fetched_at"] = time.time()
+        get_catalog_store().touch(console_name, entry["fetched_at"])
+        return entry, None
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    games = list(iter_games_for_console(console_name, response))
+    logging.info(f"Scraping completato: trovati {len(games)} giochi")
+    entry = {
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": time.time(),
+        "games": games,
+    }
+    return entry, save_catalog_cache(console_name, entry)
+
+
+def get_games_for_console_cached(console_name, force_refresh=False):
+    entry = load_catalog_cache(console_name)
+    if entry and not force_refresh and not is_catalog_stale(console_name, entry):
+        return entry["games"]
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(games, f, ensure_ascii=False, indent=4)
-        logging.info(f"Cache salvata per console '{console_name}'")
-    except Exception as e:
-        logging.error(f"Errore nel salvataggio della cache: {e}")
-    return games
+        entry, _ = revalidate_catalog(console_name, entry)
+    except requests.exceptions.RequestException as e:
+        if not entry:
+            raise
+        logging.warning(
+            f"Aggiornamento catalogo '{console_name}' fallito, uso la cache: {e}"
+        )
+    return entry["games"]
+
+
+def sync_catalog(console_name, force_refresh=False):
+    """
+    Brings the cached catalog of one console up to date. Returns (status,
+    diff): CATALOG_SYNC_FRESH if the cache was within its TTL, otherwise
+    CATALOG_SYNC_UPDATED or CATALOG_SYNC_UNCHANGED, with the CatalogDiff of
+    the refresh (None when nothing was scraped).
+    """
+    entry = load_catalog_meta(console_name)
+    if entry and not force_refresh and not is_catalog_stale(console_name, entry):
+        return CATALOG_SYNC_FRESH, None
+    _, diff = revalidate_catalog(console_name, entry)
+    return (CATALOG_SYNC_UPDATED if diff else CATALOG_SYNC_UNCHANGED), diff
+
+
+def sync_all_catalogs(
+    consoles=None,
+    force_refresh=False,
+    max_workers=CATALOG_SYNC_WORKERS,
+    progress_callback=None,
+    should_stop=None,
+):
+    """
+    Syncs the catalogs of every console (CONSOLES, runtime additions included,
+    unless a list is given) with a bounded thread pool. Each catalog is
+    written to the store in a single transaction. progress_callback is called
+    as (console, status, diff, done, total) as each console completes.
+    Returns {console: status}, where a failure is CATALOG_SYNC_ERROR.
+    """
+    consoles = list(CONSOLES if consoles is None else consoles)
+    results = {}
+
+    def sync(console_name):
+        if should_stop and should_stop():
+            return CATALOG_SYNC_SKIPPED, None
+        return sync_catalog(console_name, force_refresh)
+
+    logging.info(
+        f"Sincronizzazione di {len(consoles)} cataloghi ({max_workers} in parallelo)..."
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(sync, console): console for console in consoles}
+        for done, future in enumerate(as_completed(futures), start=1):
+            console_name = futures[future]
+            try:
+                status, diff = future.result()
+            except Exception as e:
+                logging.error(
+                    f"Sincronizzazione catalogo '{console_name}' fallita: {e}"
+                )
+                status, diff = CATALOG_SYNC_ERROR, None
+            results[console_name] = status
+            if progress_callback:
+                progress_callback(console_name, status, diff, done, len(consoles))
+    return results
 
 
 class GameApiClient:
@@ -116,6 +282,7 @@ class GameApiClient:
 
         self.twitch_token = None
         self.token_expiry_time = 0
+        self._token_lock = threading.Lock()
         self.twitch_token_url = "https://id.twitch.tv/oauth2/token"
         self.igdb_api_url = "https://api.igdb.com/v4"
 
@@ -126,10 +293,87 @@ class GameApiClient:
             )
             return False
 
-        if self.twitch_token and time.time() < self.token_expiry_time - 60:
+        if self._token_valid():
             logging.debug("Token Twitch esistente ancora valido.")
             return True
 
+        # Single flight: one thread refreshes while the others wait for it,
+        # and the file lock does the same across processes.
+        with self._token_lock:
+            if self._token_valid():
+                return True
+            with file_lock(TWITCH_TOKEN_LOCK_PATH):
+                if self._load_cached_token():
+                    logging.debug("Token Twitch letto dalla cache.")
+                    return True
+                if not self._request_twitch_token():
+                    return False
+                self._save_cached_token()
+                return True
+
+    def _token_valid(self):
+        return bool(
+            self.twitch_token
+            and time.time() < self.token_expiry_time - TWITCH_TOKEN_MARGIN
+        )
+
+    def _load_cached_token(self):
+        """Takes the token saved by this or another process, if still valid."""
+        try:
+            with open(TWITCH_TOKEN_CACHE_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logging.warning(f"Cache token Twitch illeggibile, ignorata: {e}")
+            return False
+        if not isinstance(data, dict) or data.get("client_id") != self.twitch_client_id:
+            return False
+        self.twitch_token = data.get("access_token")
+        self.token_expiry_time = data.get("expires_at") or 0
+        return self._token_valid()
+
+    def _save_cached_token(self):
+        tmp_path = TWITCH_TOKEN_CACHE_PATH + ".tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "client_id": self.twitch_client_id,
+                        "access_token": self.twitch_token,
+                        "expires_at": self.token_expiry_time,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, TWITCH_TOKEN_CACHE_PATH)
+        except OSError as e:
+            logging.warning(f"Impossibile salvare la cache del token Twitch: {e}")
+
+    def _invalidate_twitch_token(self, token):
+        """
+        Drops a token IGDB rejected, here and in the shared cache, unless
+        another thread or process has already replaced it.
+        """
+        with self._token_lock:
+            with file_lock(TWITCH_TOKEN_LOCK_PATH):
+                if self.twitch_token == token:
+                    self.twitch_token = None
+                    self.token_expiry_time = 0
+                try:
+                    with open(TWITCH_TOKEN_CACHE_PATH, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    return
+                if isinstance(data, dict) and data.get("access_token") == token:
+                    try:
+                        os.remove(TWITCH_TOKEN_CACHE_PATH)
+                    except OSError as e:
+                        logging.warning(
+                            f"Impossibile rimuovere la cache del token Twitch: {e}"
+                        )
+
+    def _request_twitch_token(self):
         logging.info("Richiesta nuovo token di accesso Twitch...")
         payload = {
             "client_id": self.twitch_client_id,
@@ -139,8 +383,8 @@ class GameApiClient:
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
         try:
-            response = requests.post(
-                self.twitch_token_url, data=payload, headers=headers, timeout=10
+            response = http_client.post(
+                self.twitch_token_url, data=payload, headers=headers
             )
             response.raise_for_status()
             token_data = response.json()
@@ -170,20 +414,32 @@ class GameApiClient:
             self.twitch_token = None
             return False
 
-    def _make_igdb_request(self, endpoint, query_body):
+    def _make_igdb_request(self, endpoint, query_body, retry_unauthorized=True):
         if not self._get_twitch_token():
             return None
 
+        token = self.twitch_token
         headers = {
             "Client-ID": self.twitch_client_id,
-            "Authorization": f"Bearer {self.twitch_token}",
+            "Authorization": f"Bearer {token}",
         }
         full_url = f"{self.igdb_api_url}/{endpoint}"
 
         try:
-            response = requests.post(
-                full_url, headers=headers, data=query_body.encode("utf-8"), timeout=15
+            response = get_api_limiter(API_IGDB).request(
+                lambda: http_client.post(
+                    full_url, headers=headers, data=query_body.encode("utf-8")
+                )
             )
+            if response.status_code == 401 and retry_unauthorized:
+                # Revoked or expired early: get a new token and retry once.
+                logging.warning(
+                    f"Token Twitch rifiutato da IGDB ('{endpoint}'), lo rinnovo."
+                )
+                self._invalidate_twitch_token(token)
+                return self._make_igdb_request(
+                    endpoint, query_body, retry_unauthorized=False
+                )
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -195,24 +451,19 @@ class GameApiClient:
             )
             return None
 
-    def search_igdb(self, title, platform_name=None):
-        if not self.twitch_client_id:
-            return None
+    def _igdb_game_query(self, title, platform_name=None):
+        """Body of an IGDB games query searching title (without the endpoint)."""
         platform_id = IGDB_PLATFORM_MAP.get(platform_name)
-        query = f"""
-            fields name, summary, first_release_date, genres.name, cover.url;
-            search "{title}";
-            limit 5;
-            """
+        query = f"fields {IGDB_GAME_FIELDS}; search {igdb_string(title)}; limit 5;"
         if platform_id:
             query += f" where platforms = ({platform_id});"
         else:
             logging.warning(
                 f"[IGDB] ID piattaforma non trovato per '{platform_name}', ricerca senza filtro piattaforma."
             )
+        return query
 
-        results = self._make_igdb_request("games", query)
-
+    def _parse_igdb_results(self, title, results):
         if not results:
             logging.info(f"[IGDB] Nessun risultato per '{title}'")
             return None
@@ -243,9 +494,77 @@ class GameApiClient:
             "cover_url": cover_url,
         }
 
+    def search_igdb(self, title, platform_name=None):
+        if not self.twitch_client_id:
+            return None
+        cached, details = get_api_cache().get(API_IGDB, title, platform_name)
+        if cached:
+            logging.debug(f"[IGDB] Risultato in cache per '{title}'")
+            return details
+        results = self._make_igdb_request(
+            "games", self._igdb_game_query(title, platform_name)
+        )
+        details = self._parse_igdb_results(title, results)
+        if results is not None:
+            get_api_cache().put(API_IGDB, title, platform_name, details)
+        return details
+
+    def search_igdb_batch(self, searches):
+        """
+        Runs many IGDB searches through /multiquery, IGDB_MULTIQUERY_LIMIT per
+        request. searches is a list of (title, platform name); returns
+        {(title, platform name): details or None}. Searches of a request that
+        failed, or missing from its response, are left out, so callers can
+        tell them from "no result".
+        Cached results are not sent again.
+        """
+        if not self.twitch_client_id:
+            return {}
+        cache = get_api_cache()
+        found = {}
+        pending = []
+        for title, platform in dict.fromkeys(searches):
+            cached, details = cache.get(API_IGDB, title, platform)
+            if cached:
+                found[(title, platform)] = details
+            else:
+                pending.append((title, platform))
+        cached_count = len(found)
+        for start in range(0, len(pending), IGDB_MULTIQUERY_LIMIT):
+            chunk = pending[start : start + IGDB_MULTIQUERY_LIMIT]
+            body = "\n".join(
+                f'query games "{i}" {{ {self._igdb_game_query(title, platform)} }};'
+                for i, (title, platform) in enumerate(chunk)
+            )
+            response = self._make_igdb_request("multiquery", body)
+            if response is None:
+                continue
+            # Only the sub-queries the response answered are results (and
+            # cacheable misses); a missing or errored block is left out.
+            results = {
+                entry.get("name"): entry["result"]
+                for entry in response
+                if isinstance(entry, dict) and isinstance(entry.get("result"), list)
+            }
+            for i, (title, platform) in enumerate(chunk):
+                if str(i) not in results:
+                    continue
+                details = self._parse_igdb_results(title, results[str(i)])
+                found[(title, platform)] = details
+                cache.put(API_IGDB, title, platform, details)
+        logging.debug(
+            f"[IGDB] {cached_count} ricerche in cache, {len(pending)} in "
+            f"{-(-len(pending) // IGDB_MULTIQUERY_LIMIT)} richieste multiquery."
+        )
+        return found
+
     def search_rawg(self, title, platform_name=None):
         if not self.rawg_api_key:
             return None
+        cached, details = get_api_cache().get(API_RAWG, title, platform_name)
+        if cached:
+            logging.debug(f"[RAWG] Risultato in cache per '{title}'")
+            return details
 
         base_url = "https://api.rawg.io/api/games"
         platform_id = RAWG_PLATFORM_MAP.get(platform_name)
@@ -258,7 +577,9 @@ class GameApiClient:
             )
 
         try:
-            response = requests.get(base_url, params=params, timeout=10)
+            response = get_api_limiter(API_RAWG).request(
+                lambda: http_client.get(base_url, params=params)
+            )
             response.raise_for_status()
             data = response.json()
 
@@ -275,7 +596,7 @@ class GameApiClient:
                 cover_url = game.get("background_image")
                 description = f"Descrizione non recuperata da RAWG (richiede chiamata addizionale all'ID: {game.get('id')})"
 
-                return {
+                details = {
                     "api_source": "RAWG",
                     "api_title": game.get("name"),
                     "description": description,
@@ -286,7 +607,9 @@ class GameApiClient:
                 }
             else:
                 logging.info(f"[RAWG] Nessun risultato per '{title}'")
-                return None
+                details = None
+            get_api_cache().put(API_RAWG, title, platform_name, details)
+            return details
 
         except requests.exceptions.RequestException as e:
             logging.error(f"Errore richiesta RAWG per '{title}': {e}")
@@ -301,15 +624,21 @@ class GameApiClient:
 game_api_client_instance = GameApiClient()
 
 
-def fetch_game_details(original_filename, console_name):
-    if not original_filename:
-        return None
+def igdb_string(value):
+    """Quotes a string for an IGDB (Apicalypse) query."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
 
+
+def get_search_attempts(original_filename):
+    """
+    Returns the titles to search for a ROM file, best first: the cleaned
+    title, then its mapped, simplified and base ("Title - Subtitle") forms.
+    """
     # Assume clean_rom_title, apply_title_term_map, simplify_title sono definite/importate
     cleaned_title = clean_rom_title(original_filename)
     if not cleaned_title:
         logging.warning(f"[API Fetch] Titolo pulito vuoto per '{original_filename}'")
-        return None
+        return []
 
     logging.info(
         f"[API Fetch] Inizio ricerca per '{original_filename}' -> Pulito: '{cleaned_title}'"
@@ -341,58 +670,95 @@ def fetch_game_details(original_filename, console_name):
             unique_attempts.append(item)
 
     logging.debug(f"[API Fetch] Tentativi di ricerca ordinati: {unique_attempts}")
+    return unique_attempts
 
-    MIN_SIMILARITY_THRESHOLD = 80
 
-    for attempt_title in unique_attempts:
-        logging.debug(
-            f"[API Fetch] Tentativo IGDB con '{attempt_title}' (Console: {console_name})..."
+def validate_api_result(attempt_title, details, source):
+    """True if the title found by the API is close enough to the searched one."""
+    api_title = details.get("api_title") or ""
+    similarity_score = fuzz.token_set_ratio(attempt_title.lower(), api_title.lower())
+    logging.debug(
+        f"[API Validation {source}] Confronto: '{attempt_title}' vs API '{api_title}' -> Score: {similarity_score}"
+    )
+    if similarity_score >= MIN_SIMILARITY_THRESHOLD:
+        logging.info(
+            f"[API Fetch] SUCCESSO ({source}): Trovato '{api_title}' "
+            f"con score {similarity_score} >= {MIN_SIMILARITY_THRESHOLD}"
         )
-        igdb_details = game_api_client_instance.search_igdb(attempt_title, console_name)
-        if igdb_details:
-            api_title = igdb_details.get("api_title", "")
-            similarity_score = fuzz.token_set_ratio(
-                attempt_title.lower(), api_title.lower()
-            )
-            logging.debug(
-                f"[API Validation IGDB] Confronto: '{attempt_title}' vs API '{api_title}' -> Score: {similarity_score}"
-            )
-            if similarity_score >= MIN_SIMILARITY_THRESHOLD:
-                logging.info(
-                    f"[API Fetch] SUCCESSO (IGDB): Trovato '{api_title}' con score {similarity_score} >= {MIN_SIMILARITY_THRESHOLD}"
-                )
-                return igdb_details
+        return True
+    logging.warning(
+        f"[API Fetch] RISULTATO SCARTATO ({source}): API ha trovato '{api_title}', "
+        f"ma similarità ({similarity_score}) troppo bassa rispetto a '{attempt_title}'."
+    )
+    return False
+
+
+def fetch_game_details_batch(roms):
+    """
+    Looks up many ROMs at once. roms is a list of (original_filename,
+    console_name); returns the list of details (or None) in the same order.
+    The IGDB searches of every title variant of every ROM are sent together
+    through /multiquery; then each ROM takes, as fetch_game_details always
+    did, the first valid result walking its variants in order, IGDB before
+    RAWG (RAWG has no batch API and is only asked when IGDB had no match).
+    """
+    attempts = [
+        get_search_attempts(filename) if filename else [] for filename, _ in roms
+    ]
+    igdb_results = game_api_client_instance.search_igdb_batch(
+        [
+            (title, console_name)
+            for titles, (_, console_name) in zip(attempts, roms)
+            for title in titles
+        ]
+    )
+
+    details = []
+    for titles, (original_filename, console_name) in zip(attempts, roms):
+        found = None
+        for attempt_title in titles:
+            key = (attempt_title, console_name)
+            if key in igdb_results:
+                igdb_details = igdb_results[key]
             else:
-                logging.warning(
-                    f"[API Fetch] RISULTATO SCARTATO (IGDB): API ha trovato '{api_title}', ma similarità ({similarity_score}) troppo bassa rispetto a '{attempt_title}'."
+                # Not batched (no credentials) or its multiquery request failed.
+                logging.debug(
+                    f"[API Fetch] Tentativo IGDB con '{attempt_title}' (Console: {console_name})..."
+                )
+                igdb_details = game_api_client_instance.search_igdb(
+                    attempt_title, console_name
                 )
+            if igdb_details and validate_api_result(
+                attempt_title, igdb_details, "IGDB"
+            ):
+                found = igdb_details
+                break
 
-        logging.debug(
-            f"[API Fetch] Tentativo RAWG con '{attempt_title}' (Console: {console_name})..."
-        )
-        rawg_details = game_api_client_instance.search_rawg(attempt_title, console_name)
-        if rawg_details:
-            api_title = rawg_details.get("api_title", "")
-            similarity_score = fuzz.token_set_ratio(
-                attempt_title.lower(), api_title.lower()
-            )
             logging.debug(
-                f"[API Validation RAWG] Confronto: '{attempt_title}' vs API '{api_title}' -> Score: {similarity_score}"
+                f"[API Fetch] Tentativo RAWG con '{attempt_title}' (Console: {console_name})..."
             )
-            if similarity_score >= MIN_SIMILARITY_THRESHOLD:
-                logging.info(
-                    f"[API Fetch] SUCCESSO (RAWG): Trovato '{api_title}' con score {similarity_score} >= {MIN_SIMILARITY_THRESHOLD}"
-                )
-                return rawg_details
-            else:
-                logging.warning(
-                    f"[API Fetch] RISULTATO SCARTATO (RAWG): API ha trovato '{api_title}', ma similarità ({similarity_score}) troppo bassa rispetto a '{attempt_title}'."
-                )
+            rawg_details = game_api_client_instance.search_rawg(
+                attempt_title, console_name
+            )
+            if rawg_details and validate_api_result(
+                attempt_title, rawg_details, "RAWG"
+            ):
+                found = rawg_details
+                break
 
-    logging.warning(
-        f"[API Fetch] FALLIMENTO TOTALE: Nessun risultato valido trovato per '{original_filename}' dopo tutti i tentativi e validazioni."
-    )
-    return None
+        if found is None and titles:
+            logging.warning(
+                f"[API Fetch] FALLIMENTO TOTALE: Nessun risultato valido trovato per "
+                f"'{original_filename}' dopo tutti i tentativi e validazioni."
+            )
+        details.append(found)
+    return details
+
+
+def fetch_game_details(original_filename, console_name):
+    if not original_filename:
+        return None
+    return fetch_game_details_batch([(original_filename, console_name)])[0]
 
 
 IGDB_PLATFORM_MAP = {
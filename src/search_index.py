@@ -0,0 +1,207 @@
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+
+from thefuzz import fuzz
+
+NGRAM_SIZE = 3
+QUERY_CACHE_SIZE = 64
+
+# Fuzzy mode: how many prefiltered candidates are scored, how many results
+# are returned and the minimum average word score (0-100) to keep a match.
+FUZZY_CANDIDATES = 2000
+FUZZY_LIMIT = 200
+FUZZY_MIN_SCORE = 60
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _ngrams(text, n=NGRAM_SIZE):
+    """All substrings of text up to n characters long (the trigram keys of shorter terms too)."""
+    return {
+        text[i : i + size]
+        for size in range(1, n + 1)
+        for i in range(len(text) - size + 1)
+    }
+
+
+class SearchIndex:
+    """
+    Search index over the game names of a catalog, built once per load.
+
+    A plain term matches names containing it, like the old substring scan:
+    since terms have no spaces, that means containing it inside one
+    whitespace-separated token. Tokens are kept in an inverted index
+    (token -> game ids) and an n-gram index over the token vocabulary, so a
+    term only checks the few tokens sharing its trigrams. A term ending in
+    "*" is a prefix query on words (runs of letters and digits), answered by
+    bisecting the sorted word list. Several terms are ANDed.
+    fuzzy_search() ranks names against a query with typos or reordered words.
+    """
+
+    def __init__(self, names):
+        self.size = len(names)
+        self.names = names
+        token_postings = {}
+        word_postings = {}
+        for game_id, name in enumerate(names):
+            name = name.lower()
+            for token in set(name.split()):
+                token_postings.setdefault(token, array("i")).append(game_id)
+            for word in set(_WORD_RE.findall(name)):
+                word_postings.setdefault(word, array("i")).append(game_id)
+
+        self.tokens = list(token_postings)
+        self.token_postings = [token_postings[token] for token in self.tokens]
+        ngram_tokens = {}
+        for token_id, token in enumerate(self.tokens):
+            for gram in _ngrams(token):
+                ngram_tokens.setdefault(gram, array("i")).append(token_id)
+        self.ngram_tokens = ngram_tokens
+
+        self.words = sorted(word_postings)
+        self.word_postings = [word_postings[word] for word in self.words]
+        self._cache = {}
+
+    def __len__(self):
+        return self.size
+
+    def _tokens_containing(self, term):
+        grams = [term[i : i + NGRAM_SIZE] for i in range(len(term) - NGRAM_SIZE + 1)]
+        if not grams:
+            grams = [term]
+        candidates = None
+        for gram in sorted(grams, key=lambda g: len(self.ngram_tokens.get(g, ()))):
+            token_ids = self.ngram_tokens.get(gram)
+            if token_ids is None:
+                return []
+            candidates = (
+                set(token_ids) if candidates is None else candidates & set(token_ids)
+            )
+            if len(candidates) < 32:
+                break
+        if len(term) <= NGRAM_SIZE:
+            return candidates
+        return [i for i in candidates if term in self.tokens[i]]
+
+    def _match_term(self, term):
+        """Returns the set of game ids matching one query term."""
+        cached = self._cache.get(term)
+        if cached is not None:
+            return cached
+        ids = set()
+        if term.endswith("*"):
+            prefix = term[:-1]
+            start = bisect_left(self.words, prefix)
+            for i in range(start, len(self.words)):
+                if not self.words[i].startswith(prefix):
+                    break
+                ids.update(self.word_postings[i])
+        else:
+            for token_id in self._tokens_containing(term):
+                ids.update(self.token_postings[token_id])
+        if len(self._cache) >= QUERY_CACHE_SIZE:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[term] = ids
+        return ids
+
+    def _fuzzy_candidates(self, words, count):
+        """
+        Prefilter for fuzzy_search: scores each game by how many n-grams of
+        every query word its tokens share, and returns the best count ids.
+        """
+        game_scores = {}
+        for word in words:
+            grams = [
+                word[i : i + NGRAM_SIZE] for i in range(len(word) - NGRAM_SIZE + 1)
+            ]
+            grams = grams or [word]
+            token_hits = {}
+            for gram in grams:
+                for token_id in self.ngram_tokens.get(gram, ()):
+                    token_hits[token_id] = token_hits.get(token_id, 0) + 1
+            # A typo spoils up to NGRAM_SIZE n-grams; a third of them must survive.
+            needed = max(1, len(grams) // 3)
+            best = {}
+            for token_id, hits in token_hits.items():
+                if hits < needed:
+                    continue
+                overlap = hits / len(grams)
+                for game_id in self.token_postings[token_id]:
+                    if overlap > best.get(game_id, 0):
+                        best[game_id] = overlap
+            for game_id, overlap in best.items():
+                game_scores[game_id] = game_scores.get(game_id, 0) + overlap
+        return [
+            game_id
+            for game_id, _ in heapq.nlargest(
+                count, game_scores.items(), key=itemgetter(1)
+            )
+        ]
+
+    def fuzzy_search(self, query, limit=FUZZY_LIMIT):
+        """
+        Returns up to limit game ids ranked by similarity to query, tolerant to
+        typos and word order: each query word is matched to its closest word
+        in the name (fuzz.ratio) and the scores are averaged, with ties broken
+        by fuzz.WRatio on the whole name. Only the candidates selected by the
+        n-gram prefilter are scored.
+        """
+        query = query.lower()
+        words = _WORD_RE.findall(query)
+        if not words:
+            return list(range(min(self.size, limit)))
+        # Names share most of their words, so each (query word, name word)
+        # pair is scored once.
+        word_scores = [{} for _ in words]
+        scored = []
+        for game_id in self._fuzzy_candidates(words, FUZZY_CANDIDATES):
+            name_words = set(_WORD_RE.findall(self.names[game_id].lower()))
+            if not name_words:
+                continue
+            total = 0
+            for word, memo in zip(words, word_scores):
+                best = 0
+                for name_word in name_words:
+                    score = memo.get(name_word)
+                    if score is None:
+                        score = memo[name_word] = fuzz.ratio(word, name_word)
+                    if score > best:
+                        best = score
+                total += best
+            score = total / len(words)
+            if score >= FUZZY_MIN_SCORE:
+                scored.append((score, game_id))
+        # Break ties on the whole name, only for the entries that can make the cut.
+        top = heapq.nlargest(limit, scored)
+        if len(top) == limit:
+            cutoff = top[-1][0]
+            top = [entry for entry in scored if entry[0] >= cutoff]
+        ranked = sorted(
+            (
+                (score, fuzz.WRatio(query, self.names[game_id].lower()), -game_id)
+                for score, game_id in top
+            ),
+            reverse=True,
+        )
+        return [-game_id for _, _, game_id in ranked[:limit]]
+
+    def search(self, terms):
+        """
+        Returns the ids (positions in the indexed list) of the games matching
+        every term, in catalog order. terms is a query string or a list of terms.
+        """
+        if isinstance(terms, str):
+            terms = terms.split()
+        terms = [term.lower() for term in terms if term and term != "*"]
+        if not terms:
+            return list(range(self.size))
+        matches = sorted((self._match_term(term) for term in terms), key=len)
+        result = matches[0]
+        for other in matches[1:]:
+            if not result:
+                break
+            result = result & other
+        return sorted(result)
@@ -3,9 +3,17 @@ import os
 import re
 import shutil
 import sys
+import time
 import zipfile
+from contextlib import contextmanager
 from urllib.parse import unquote
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 from src.config import (
     CORE_SETTINGS_DEFAULTS,
     RETROARCH_EXTRACT_FOLDER,
@@ -16,45 +24,26 @@ from src.console_keybindings import CONSOLE_KEYBINDINGS
 from src.conversion import convert_binding
 from src.default_keybindings import DEFAULT_KEYBINDINGS
 
-ALLOWED_NATIONS = {
-    "Japan",
-    "USA",
-    "Europe",
-    "Spain",
-    "Italy",
-    "Germany",
-    "France",
-    "China",
-}
-
-
-def extract_nations(game_name):
-    """
-    Estrae le nazioni dal nome del gioco cercando un pattern tra parentesi.
-    Ad esempio: "Final Fantasy (Europe, USA)" restituirà ["Europe", "USA"].
-    """
-    pattern = r"\((.*?)\)"
-    match = re.search(pattern, game_name)
-    if match:
-        nations_str = match.group(1)
-        nations = [s.strip() for s in nations_str.split(",")]
-        return [nation for nation in nations if nation in ALLOWED_NATIONS]
-    return []
-
 
 def extract_zip(zip_path, extract_to):
     """
     Estrae il contenuto del file ZIP specificato in zip_path nella directory extract_to.
     Se l'estrazione ha successo, elimina il file ZIP.
+    Restituisce i percorsi dei file estratti, presi dalla lista dei membri
+    dell'archivio (non da un listing della cartella), oppure None in caso di errore.
     """
     try:
         with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            zip_ref.extractall(extract_to)
+            extracted = [
+                zip_ref.extract(member, extract_to)
+                for member in zip_ref.infolist()
+                if not member.is_dir()
+            ]
         os.remove(zip_path)
-        return True
+        return extracted
     except Exception as e:
-        print(f"Errore nell'estrazione: {e}")
-        return False
+        logging.error(f"Errore nell'estrazione di '{zip_path}': {e}")
+        return None
 
 
 def find_retroarch():
@@ -250,3 +239,32 @@ def clean_rom_title(filename):
     logging.debug(f"Pulizia titolo: Risultato finale '{cleaned}'")
 
     return cleaned if cleaned else name_without_ext
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Exclusive lock shared with other processes, held on path (a lock file
+    created if missing) for the duration of the with block.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about 10 seconds: keep waiting.
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
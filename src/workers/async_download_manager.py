@@ -0,0 +1,495 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, Signal
+
+from src import config
+from src.dat_verification import (
+    IntegrityError,
+    StreamingHasher,
+    get_dat_index,
+    verify_download,
+)
+from src.download_journal import STATE_ACTIVE, STATE_DONE, STATE_FAILED
+from src.http_client import HTTP_CONNECT_TIMEOUT
+from src.rate_limiter import BandwidthLimiter
+from src.utils import extract_zip
+from src.workers.download_worker import (
+    clear_resume_state,
+    get_if_range_validator,
+    get_part_paths,
+    load_resume_state,
+    parse_content_range,
+    save_resume_state,
+)
+from src.workers.extraction import get_extraction_executor, is_archive
+from src.workers.retry_policy import (
+    IncompleteDownloadError,
+    RetryPolicy,
+    classify_exception,
+    get_retry_after,
+)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Received bytes gathered before a write is handed to an executor thread.
+DISK_WRITE_BUFFER = 1024 * 1024
+
+
+def is_async_engine_available():
+    """True if the optional aiohttp dependency of the asyncio engine is installed."""
+    return aiohttp is not None
+
+
+def _load_resume(destination_dir, part_file, state_file, url):
+    """Returns (resume state, offset to resume from; 0 to start over)."""
+    os.makedirs(destination_dir, exist_ok=True)
+    state = load_resume_state(state_file, url)
+    if not state or not get_if_range_validator(state):
+        return state, 0
+    if not os.path.exists(part_file):
+        return state, 0
+    return state, min(int(state.get("offset", 0)), os.path.getsize(part_file))
+
+
+def _finish_part_file(part_file, state_file, local_file):
+    os.replace(part_file, local_file)
+    clear_resume_state(state_file)
+
+
+class _PartFileWriter:
+    """
+    Writes the .part file of an asyncio download from executor threads,
+    hashing the bytes as they are written and saving the resume state with
+    the offset actually on disk. The lock orders a write still running after
+    its coroutine was cancelled before close().
+    """
+
+    def __init__(self, part_file, state_file, state, hasher):
+        self.part_file = part_file
+        self.state_file = state_file
+        self.state = state
+        self.hasher = hasher
+        self.offset = state["offset"]
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        with self._lock:
+            save_resume_state(self.state_file, self.state)
+            if self.hasher is not None and self.offset:
+                self.hasher.update_from_file(self.part_file, self.offset)
+            self._file = open(self.part_file, "r+b" if self.offset else "wb")
+            self._file.truncate(self.offset)
+            self._file.seek(self.offset)
+
+    def write(self, chunks, save_state=False):
+        with self._lock:
+            self._write(chunks)
+            if save_state:
+                self._save_state()
+
+    def close(self, chunks):
+        """Writes the chunks still buffered, saves the state and closes."""
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._write(chunks)
+                self._save_state()
+            finally:
+                self._file.close()
+                self._file = None
+
+    def _write(self, chunks):
+        if not chunks:
+            return
+        data = b"".join(chunks)
+        self._file.write(data)
+        if self.hasher is not None:
+            self.hasher.update(data)
+        self.offset += len(data)
+
+    def _save_state(self):
+        self._file.flush()
+        self.state["offset"] = self.offset
+        save_resume_state(self.state_file, self.state)
+
+
+class AsyncDownloadManager(QObject):
+    """
+    Alternative download engine that runs every transfer as a coroutine on a
+    single asyncio event loop (inside the manager's QThread) instead of one
+    thread per download. Only the socket reads run on the loop: disk writes,
+    hashing and resume state go to executor threads, and journal writes to a
+    thread of their own. Exposes the same signals as DownloadManager.
+    """
+
+    log = Signal(str)
+    overall_progress = Signal(int)
+    finished = Signal()
+    file_progress = Signal(str, int, int, float, float)
+    file_finished = Signal(str)
+    file_failed = Signal(object, str)  # (game, error message)
+
+    def __init__(self, queue, update_queue_callback, max_concurrent=64, journal=None):
+        super().__init__()
+        self.queue = deque(queue)
+        self.update_queue_callback = update_queue_callback
+        self.max_concurrent = max_concurrent
+        self.journal = journal
+        self.journal_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="journal"
+        )
+        self.cancelled = False
+        self.completed_downloads = []
+
+        self.total_bytes = sum(game.get("size_bytes", 0) for game in self.queue)
+        self.downloaded_bytes = {
+            game.get("name", f"unknown_game_{i}"): 0
+            for i, game in enumerate(self.queue)
+        }
+        self.active_games = set()
+        self.retry_policy = RetryPolicy()
+        self.loop = None
+        self.tasks = []
+        self.extraction_tasks = []
+
+        logging.info(
+            f"AsyncDownloadManager creato con {len(self.queue)} giochi in coda. Max concurrent: {self.max_concurrent}."
+        )
+
+    def process_queue(self):
+        msg = "Download Manager (asyncio): process_queue chiamato."
+        self.log.emit(msg)
+        logging.info(msg)
+
+        if not self.queue:
+            self.finished.emit()
+            return
+        if aiohttp is None:
+            error_msg = "Motore asyncio non disponibile: installa 'aiohttp'."
+            self.log.emit(error_msg)
+            logging.error(error_msg)
+            self.finished.emit()
+            return
+
+        try:
+            asyncio.run(self._run_all())
+        except Exception as e:
+            logging.exception(f"Errore nel motore di download asyncio: {e}")
+            self.log.emit(f"Errore nel motore di download asyncio: {e}")
+        self.journal_executor.shutdown(wait=True)
+
+        finish_msg = "Download Manager (asyncio): tutti i download processati."
+        self.log.emit(finish_msg)
+        logging.info(finish_msg)
+        self.finished.emit()
+
+    async def _run_all(self):
+        self.loop = asyncio.get_running_loop()
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrent, limit_per_host=self.max_concurrent
+        )
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=config.HTTP_TIMEOUT
+        )
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout
+        ) as session:
+            self.tasks = [
+                asyncio.create_task(self._consume(session))
+                for _ in range(min(self.max_concurrent, len(self.queue)))
+            ]
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            await asyncio.gather(*self.extraction_tasks, return_exceptions=True)
+
+    async def _consume(self, session):
+        while self.queue and not self.cancelled:
+            game = self.queue.popleft()
+            if self.update_queue_callback:
+                try:
+                    self.update_queue_callback()
+                except Exception as e:
+                    logging.error(f"Errore nel chiamare update_queue_callback: {e}")
+
+            game_name = game.get("name", "Nome Sconosciuto")
+            self.active_games.add(game_name)
+            self._journal_write("set_state", game_name, STATE_ACTIVE)
+            local_file = ""
+            error = None
+            try:
+                local_file, error = await self._download_with_retries(session, game)
+            except asyncio.CancelledError:
+                self.log.emit(f"Download annullato: {game_name}")
+            finally:
+                self.active_games.discard(game_name)
+            if is_archive(local_file):
+                self.extraction_tasks.append(
+                    asyncio.create_task(self._extract(game, local_file))
+                )
+            else:
+                self._on_file_finished(game, local_file, error)
+
+    async def _download_with_retries(self, session, game):
+        """
+        Runs _download until it succeeds or the error class of the last failure
+        has no retries left, sleeping with exponential backoff and jitter in
+        between. Every attempt resumes from the .part file of the previous one.
+        Returns (local_file, error message or None).
+        """
+        game_name = game.get("name", "Nome Sconosciuto")
+        while True:
+            try:
+                return await self._download(session, game), None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.log.emit(f"Errore nel download di {game_name}: {e}")
+                if self.cancelled:
+                    return "", None
+                error_kind = classify_exception(e)
+                delay = self.retry_policy.next_delay(
+                    game_name, error_kind, get_retry_after(e)
+                )
+                if delay is None:
+                    return "", str(e)
+                retry_msg = (
+                    f"Download Manager (asyncio): Nuovo tentativo per '{game_name}' tra {delay:.1f}s "
+                    f"(errore {error_kind}, tentativo "
+                    f"{self.retry_policy.describe(game_name, error_kind)})."
+                )
+                self.log.emit(retry_msg)
+                logging.info(retry_msg)
+                self._journal_write("increment_retry", game_name)
+                await asyncio.sleep(delay)
+
+    async def _download(self, session, game):
+        url = game["link"]
+        game_name = game["name"]
+        filename = os.path.basename(url)
+        destination_dir = os.path.join(
+            config.USER_DOWNLOADS_FOLDER, game.get("console", "default")
+        )
+        local_file = os.path.join(destination_dir, filename)
+        part_file, state_file = get_part_paths(local_file)
+        self.log.emit(f"Inizio download: {filename} in {destination_dir}")
+
+        state, offset = await self._run_blocking(
+            _load_resume, destination_dir, part_file, state_file, url
+        )
+        hasher = None
+        response, offset = await self._open_response(session, url, state, offset)
+        if response is None:
+            self.log.emit(f"File già completo su disco: {filename}")
+            total = downloaded = offset
+        else:
+            async with response:
+                if response.status == 206:
+                    _, total = parse_content_range(
+                        response.headers.get("Content-Range", "")
+                    )
+                else:
+                    total = int(response.headers.get("Content-Length", 0))
+
+                state = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "total": total,
+                    "offset": offset,
+                }
+                if len(get_dat_index()) and not filename.lower().endswith(".zip"):
+                    hasher = StreamingHasher()
+
+                writer = _PartFileWriter(part_file, state_file, state, hasher)
+                await self._run_blocking(writer.open)
+                limiter = BandwidthLimiter()
+                downloaded = offset
+                last_downloaded = offset
+                last_update_time = time.time()
+                # Only the socket reads run on the loop: received chunks are
+                # gathered and written (and hashed) on an executor thread.
+                chunks = []
+                buffered = 0
+                try:
+                    async for chunk in response.content.iter_chunked(1024 * 64):
+                        if self.cancelled:
+                            raise asyncio.CancelledError()
+                        chunks.append(chunk)
+                        buffered += len(chunk)
+                        await limiter.throttle_async(len(chunk))
+                        downloaded += len(chunk)
+                        current_time = time.time()
+                        checkpoint = current_time - last_update_time >= 0.5
+                        if buffered >= DISK_WRITE_BUFFER or checkpoint:
+                            write_chunks, chunks, buffered = chunks, [], 0
+                            await self._run_blocking(
+                                writer.write, write_chunks, checkpoint
+                            )
+                        if checkpoint:
+                            speed = (downloaded - last_downloaded) / (
+                                current_time - last_update_time
+                            )
+                            remaining = (
+                                (total - downloaded) / speed if speed > 0 else -1
+                            )
+                            self._on_progress(
+                                game_name, downloaded, total, speed, remaining
+                            )
+                            last_update_time = current_time
+                            last_downloaded = downloaded
+                finally:
+                    await self._run_blocking(writer.close, chunks)
+
+        if total and downloaded < total:
+            raise IncompleteDownloadError(
+                f"Download incompleto ({downloaded}/{total} byte)"
+            )
+
+        try:
+            await self._run_blocking(verify_download, part_file, filename, hasher)
+        except IntegrityError:
+            await self._run_blocking(clear_resume_state, part_file, state_file)
+            raise
+        await self._run_blocking(_finish_part_file, part_file, state_file, local_file)
+        self._on_progress(game_name, downloaded, total, 0.0, 0)
+        self.log.emit(f"Download completato: {filename}")
+        return local_file
+
+    async def _open_response(self, session, url, state, offset):
+        """
+        Opens the response, resuming from offset when the server allows it,
+        like DownloadWorker._open_response. A stale offset or a refused range
+        falls back to a full request. Returns (response, offset), where offset
+        is where the response body continues; response is None if the partial
+        file is already complete.
+        """
+        filename = os.path.basename(url)
+        headers = {}
+        if offset:
+            headers = {
+                "Range": f"bytes={offset}-",
+                "If-Range": get_if_range_validator(state),
+            }
+        response = await session.get(url, headers=headers)
+
+        if offset and response.status == 206:
+            start, _ = parse_content_range(response.headers.get("Content-Range", ""))
+            if start == offset:
+                return response, offset
+            self.log.emit(f"Content-Range inatteso per {filename}, riavvio completo.")
+            response.release()
+            response = await session.get(url)
+        elif offset and response.status == 416:
+            response.release()
+            if state.get("total") == offset:
+                return None, offset
+            self.log.emit(
+                f"Offset di ripresa non valido per {filename}, download completo."
+            )
+            response = await session.get(url)
+        elif offset and response.status == 200:
+            self.log.emit(
+                f"Il server ha rifiutato la ripresa di {filename}, download completo."
+            )
+
+        response.raise_for_status()
+        return response, 0
+
+    def _run_blocking(self, func, *args):
+        """Runs a blocking disk call on the loop's default executor."""
+        return self.loop.run_in_executor(None, func, *args)
+
+    def _journal_write(self, method, *args, **kwargs):
+        """
+        Queues a journal call on the journal thread, so SQLite commits never
+        block the loop. A single thread keeps the writes in order.
+        """
+        if self.journal:
+            self.journal_executor.submit(getattr(self.journal, method), *args, **kwargs)
+
+    async def _extract(self, game, zip_path):
+        """
+        Extracts a downloaded archive on the extraction pool. Runs as its own
+        task so the consumer that downloaded it can start the next transfer.
+        """
+        filename = os.path.basename(zip_path)
+        self.log.emit(f"Estrazione di {filename}")
+        loop = asyncio.get_running_loop()
+        extracted = await loop.run_in_executor(
+            get_extraction_executor(), extract_zip, zip_path, os.path.dirname(zip_path)
+        )
+        if extracted is None:
+            self.log.emit(f"Estrazione fallita per {filename}, archivio mantenuto.")
+            local_file = zip_path
+        else:
+            self.log.emit(f"Estrazione completata: {filename} ({len(extracted)} file)")
+            local_file = extracted[0] if extracted else zip_path
+        self._on_file_finished(game, local_file)
+
+    def _on_progress(self, game_name, downloaded, total, speed, remaining_time):
+        self.downloaded_bytes[game_name] = downloaded
+        self.file_progress.emit(game_name, downloaded, total, speed, remaining_time)
+        self._journal_write("update_bytes", game_name, downloaded)
+        if self.total_bytes > 0:
+            overall_downloaded = sum(self.downloaded_bytes.values())
+            overall_percent = min(int(overall_downloaded / self.total_bytes * 100), 100)
+            self.overall_progress.emit(overall_percent)
+
+    def _on_file_finished(self, game, local_filename, error=None):
+        game_name = game.get("name", "Nome Sconosciuto")
+        logging.info(
+            f"Download Manager (asyncio): '{game_name}' terminato. File locale: '{local_filename or 'Nessuno/Errore'}'"
+        )
+        if local_filename:
+            self.completed_downloads.append(local_filename)
+            size = game.get("size_bytes", 0)
+            if size > 0:
+                self.file_progress.emit(game_name, size, size, 0.0, 0.0)
+            else:
+                self.file_progress.emit(game_name, 100, 100, 0.0, 0.0)
+        if local_filename:
+            self._journal_write(
+                "set_state", game_name, STATE_DONE, local_file=local_filename
+            )
+        elif error is not None and not self.cancelled:
+            self._journal_write("set_state", game_name, STATE_FAILED, error=error)
+            self.file_failed.emit(game, error)
+        self.retry_policy.forget(game_name)
+        self.file_finished.emit(game_name)
+
+    def cancel_all(self):
+        cancel_msg = (
+            "Download Manager (asyncio): cancel_all chiamato. Annullamento download..."
+        )
+        self.log.emit(cancel_msg)
+        logging.info(cancel_msg)
+
+        self.cancelled = True
+        queue_cleared_count = len(self.queue)
+        self.queue.clear()
+        logging.info(f"Coda interna svuotata ({queue_cleared_count} giochi rimossi).")
+
+        if self.loop and not self.loop.is_closed():
+            for task in self.tasks:
+                try:
+                    self.loop.call_soon_threadsafe(task.cancel)
+                except RuntimeError:
+                    pass
+
+        if self.update_queue_callback:
+            try:
+                self.update_queue_callback()
+            except Exception as e:
+                logging.error(
+                    f"Errore nel chiamare update_queue_callback durante cancel_all: {e}"
+                )
@@ -0,0 +1,53 @@
+from PySide6.QtCore import QObject, Signal
+
+from src.scraping import CATALOG_SYNC_ERROR, sync_all_catalogs
+
+SYNC_STATUS_LABELS = {
+    "updated": "aggiornato",
+    "unchanged": "invariato",
+    "fresh": "già aggiornato",
+    "skipped": "saltato",
+    CATALOG_SYNC_ERROR: "errore",
+}
+
+
+class CatalogSyncWorker(QObject):
+    """Syncs every console catalog into the cache in a background thread."""
+
+    console_synced = Signal(str, str)
+    catalog_diff = Signal(str, object)
+    progress = Signal(str)
+    finished = Signal(dict)
+
+    def __init__(self, force_refresh=True):
+        super().__init__()
+        self.force_refresh = force_refresh
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def _on_console_synced(self, console_name, status, diff, done, total):
+        label = SYNC_STATUS_LABELS.get(status, status)
+        if diff:
+            label = f"{label}, {diff.summary()}"
+        self.progress.emit(f"Catalogo '{console_name}': {label} ({done}/{total})")
+        self.console_synced.emit(console_name, status)
+        if diff and not diff.initial:
+            self.catalog_diff.emit(console_name, diff)
+
+    def run(self):
+        try:
+            results = sync_all_catalogs(
+                force_refresh=self.force_refresh,
+                progress_callback=self._on_console_synced,
+                should_stop=lambda: self._stopped,
+            )
+        except Exception as e:
+            self.progress.emit(f"Errore durante la sincronizzazione dei cataloghi: {e}")
+            results = {}
+        failed = sum(1 for status in results.values() if status == CATALOG_SYNC_ERROR)
+        self.progress.emit(
+            f"Sincronizzazione completata: {len(results) - failed} cataloghi ok, {failed} errori."
+        )
+        self.finished.emit(results)
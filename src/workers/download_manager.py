@@ -1,8 +1,25 @@
 import logging
+import os
 
-from PySide6.QtCore import QObject, QThread, Signal
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
 
+from src.download_journal import STATE_ACTIVE, STATE_DONE, STATE_FAILED
+from src.utils import extract_zip
 from src.workers.download_worker import DownloadWorker
+from src.workers.extraction import get_extraction_executor, is_archive
+from src.workers.retry_policy import RetryPolicy
+
+
+class DownloadJob(QRunnable):
+    """Runs a DownloadWorker on one of the manager's pooled threads."""
+
+    def __init__(self, worker):
+        super().__init__()
+        self.worker = worker
+        self.setAutoDelete(True)
+
+    def run(self):
+        self.worker.run()
 
 
 class DownloadManager(QObject):
@@ -11,12 +28,15 @@ class DownloadManager(QObject):
     finished = Signal()
     file_progress = Signal(str, int, int, float, float)
     file_finished = Signal(str)
+    file_failed = Signal(object, str)  # (game, error message)
+    extraction_finished = Signal(str, str, object)  # (game_name, zip, paths/None)
 
-    def __init__(self, queue, update_queue_callback, max_concurrent=2):
+    def __init__(self, queue, update_queue_callback, max_concurrent=2, journal=None):
         super().__init__()
         self.queue = queue.copy()
         self.update_queue_callback = update_queue_callback
         self.max_concurrent = max_concurrent
+        self.journal = journal
         self.cancelled = False
         self.completed_downloads = []
 
@@ -25,7 +45,17 @@ class DownloadManager(QObject):
             game.get("name", f"unknown_game_{i}"): 0
             for i, game in enumerate(self.queue)
         }
-        self.active_workers = []
+        self.active_workers = {}
+        self.retry_policy = RetryPolicy()
+        self.pending_retries = {}
+        self.pending_extractions = {}
+        self.extraction_finished.connect(self.on_extraction_finished)
+
+        # Long-lived download threads: idle threads never expire, so a queue of
+        # thousands of small files reuses the same max_concurrent threads.
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(self.max_concurrent)
+        self.thread_pool.setExpiryTimeout(-1)
 
         logging.info(
             f"DownloadManager creato con {len(self.queue)} giochi in coda. Max concurrent: {self.max_concurrent}. Total size: {self.total_bytes} bytes."
@@ -72,26 +102,26 @@ class DownloadManager(QObject):
                 except Exception as e:
                     logging.error(f"Errore nel chiamare update_queue_callback: {e}")
 
-            thread = QThread()
-            from src.workers.download_worker import DownloadWorker
-
             worker = DownloadWorker(game)
-            worker.moveToThread(thread)
-
-            worker.finished.connect(
-                lambda gn, lf, w=worker, t=thread: self.on_worker_finished(gn, lf, w, t)
-            )
+            worker.finished.connect(self.on_worker_finished)
             worker.progress_update.connect(self.on_worker_progress)
             worker.log.connect(self.log.emit)
-            thread.started.connect(worker.run)
 
-            thread.start()
-            self.active_workers.append((worker, thread))
+            self.active_workers[game_name] = worker
+            if self.journal:
+                self.journal.set_state(game_name, STATE_ACTIVE)
+            self.thread_pool.start(DownloadJob(worker))
             logging.debug(
                 f"Download Manager: Worker per '{game_name}' avviato e aggiunto agli attivi. Attivi ora: {len(self.active_workers)}"
             )
 
-        if not self.cancelled and not self.queue and not self.active_workers:
+        if (
+            not self.cancelled
+            and not self.queue
+            and not self.active_workers
+            and not self.pending_retries
+            and not self.pending_extractions
+        ):
             finish_msg = "Download Manager: Coda svuotata e nessun worker attivo. Tutti i download completati."
             self.log.emit(finish_msg)
             logging.info(finish_msg)
@@ -110,6 +140,8 @@ class DownloadManager(QObject):
             )
 
         self.file_progress.emit(game_name, downloaded, total, speed, remaining_time)
+        if self.journal:
+            self.journal.update_bytes(game_name, downloaded)
 
         overall_downloaded = sum(self.downloaded_bytes.values())
         if self.total_bytes > 0:
@@ -119,42 +151,118 @@ class DownloadManager(QObject):
             overall_percent = 100 if not self.active_workers and not self.queue else 0
         self.overall_progress.emit(overall_percent)
 
-    def on_worker_finished(self, game_name, local_filename, worker, thread):
+    def schedule_retry(self, worker):
+        """
+        Puts a failed game back in the queue after an exponential backoff with
+        jitter, if its error class still has retries left. The new worker
+        resumes from the .part file left by the failed attempt.
+        Returns False if the game has exhausted its retries.
+        """
+        game = worker.game
+        game_name = game.get("name", "Nome Sconosciuto")
+        delay = self.retry_policy.next_delay(
+            game_name, worker.error_kind, worker.retry_after
+        )
+        if delay is None:
+            return False
+
+        retry_msg = (
+            f"Download Manager: Nuovo tentativo per '{game_name}' tra {delay:.1f}s "
+            f"(errore {worker.error_kind}, tentativo "
+            f"{self.retry_policy.describe(game_name, worker.error_kind)})."
+        )
+        self.log.emit(retry_msg)
+        logging.info(retry_msg)
+        if self.journal:
+            self.journal.increment_retry(game_name)
+
+        self.pending_retries[game_name] = game
+        QTimer.singleShot(int(delay * 1000), self, lambda: self._requeue(game_name))
+        return True
+
+    def _requeue(self, game_name):
+        game = self.pending_retries.pop(game_name, None)
+        if game is None or self.cancelled:
+            return
+        self.queue.append(game)
+        self.start_new_downloads()
+
+    def on_worker_finished(self, game_name, local_filename):
         finish_log_msg = f"Download Manager: Worker per '{game_name}' ha finito. File locale: '{local_filename if local_filename else 'Nessuno/Errore'}'"
         logging.info(finish_log_msg)
 
-        thread.quit()
-        if not thread.wait(1000):
-            logging.warning(
-                f"Thread per worker '{game_name}' non ha terminato entro 1 secondo."
-            )
-
-        if local_filename:
-            self.completed_downloads.append(local_filename)
-            total_bytes_game = next(
-                (
-                    g.get("size_bytes", 0)
-                    for g in self.queue + [w.game for w, t in self.active_workers]
-                    if g.get("name") == game_name
-                ),
-                0,
-            )
-            if total_bytes_game > 0:
-                self.file_progress.emit(
-                    game_name, total_bytes_game, total_bytes_game, 0.0, 0.0
-                )
-            else:
-                self.file_progress.emit(game_name, 100, 100, 0.0, 0.0)
+        worker = self.active_workers.pop(game_name, None)
+        game = worker.game if worker is not None else {"name": game_name}
 
-        self.file_finished.emit(game_name)
+        if is_archive(local_filename):
+            self.extract_in_background(game, local_filename)
+        elif local_filename:
+            self.complete_download(game, local_filename)
+        else:
+            if not self.cancelled and worker is not None and worker.error_kind:
+                if self.schedule_retry(worker):
+                    self.start_new_downloads()
+                    return
+                if self.journal:
+                    self.journal.set_state(
+                        game_name, STATE_FAILED, error=worker.error_message
+                    )
+                self.file_failed.emit(worker.game, worker.error_message)
+            self.retry_policy.forget(game_name)
+            self.file_finished.emit(game_name)
 
-        self.active_workers = [(w, t) for w, t in self.active_workers if w != worker]
         logging.debug(
             f"Download Manager: Worker per '{game_name}' rimosso dagli attivi. Attivi ora: {len(self.active_workers)}"
         )
 
         self.start_new_downloads()
 
+    def complete_download(self, game, local_filename):
+        game_name = game.get("name", "Nome Sconosciuto")
+        self.completed_downloads.append(local_filename)
+        total_bytes_game = game.get("size_bytes", 0)
+        if total_bytes_game > 0:
+            self.file_progress.emit(
+                game_name, total_bytes_game, total_bytes_game, 0.0, 0.0
+            )
+        else:
+            self.file_progress.emit(game_name, 100, 100, 0.0, 0.0)
+        if self.journal:
+            self.journal.set_state(game_name, STATE_DONE, local_file=local_filename)
+        self.retry_policy.forget(game_name)
+        self.file_finished.emit(game_name)
+
+    def extract_in_background(self, game, zip_path):
+        """
+        Hands a downloaded archive to the extraction pool. The game counts as
+        finished only when extraction is done, but its download slot is
+        already free for the next transfer.
+        """
+        game_name = game.get("name", "Nome Sconosciuto")
+        self.pending_extractions[game_name] = game
+        self.log.emit(f"Estrazione di {os.path.basename(zip_path)}")
+        future = get_extraction_executor().submit(
+            extract_zip, zip_path, os.path.dirname(zip_path)
+        )
+        future.add_done_callback(
+            lambda f: self.extraction_finished.emit(game_name, zip_path, f.result())
+        )
+
+    def on_extraction_finished(self, game_name, zip_path, extracted):
+        game = self.pending_extractions.pop(game_name, {"name": game_name})
+        if extracted is None:
+            self.log.emit(
+                f"Estrazione fallita per {os.path.basename(zip_path)}, archivio mantenuto."
+            )
+            local_filename = zip_path
+        else:
+            self.log.emit(
+                f"Estrazione completata: {os.path.basename(zip_path)} ({len(extracted)} file)"
+            )
+            local_filename = extracted[0] if extracted else zip_path
+        self.complete_download(game, local_filename)
+        self.start_new_downloads()
+
     def cancel_all(self):
         cancel_msg = "Download Manager: cancel_all chiamato. Annullamento download..."
         self.log.emit(cancel_msg)
@@ -165,13 +273,14 @@ class DownloadManager(QObject):
         active_count = len(self.active_workers)
         logging.info(f"Annullamento richiesto per {active_count} download attivi...")
 
-        workers_to_cancel = list(self.active_workers)
-        for worker, thread in workers_to_cancel:
+        self.pending_retries.clear()
+        workers_to_cancel = list(self.active_workers.items())
+        for game_name, worker in workers_to_cancel:
             if hasattr(worker, "cancel"):
-                logging.debug(
-                    f"Chiamata cancel() per worker '{getattr(worker, 'game_name', 'N/A')}'"
-                )
+                logging.debug(f"Chiamata cancel() per worker '{game_name}'")
                 worker.cancel()
+        # Jobs still queued in the pool are not cleared: their workers start,
+        # see the cancel flag and emit finished, so their rows are released.
 
         queue_cleared_count = len(self.queue)
         self.queue.clear()
@@ -1,11 +1,115 @@
+import json
+import logging
 import os
+import threading
 import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 
 import requests
 from PySide6.QtCore import QObject, Signal
 
+from src import config, http_client
 from src.config import USER_DOWNLOADS_FOLDER
-from src.utils import extract_zip
+from src.dat_verification import (
+    VERDICT_MISMATCH,
+    VERDICT_OK,
+    IntegrityError,
+    StreamingHasher,
+    get_dat_index,
+    verify_download,
+)
+from src.rate_limiter import BandwidthLimiter
+from src.workers.retry_policy import (
+    IncompleteDownloadError,
+    classify_exception,
+    get_retry_after,
+)
+
+PART_SUFFIX = ".part"
+RESUME_STATE_SUFFIX = ".part.json"
+SEGMENT_CHUNK_SIZE = 1024 * 256
+
+
+class RangeNotSupportedError(Exception):
+    """Raised when a segment request is not answered with the expected 206."""
+
+
+def get_part_paths(local_file):
+    """Returns the (partial file, resume sidecar) paths for a destination file."""
+    return local_file + PART_SUFFIX, local_file + RESUME_STATE_SUFFIX
+
+
+def load_resume_state(state_file, url):
+    """
+    Loads the resume sidecar of a partial download.
+    Returns None if the sidecar is missing, unreadable or refers to another URL.
+    """
+    if not os.path.exists(state_file):
+        return None
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except Exception as e:
+        logging.warning(f"Sidecar di ripresa illeggibile '{state_file}': {e}")
+        return None
+    if not isinstance(state, dict) or state.get("url") != url:
+        return None
+    return state
+
+
+def save_resume_state(state_file, state):
+    """Writes the resume sidecar atomically (tmp file + replace)."""
+    tmp_file = state_file + ".tmp"
+    try:
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_file, state_file)
+    except Exception as e:
+        logging.error(f"Impossibile salvare lo stato di ripresa '{state_file}': {e}")
+
+
+def clear_resume_state(*paths):
+    """Removes partial download files, ignoring the ones that do not exist."""
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logging.warning(f"Impossibile rimuovere '{path}': {e}")
+
+
+def get_if_range_validator(state):
+    """
+    Returns the validator to send in If-Range, or None if resuming is unsafe.
+    Weak ETags are not allowed in If-Range, so Last-Modified is used instead.
+    """
+    etag = state.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return state.get("last_modified")
+
+
+def parse_content_range(value):
+    """Parses 'bytes start-end/total' into (start, total). total is 0 if unknown."""
+    try:
+        unit, _, spec = value.partition(" ")
+        if unit.strip().lower() != "bytes":
+            return None, 0
+        byte_range, _, total = spec.partition("/")
+        start = int(byte_range.split("-")[0])
+        return start, int(total) if total.strip().isdigit() else 0
+    except (ValueError, AttributeError):
+        return None, 0
+
+
+def contiguous_length(segments):
+    """Bytes written from the start of a segmented file without a gap."""
+    length = 0
+    for start, end, done in segments:
+        length = start + done
+        if length <= end:
+            break
+    return length
 
 
 class DownloadWorker(QObject):
@@ -19,37 +123,131 @@ class DownloadWorker(QObject):
         super().__init__()
         self.game = game
         self.cancelled = False
+        # Set when run() fails, read by the manager to decide on a retry.
+        self.error_kind = None
+        self.error_message = ""
+        self.retry_after = None
+        # CRC32/SHA1 computed while streaming, for DAT verification.
+        self.hasher = None
+        self.limiter = BandwidthLimiter()
 
-    def run(self):
-        url = self.game["link"]
-        filename = os.path.basename(url)
-        console_folder = self.game.get("console", "default")
-        destination_dir = os.path.join(USER_DOWNLOADS_FOLDER, console_folder)
-        os.makedirs(destination_dir, exist_ok=True)
-        local_file = os.path.join(destination_dir, filename)
-        self.log.emit(f"Inizio download: {filename} in {destination_dir}")
+    def _open_response(self, url, state, part_file):
+        """
+        Opens the streamed response, resuming from the partial file when the
+        sidecar allows it. Returns (response, offset) where offset is the number
+        of bytes already on disk that the response continues from.
+        """
+        offset = 0
+        headers = {}
+        validator = get_if_range_validator(state) if state else None
+        if validator and os.path.exists(part_file):
+            offset = min(int(state.get("offset", 0)), os.path.getsize(part_file))
+            if offset > 0:
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = validator
+
+        response = http_client.get(url, stream=True, headers=headers)
+
+        if offset and response.status_code == 206:
+            start, _ = parse_content_range(response.headers.get("Content-Range", ""))
+            if start == offset:
+                return response, offset
+            self.log.emit(
+                f"Content-Range inatteso per {os.path.basename(url)}, riavvio completo."
+            )
+            response.close()
+            response = http_client.get(url, stream=True)
+        elif offset and response.status_code == 416:
+            response.close()
+            if state.get("total") and offset == int(state["total"]):
+                return None, offset
+            response = http_client.get(url, stream=True)
+        elif offset and response.status_code == 200:
+            self.log.emit(
+                f"Il server ha rifiutato la ripresa di {os.path.basename(url)}, download completo."
+            )
+
+        response.raise_for_status()
+        return response, 0
 
+    def _emit_progress(self, downloaded, total, speed):
+        remaining_time = (total - downloaded) / speed if speed > 0 else -1
+        self.progress_update.emit(
+            self.game["name"], downloaded, total, speed, remaining_time
+        )
+
+    def _probe_segmented(self, url):
+        """
+        Checks whether the file can be fetched in segments.
+        Returns the HEAD headers if the server accepts byte ranges and the file
+        is large enough to be worth splitting, otherwise None.
+        """
+        if config.DOWNLOAD_SEGMENTS <= 1:
+            return None
         try:
-            total = 0
-            downloaded = 0
-            chunk_size = 1024 * 64
-            start_time = time.time()
-            last_update_time = start_time
-            last_downloaded = 0
-            speed = 0
+            response = http_client.head(url, allow_redirects=True)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logging.debug(f"HEAD fallita per {url}, download a flusso singolo: {e}")
+            return None
+        accept_ranges = response.headers.get("Accept-Ranges", "").lower()
+        total = int(response.headers.get("Content-Length", 0) or 0)
+        if accept_ranges != "bytes" or total < config.SEGMENTED_MIN_SIZE:
+            return None
+        return response.headers
 
-            with requests.get(url, stream=True, timeout=30) as response:
-                response.raise_for_status()
+    def _download_single(self, url, filename, part_file, state_file, state):
+        """
+        Streams the file over a single connection into the partial file.
+        Returns (downloaded, total, resumed_from), or None if cancelled.
+        """
+        chunk_size = 1024 * 64
+        last_update_time = time.time()
+        speed = 0
+
+        response, offset = self._open_response(url, state, part_file)
+        downloaded = offset
+        last_downloaded = offset
+
+        if response is None:
+            self.log.emit(f"File già completo su disco: {filename}")
+            self.hasher = None
+            return offset, offset, offset
+
+        with response:
+            content_range = response.headers.get("Content-Range")
+            if response.status_code == 206 and content_range:
+                _, total = parse_content_range(content_range)
+            else:
                 total = int(response.headers.get("Content-Length", 0))
 
-                with open(local_file, "wb") as f:
+            previous = state if offset and state else {}
+            state = {
+                "url": url,
+                "etag": response.headers.get("ETag") or previous.get("etag"),
+                "last_modified": response.headers.get("Last-Modified")
+                or previous.get("last_modified"),
+                "total": total,
+                "offset": offset,
+            }
+            save_resume_state(state_file, state)
+            if offset:
+                self.log.emit(f"Ripresa download di {filename} da {offset} byte.")
+            if self.hasher is not None and offset:
+                self.hasher.update_from_file(part_file, offset)
+
+            with open(part_file, "r+b" if offset else "wb") as f:
+                f.truncate(offset)
+                f.seek(offset)
+                try:
                     for chunk in response.iter_content(chunk_size=chunk_size):
                         if self.cancelled:
-                            self.log.emit(f"Download annullato: {filename}")
-                            self.finished.emit(self.game["name"], "")
-                            return
+                            return None
                         if chunk:
                             f.write(chunk)
+                            if self.hasher is not None:
+                                self.hasher.update(chunk)
+                            self.limiter.throttle(len(chunk), lambda: self.cancelled)
                             downloaded += len(chunk)
                             current_time = time.time()
 
@@ -57,46 +255,274 @@ class DownloadWorker(QObject):
                                 interval = current_time - last_update_time
                                 bytes_interval = downloaded - last_downloaded
                                 speed = bytes_interval / interval
+                                self._emit_progress(downloaded, total, speed)
 
-                                remaining_time = (
-                                    (total - downloaded) / speed if speed > 0 else -1
-                                )
-
-                                self.progress_update.emit(
-                                    self.game["name"],
-                                    downloaded,
-                                    total,
-                                    speed,
-                                    remaining_time,
-                                )
+                                f.flush()
+                                state["offset"] = downloaded
+                                save_resume_state(state_file, state)
 
                                 last_update_time = current_time
                                 last_downloaded = downloaded
+                finally:
+                    f.flush()
+                    state["offset"] = downloaded
+                    save_resume_state(state_file, state)
+
+        return downloaded, total, offset
+
+    def _fetch_segment(self, url, part_file, segment, validator, progress_lock, abort):
+        """
+        Downloads one [start, end] byte range into its position of the
+        preallocated partial file. segment is [start, end, done] and its done
+        counter is updated in place. Stops early on cancel or when abort is set.
+        """
+        start, end, _ = segment
+        if start + segment[2] > end:
+            return
+        headers = {"Range": f"bytes={start + segment[2]}-{end}"}
+        if validator:
+            headers["If-Range"] = validator
+
+        with http_client.get(url, stream=True, headers=headers) as response:
+            response.raise_for_status()
+            range_start, _ = parse_content_range(
+                response.headers.get("Content-Range", "")
+            )
+            if response.status_code != 206 or range_start != start + segment[2]:
+                raise RangeNotSupportedError(
+                    f"Risposta {response.status_code} a una richiesta di segmento"
+                )
+            # Unbuffered handle: a byte counted in 'done' is already in the file.
+            with open(part_file, "r+b", buffering=0) as f:
+                f.seek(start + segment[2])
+                for chunk in response.iter_content(chunk_size=SEGMENT_CHUNK_SIZE):
+                    if self.cancelled or abort.is_set():
+                        return
+                    if chunk:
+                        f.write(chunk)
+                        with progress_lock:
+                            segment[2] += len(chunk)
+                        self.limiter.throttle(
+                            len(chunk), lambda: self.cancelled or abort.is_set()
+                        )
+
+    def _download_segmented(self, url, filename, part_file, state_file, state, head):
+        """
+        Fetches the file as N parallel byte ranges written at their offsets in a
+        preallocated partial file. Progress of every segment is merged into a
+        single progress_update. Returns (downloaded, total, resumed_from), or
+        None if cancelled. Raises RangeNotSupportedError if the server stops
+        honouring ranges, so the caller can fall back to a single stream.
+        """
+        total = int(head.get("Content-Length", 0))
+        etag = head.get("ETag")
+        last_modified = head.get("Last-Modified")
+        validator = get_if_range_validator(
+            {"etag": etag, "last_modified": last_modified}
+        )
+
+        resumable = (
+            state
+            and state.get("mode") == "segmented"
+            and state.get("total") == total
+            and get_if_range_validator(state) == validator
+            and validator
+            and os.path.exists(part_file)
+            and os.path.getsize(part_file) == total
+        )
+        if resumable:
+            segments = [list(seg) for seg in state["segments"]]
+            self.log.emit(f"Ripresa download segmentato di {filename}.")
+        else:
+            count = max(
+                1, min(config.DOWNLOAD_SEGMENTS, total // config.SEGMENTED_MIN_SIZE)
+            )
+            size = total // count
+            segments = [
+                [i * size, total - 1 if i == count - 1 else (i + 1) * size - 1, 0]
+                for i in range(count)
+            ]
+            with open(part_file, "wb") as f:
+                f.truncate(total)
+
+        state = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "total": total,
+            "mode": "segmented",
+            "segments": segments,
+        }
+        progress_lock = threading.Lock()
+        abort = threading.Event()
+        hashed = 0
+
+        def snapshot():
+            with progress_lock:
+                state["segments"] = [list(seg) for seg in segments]
+                return sum(seg[2] for seg in segments)
+
+        def hash_prefix():
+            # Segments are hashed in order as the contiguous prefix grows, so
+            # the DAT check needs no second read of the whole file.
+            nonlocal hashed
+            if self.hasher is None:
+                return
+            prefix = contiguous_length(state["segments"])
+            if prefix > hashed:
+                self.hasher.update_from_file(part_file, prefix - hashed, hashed)
+                hashed = prefix
+
+        resumed_from = snapshot()
+        save_resume_state(state_file, state)
+        self.log.emit(
+            f"Download segmentato di {filename}: {len(segments)} connessioni."
+        )
+
+        downloaded = resumed_from
+        last_downloaded = resumed_from
+        last_update_time = time.time()
+        with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+            futures = [
+                executor.submit(
+                    self._fetch_segment,
+                    url,
+                    part_file,
+                    segment,
+                    validator,
+                    progress_lock,
+                    abort,
+                )
+                for segment in segments
+            ]
+            try:
+                pending = futures
+                while pending:
+                    done, pending = wait(
+                        pending, timeout=0.5, return_when=FIRST_EXCEPTION
+                    )
+                    for future in done:
+                        future.result()
+
+                    downloaded = snapshot()
+                    save_resume_state(state_file, state)
+                    hash_prefix()
+                    current_time = time.time()
+                    interval = current_time - last_update_time
+                    speed = (downloaded - last_downloaded) / interval if interval else 0
+                    self._emit_progress(downloaded, total, speed)
+                    last_update_time = current_time
+                    last_downloaded = downloaded
+            finally:
+                abort.set()
+                wait(futures)
+                downloaded = snapshot()
+                save_resume_state(state_file, state)
+
+        if self.cancelled:
+            return None
+        hash_prefix()
+        return downloaded, total, resumed_from
+
+    def run(self):
+        url = self.game["link"]
+        filename = os.path.basename(url)
+        if self.cancelled:
+            # Cancelled while still queued in the manager's pool.
+            self.log.emit(f"Download annullato: {filename}")
+            self.finished.emit(self.game["name"], "")
+            return
+        console_folder = self.game.get("console", "default")
+        destination_dir = os.path.join(USER_DOWNLOADS_FOLDER, console_folder)
+        os.makedirs(destination_dir, exist_ok=True)
+        local_file = os.path.join(destination_dir, filename)
+        part_file, state_file = get_part_paths(local_file)
+        self.log.emit(f"Inizio download: {filename} in {destination_dir}")
+
+        state = load_resume_state(state_file, url)
+
+        try:
+            start_time = time.time()
+            result = None
+            # Zips are verified from their member list, so only plain files
+            # need hashing, done as the bytes are written.
+            is_zip = filename.lower().endswith(".zip")
+            hash_download = len(get_dat_index()) and not is_zip
+            head = self._probe_segmented(url)
+            if head is not None:
+                self.hasher = StreamingHasher() if hash_download else None
+                try:
+                    result = self._download_segmented(
+                        url, filename, part_file, state_file, state, head
+                    )
+                    if result is None:
+                        self.log.emit(f"Download annullato: {filename}")
+                        self.finished.emit(self.game["name"], "")
+                        return
+                except RangeNotSupportedError as e:
+                    self.log.emit(
+                        f"Range non supportati per {filename} ({e}), uso un flusso singolo."
+                    )
+                    clear_resume_state(part_file, state_file)
+                    state = None
+
+            if result is None:
+                self.hasher = StreamingHasher() if hash_download else None
+                result = self._download_single(
+                    url, filename, part_file, state_file, state
+                )
+                if result is None:
+                    self.log.emit(f"Download annullato: {filename}")
+                    self.finished.emit(self.game["name"], "")
+                    return
+
+            downloaded, total, resumed_from = result
+            if total and downloaded < total:
+                raise IncompleteDownloadError(
+                    f"Download incompleto ({downloaded}/{total} byte), riprendibile."
+                )
+
+            self._verify(part_file, state_file, filename)
+            os.replace(part_file, local_file)
+            clear_resume_state(state_file)
 
             total_time = time.time() - start_time
-            final_speed = downloaded / total_time if total_time > 0 else 0
+            final_speed = (
+                (downloaded - resumed_from) / total_time if total_time > 0 else 0
+            )
             self.progress_update.emit(
                 self.game["name"], downloaded, total, final_speed, 0
             )
 
             self.log.emit(f"Download completato: {filename}")
 
-            base, ext = os.path.splitext(local_file)
-            if ext.lower() == ".zip":
-                self.log.emit(f"Estrazione di {filename}")
-                if extract_zip(local_file, destination_dir):
-                    extracted_files = [
-                        os.path.join(destination_dir, f)
-                        for f in os.listdir(destination_dir)
-                        if not f.lower().endswith(".zip")
-                    ]
-                    local_file = extracted_files[0] if extracted_files else ""
-
+            # Archives are extracted by the manager on the extraction pool, so
+            # this download slot is free for the next transfer right away.
             self.finished.emit(self.game["name"], local_file)
 
         except Exception as e:
+            self.error_kind = classify_exception(e)
+            self.error_message = str(e)
+            self.retry_after = get_retry_after(e)
             self.log.emit(f"Errore nel download di {filename}: {e}")
             self.finished.emit(self.game["name"], "")
 
+    def _verify(self, part_file, state_file, filename):
+        """
+        Checks the completed download against the imported DATs. On a mismatch
+        the partial files are discarded, so the retry starts from scratch.
+        """
+        try:
+            results = verify_download(part_file, filename, self.hasher)
+        except IntegrityError:
+            clear_resume_state(part_file, state_file)
+            raise
+        if not results:
+            return
+        if all(verdict == VERDICT_OK for _, verdict in results):
+            self.log.emit(f"Verifica DAT superata: {filename}")
+        elif not any(verdict == VERDICT_MISMATCH for _, verdict in results):
+            self.log.emit(f"Verifica DAT: {filename} non presente nei DAT importati.")
+
     def cancel(self):
         self.cancelled = True
@@ -0,0 +1,27 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Extraction is mostly disk I/O and zlib (which releases the GIL), so a couple
+# of threads keep up with several downloads without competing with them.
+EXTRACTION_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_extraction_executor():
+    """
+    Returns the process-wide pool that extracts downloaded archives, separate
+    from the download threads so a finished transfer frees its slot at once.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=EXTRACTION_WORKERS, thread_name_prefix="extract"
+            )
+        return _executor
+
+
+def is_archive(path):
+    return bool(path) and path.lower().endswith(".zip")
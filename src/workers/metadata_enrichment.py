@@ -0,0 +1,182 @@
+import logging
+import os
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from src.metadata_manager import (
+    create_placeholder_metadata,
+    download_cover,
+    save_metadata,
+)
+from src.scraping import IGDB_MULTIQUERY_LIMIT, fetch_game_details_batch
+
+# Lookups running at the same time; each one handles up to
+# METADATA_ENRICHMENT_BATCH files, whose IGDB searches share multiquery requests.
+METADATA_ENRICHMENT_WORKERS = 4
+METADATA_ENRICHMENT_BATCH = IGDB_MULTIQUERY_LIMIT
+
+
+def enrich_metadata_batch(files):
+    """
+    Looks up the metadata (and covers) of library files on IGDB/RAWG and saves
+    it next to the other metadata files. files is a list of (rom_path,
+    console_name). Files with no match get placeholder metadata, so they are
+    not looked up again. Yields (rom_path, metadata dict) as each is saved.
+    """
+    details = fetch_game_details_batch(
+        [(os.path.basename(rom_path), console_name) for rom_path, console_name in files]
+    )
+    for (rom_path, console_name), scraped_api_data in zip(files, details):
+        yield rom_path, _build_metadata(rom_path, console_name, scraped_api_data)
+
+
+def _build_metadata(rom_path, console_name, scraped_api_data):
+    file = os.path.basename(rom_path)
+    game_data = create_placeholder_metadata(rom_path, console_name)
+
+    if scraped_api_data:
+        logging.debug(
+            f"Dati API trovati per {file}: {scraped_api_data.get('api_title')}"
+        )
+        if (
+            scraped_api_data.get("api_title")
+            and scraped_api_data.get("api_title") != game_data["title"]
+        ):
+            game_data["title"] = scraped_api_data["api_title"]
+        for key in ("description", "release_date", "genres", "languages"):
+            game_data[key] = scraped_api_data.get(key, game_data[key])
+        game_data["scrape_success"] = True
+
+        cover_url = scraped_api_data.get("cover_url")
+        if cover_url:
+            local_cover_path = download_cover(cover_url, rom_path)
+            if local_cover_path:
+                game_data["cover_path"] = local_cover_path
+            else:
+                logging.warning(f"Download copertina fallito per {file} da {cover_url}")
+    else:
+        logging.info(f"Nessun dato API trovato per {file}, creato placeholder.")
+
+    if not save_metadata(rom_path, game_data):
+        logging.error(f"Salvataggio metadati fallito per {file}")
+    return game_data
+
+
+class MetadataEnrichmentJob(QRunnable):
+    """Enriches a group of library files on one of the manager's pooled threads."""
+
+    def __init__(self, manager, batch, cancelled, files):
+        super().__init__()
+        self.manager = manager
+        self.batch = batch
+        self.cancelled = cancelled
+        self.files = files
+        self.setAutoDelete(True)
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        pending = [rom_path for rom_path, _ in self.files]
+        try:
+            for rom_path, game_data in enrich_metadata_batch(self.files):
+                pending.remove(rom_path)
+                # Emitted from the pool thread: the manager gets it queued.
+                self.manager._job_finished.emit(self.batch, rom_path, game_data)
+        except Exception as e:
+            logging.exception(f"Errore ricerca metadati {pending}: {e}")
+        for rom_path in pending:
+            self.manager._job_finished.emit(self.batch, rom_path, None)
+
+
+class MetadataEnrichmentManager(QObject):
+    """
+    Looks up missing library metadata on a bounded QThreadPool, in groups of
+    METADATA_ENRICHMENT_BATCH files, so the library can show what is on disk
+    right away and update each item as its lookup completes. enrich() queues
+    the files not already queued or being looked up, extending the running
+    batch if there is one; cancel() drops the lookups not started yet (the
+    ones in flight still save and report their result, but no longer count as
+    progress).
+    """
+
+    item_enriched = Signal(str, dict)  # (rom_path, metadata)
+    progress = Signal(int, int)  # (done, total)
+    finished = Signal(int, int)  # (done, total)
+    _job_finished = Signal(int, str, object)
+
+    def __init__(self, max_workers=METADATA_ENRICHMENT_WORKERS, parent=None):
+        super().__init__(parent)
+        self.batch = 0
+        self.total = 0
+        self.done = 0
+        # rom_path -> batch, for the files queued or being looked up.
+        self.queued = {}
+        self._cancelled = threading.Event()
+        self._cancelled.set()
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max_workers)
+        self._job_finished.connect(self._on_job_finished)
+
+    def is_running(self):
+        return not self._cancelled.is_set()
+
+    def enrich(self, files):
+        """Looks up files, a list of (rom_path, console_name) missing metadata."""
+        new_files = []
+        for rom_path, console_name in files:
+            if rom_path not in self.queued:
+                self.queued[rom_path] = None
+                new_files.append((rom_path, console_name))
+        if not new_files:
+            if not self.is_running():
+                self.finished.emit(0, 0)
+            return
+        if not self.is_running():
+            self.batch += 1
+            self.total = 0
+            self.done = 0
+            self._cancelled = threading.Event()
+        for rom_path, _ in new_files:
+            self.queued[rom_path] = self.batch
+        self.total += len(new_files)
+        logging.info(
+            f"Ricerca metadati avviata per {len(new_files)} file della libreria."
+        )
+        for start in range(0, len(new_files), METADATA_ENRICHMENT_BATCH):
+            self.thread_pool.start(
+                MetadataEnrichmentJob(
+                    self,
+                    self.batch,
+                    self._cancelled,
+                    new_files[start : start + METADATA_ENRICHMENT_BATCH],
+                )
+            )
+        self.progress.emit(self.done, self.total)
+
+    def cancel(self):
+        if not self.is_running():
+            return
+        self._cancelled.set()
+        self.thread_pool.clear()
+        # Lookups still in flight report with a stale batch and are not
+        # tracked any more, so a later enrich() can queue their files again.
+        self.queued.clear()
+        logging.info(
+            f"Ricerca metadati annullata ({self.done}/{self.total} file completati)."
+        )
+        self.finished.emit(self.done, self.total)
+
+    def _on_job_finished(self, batch, rom_path, game_data):
+        if game_data:
+            self.item_enriched.emit(rom_path, game_data)
+        if self.queued.get(rom_path) == batch:
+            del self.queued[rom_path]
+        if batch != self.batch or not self.is_running():
+            return
+        self.done += 1
+        self.progress.emit(self.done, self.total)
+        if self.done == self.total:
+            self._cancelled.set()
+            logging.info(f"Ricerca metadati completata per {self.total} file.")
+            self.finished.emit(self.done, self.total)
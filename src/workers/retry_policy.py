@@ -0,0 +1,148 @@
+import asyncio
+import random
+import zipfile
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from src.dat_verification import IntegrityError
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+ERROR_TIMEOUT = "timeout"
+ERROR_CONNECTION = "connection"
+ERROR_HTTP_5XX = "http_5xx"
+ERROR_HTTP_429 = "http_429"
+ERROR_HTTP_4XX = "http_4xx"
+ERROR_INTEGRITY = "integrity"
+ERROR_OTHER = "other"
+
+# Retries allowed per error class for a single game. Client errors (404, 403...)
+# will not fix themselves, so they fail at once.
+RETRY_BUDGETS = {
+    ERROR_TIMEOUT: 5,
+    ERROR_CONNECTION: 5,
+    ERROR_HTTP_5XX: 4,
+    ERROR_HTTP_429: 6,
+    ERROR_HTTP_4XX: 0,
+    ERROR_INTEGRITY: 2,
+    ERROR_OTHER: 1,
+}
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 120.0
+
+
+class IncompleteDownloadError(IOError):
+    """Raised when a transfer ends before all the expected bytes arrived."""
+
+
+def _classify_status(status):
+    if status == 429:
+        return ERROR_HTTP_429
+    if status >= 500:
+        return ERROR_HTTP_5XX
+    if status >= 400:
+        return ERROR_HTTP_4XX
+    return ERROR_OTHER
+
+
+def classify_exception(exc):
+    """Maps a download exception (requests, aiohttp or I/O) to an error class."""
+    if isinstance(exc, (IntegrityError, zipfile.BadZipFile)):
+        return ERROR_INTEGRITY
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return _classify_status(exc.response.status_code)
+    if aiohttp is not None and isinstance(exc, aiohttp.ClientResponseError):
+        return _classify_status(exc.status)
+    if isinstance(
+        exc, (requests.exceptions.Timeout, asyncio.TimeoutError, TimeoutError)
+    ):
+        return ERROR_TIMEOUT
+    if isinstance(
+        exc,
+        (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+            ConnectionError,
+            IncompleteDownloadError,
+        ),
+    ):
+        return ERROR_CONNECTION
+    if aiohttp is not None and isinstance(
+        exc, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+    ):
+        return ERROR_CONNECTION
+    return ERROR_OTHER
+
+
+def get_retry_after(exc):
+    """Returns the Retry-After delay (seconds) carried by an HTTP error, if any."""
+    headers = None
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        headers = exc.response.headers
+    elif aiohttp is not None and isinstance(exc, aiohttp.ClientResponseError):
+        headers = exc.headers
+    return parse_retry_after(headers.get("Retry-After") if headers else None)
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header value (seconds or HTTP date),
+    or None. A date without a timezone is taken as UTC, as HTTP dates are.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def get_backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class RetryPolicy:
+    """
+    Tracks the retries spent by each game, per error class, and decides
+    whether (and after how long) a failed transfer should be tried again.
+    """
+
+    def __init__(self, budgets=None):
+        self.budgets = budgets or RETRY_BUDGETS
+        self.attempts = {}
+
+    def next_delay(self, game_name, error_kind, retry_after=None):
+        """
+        Consumes one retry of error_kind for game_name.
+        Returns the delay in seconds before the next attempt, or None if the
+        budget for that error class is exhausted.
+        """
+        used = self.attempts.setdefault(game_name, {}).get(error_kind, 0)
+        if used >= self.budgets.get(error_kind, 0):
+            return None
+        self.attempts[game_name][error_kind] = used + 1
+        delay = get_backoff_delay(used)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, RETRY_MAX_DELAY))
+        return delay
+
+    def describe(self, game_name, error_kind):
+        """Returns 'used/budget' for log messages."""
+        used = self.attempts.get(game_name, {}).get(error_kind, 0)
+        return f"{used}/{self.budgets.get(error_kind, 0)}"
+
+    def forget(self, game_name):
+        self.attempts.pop(game_name, None)
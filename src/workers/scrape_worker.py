@@ -1,22 +1,66 @@
 from PySide6.QtCore import QObject, Signal
 
 from src import scraping
+from src.catalog_store import TABLE_COLUMNS
 
 
 class ScrapeWorker(QObject):
+    """
+    Loads a console catalog with stale-while-revalidate: a cached list, with
+    just the TABLE_COLUMNS, is emitted right away through cached_loaded, then,
+    if it is stale or a refresh was forced, the listing is revalidated in the
+    background.
+    finished carries a new list only when the catalog actually changed;
+    unchanged is emitted when the server confirmed the cached copy, and
+    catalog_diff carries the added/removed/changed games of a refresh.
+    done is always emitted last.
+    """
+
+    cached_loaded = Signal(list)
     finished = Signal(list)
+    unchanged = Signal()
+    catalog_diff = Signal(str, object)
     progress = Signal(str)
+    done = Signal()
 
-    def __init__(self, console_name):
+    def __init__(self, console_name, force_refresh=False):
         super().__init__()
         self.console_name = console_name
+        self.force_refresh = force_refresh
 
     def run(self):
-        self.progress.emit(f"Inizio scraping per '{self.console_name}'...")
+        entry = scraping.load_catalog_cache(self.console_name, TABLE_COLUMNS)
+        if entry:
+            self.cached_loaded.emit(entry["games"])
+            if not self.force_refresh and not scraping.is_catalog_stale(
+                self.console_name, entry
+            ):
+                self.done.emit()
+                return
+            self.progress.emit(
+                f"Verifica aggiornamenti del catalogo '{self.console_name}' in background..."
+            )
+        else:
+            self.progress.emit(f"Inizio scraping per '{self.console_name}'...")
+
         try:
-            games = scraping.get_games_for_console_cached(self.console_name)
-            self.progress.emit(f"Scraping completato: trovati {len(games)} giochi.")
+            had_cache = entry is not None
+            entry, diff = scraping.revalidate_catalog(self.console_name, entry)
+            if diff or not had_cache:
+                self.progress.emit(
+                    f"Scraping completato: trovati {len(entry['games'])} giochi."
+                )
+                if diff and not diff.initial:
+                    self.progress.emit(
+                        f"Catalogo '{self.console_name}' aggiornato: {diff.summary()}."
+                    )
+                    self.catalog_diff.emit(self.console_name, diff)
+                self.finished.emit(entry["games"])
+            else:
+                self.progress.emit(f"Catalogo '{self.console_name}' già aggiornato.")
+                self.unchanged.emit()
         except Exception as e:
             self.progress.emit(f"Errore durante lo scraping: {e}")
-            games = []
-        self.finished.emit(games)
+            if not entry:
+                self.finished.emit([])
+        self.done.emit()
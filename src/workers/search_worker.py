@@ -0,0 +1,71 @@
+from PySide6.QtCore import QObject, Signal, Slot
+
+from src.catalog_facets import FacetColumns
+from src.search_index import SearchIndex
+
+# Rows sent per results signal: the first chunk is shown while the rest follow.
+SEARCH_RESULT_CHUNK = 2000
+
+SORT_NAME = "name"
+SORT_SIZE = "size_bytes"
+
+
+class SearchWorker(QObject):
+    """
+    Builds the SearchIndex of a catalog and answers filter/sort requests in a
+    background thread. Every request carries a generation number; the GUI
+    bumps latest_generation before sending a new one, so a request that is
+    already stale is skipped and stops emitting as soon as it is superseded.
+    Results are emitted as (generation, rows, first, last) in chunks of row
+    indices into the catalog list, after the facet counts of the search
+    (see FacetColumns.counts).
+    """
+
+    results = Signal(int, object, bool, bool)
+    facet_counts = Signal(int, object)
+
+    def __init__(self):
+        super().__init__()
+        self.latest_generation = 0
+        self.games = []
+        self.names_lower = []
+        self.index = SearchIndex([])
+        self.facets = FacetColumns([])
+
+    def _is_stale(self, generation):
+        return generation != self.latest_generation
+
+    @Slot(object)
+    def set_catalog(self, games):
+        self.games = games
+        self.names_lower = [game.get("name", "").lower() for game in games]
+        self.index = SearchIndex(self.names_lower)
+        self.facets = FacetColumns(games)
+
+    @Slot(int, object)
+    def search(self, generation, request):
+        """
+        request is (search terms, FacetFilter, fuzzy, sort key or None,
+        descending).
+        """
+        if self._is_stale(generation):
+            return
+        terms, facet_filter, fuzzy, sort_key, descending = request
+        if fuzzy and terms:
+            rows = self.index.fuzzy_search(" ".join(terms))
+        else:
+            rows = self.index.search(terms)
+        self.facet_counts.emit(generation, self.facets.counts(rows, facet_filter))
+        rows = self.facets.filter(rows, facet_filter)
+        if sort_key == SORT_SIZE:
+            rows.sort(
+                key=lambda i: self.games[i].get("size_bytes", 0), reverse=descending
+            )
+        elif sort_key == SORT_NAME:
+            rows.sort(key=self.names_lower.__getitem__, reverse=descending)
+
+        for start in range(0, max(len(rows), 1), SEARCH_RESULT_CHUNK):
+            if self._is_stale(generation):
+                return
+            end = start + SEARCH_RESULT_CHUNK
+            self.results.emit(generation, rows[start:end], start == 0, end >= len(rows))
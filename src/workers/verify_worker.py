@@ -0,0 +1,21 @@
+from PySide6.QtCore import QObject, Signal
+
+from src.dat_verification import verify_library
+
+
+class VerifyWorker(QObject):
+    """Verifies a library folder against the imported DATs in a background thread."""
+
+    finished = Signal(dict)
+    progress = Signal(int, int)
+
+    def __init__(self, folder):
+        super().__init__()
+        self.folder = folder
+
+    def run(self):
+        try:
+            results = verify_library(self.folder, progress_callback=self.progress.emit)
+        except Exception as e:
+            results = {"error": str(e)}
+        self.finished.emit(results)
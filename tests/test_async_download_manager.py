@@ -0,0 +1,110 @@
+import http.server
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from src import config
+from src.workers import async_download_manager
+from src.workers.async_download_manager import (
+    AsyncDownloadManager,
+    is_async_engine_available,
+)
+from src.workers.download_worker import get_part_paths
+
+DATA = bytes(range(256)) * 8
+
+
+class _RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serves DATA, answering 416 to ranges starting past its end."""
+
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        requested = self.headers.get("Range")
+        _RangeHandler.requests.append(requested)
+        start = 0
+        if requested:
+            start = int(re.match(r"bytes=(\d+)-", requested).group(1))
+            if start >= len(DATA):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(DATA)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        body = DATA[start:]
+        self.send_response(206 if requested else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v2"')
+        if requested:
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(DATA) - 1}/{len(DATA)}"
+            )
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@unittest.skipUnless(is_async_engine_available(), "aiohttp non installato")
+class StaleResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        patcher = mock.patch.object(config, "USER_DOWNLOADS_FOLDER", self.folder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            async_download_manager, "get_dat_index", return_value=[]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        _RangeHandler.requests = []
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_stale_offset_416_restarts_from_zero(self):
+        url = f"http://127.0.0.1:{self.server.server_address[1]}/game.bin"
+        local_file = os.path.join(self.folder, "nes", "game.bin")
+        part_file, state_file = get_part_paths(local_file)
+        os.makedirs(os.path.dirname(local_file))
+        # A partial file of an older, larger version of the game.
+        stale_offset = len(DATA) + 512
+        with open(part_file, "wb") as f:
+            f.write(b"x" * stale_offset)
+        with open(state_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "url": url,
+                    "etag": '"v1"',
+                    "total": 2 * len(DATA),
+                    "offset": stale_offset,
+                },
+                f,
+            )
+
+        game = {"name": "Game", "link": url, "console": "nes", "size_bytes": len(DATA)}
+        manager = AsyncDownloadManager([game], None, max_concurrent=1)
+        failures = []
+        manager.file_failed.connect(lambda game, error: failures.append(error))
+        manager.process_queue()
+
+        self.assertEqual(failures, [])
+        self.assertEqual(manager.completed_downloads, [local_file])
+        with open(local_file, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+        self.assertFalse(os.path.exists(part_file))
+        self.assertFalse(os.path.exists(state_file))
+        self.assertEqual(_RangeHandler.requests, [f"bytes={stale_offset}-", None])
+
+
+if __name__ == "__main__":
+    unittest.main()